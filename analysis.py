@@ -0,0 +1,315 @@
+from dataclasses import dataclass
+
+from parser import *
+
+# Static analysis of a `BelugaProblemDef`, independent of any planning model / engine.
+
+SIDE_BELUGA = "beluga"
+SIDE_FACTORY = "factory"
+
+@dataclass
+class BelugaDomains:
+    """
+    Values that the open parameters of put-down / pick-up activities can actually take.
+    """
+    racks_fitting_size: dict[int, list[str]]    # size -> racks large enough to hold a jig of that size
+    jigs_rackable: list[str]                    # jigs that fit on at least one rack (when at their smallest)
+    trailers: dict[str, list[str]]              # "beluga" | "factory" -> trailers of that side
+    jig_sizes: dict[str, tuple[int, int]]       # jig -> (size until delivered to a production line, size after)
+
+    def racks_for_jig(
+        self,
+        jig_name: str | None,
+        delivered: bool | None = None,
+    ) -> list[str]:
+        """
+        Racks a jig can be put on / picked up from. `jig_name` being `None` stands for "any jig".
+        If `delivered` is `None`, the jig may or may not have been delivered to a production line.
+        """
+        if jig_name is None:
+            sizes = [min(s) for s in self.jig_sizes.values()]
+            return self.racks_fitting(min(sizes)) if len(sizes) > 0 else []
+        (size_before, size_after) = self.jig_sizes[jig_name]
+        if delivered is None:
+            return self.racks_fitting(min(size_before, size_after))
+        return self.racks_fitting(size_after if delivered else size_before)
+
+    def racks_fitting(self, size: int) -> list[str]:
+        return self.racks_fitting_size[size]
+
+def compute_domains(pb_def: BelugaProblemDef) -> BelugaDomains:
+
+    index = pb_def.index
+
+    jig_sizes = {}
+    for jig in pb_def.jigs:
+        jig_type = index.jig_types[jig.type]
+        # (only a delivery to a production line changes the size of a jig, which is then empty)
+        jig_sizes[jig.name] = (index.jig_initial_size(jig.name), jig_type.size_empty)
+
+    sizes = set(s for pair in jig_sizes.values() for s in pair)
+    sizes |= set(jt.size_empty for jt in pb_def.jig_types)
+    racks_fitting_size = {
+        size: [r.name for r in pb_def.racks if r.size >= size]
+        for size in sorted(sizes)
+    }
+
+    return BelugaDomains(
+        racks_fitting_size=racks_fitting_size,
+        jigs_rackable=[j for j, (s1, s2) in jig_sizes.items() if len(racks_fitting_size[min(s1, s2)]) > 0],
+        trailers={
+            SIDE_BELUGA: [t.name for t in pb_def.trailers_beluga],
+            SIDE_FACTORY: [t.name for t in pb_def.trailers_factory],
+        },
+        jig_sizes=jig_sizes,
+    )
+
+def find_interchangeable_objects(pb_def: BelugaProblemDef) -> dict[str, list[list[str]]]:
+    """
+    Classes (of at least 2 elements) of trailers, hangars and racks that can be exchanged in any plan without changing
+    its validity nor the properties it satisfies: initially empty, on the same side (trailers) or of the same size (racks),
+    and not referred to by any property.
+    """
+
+    racks_in_props = set()
+    racks_in_props |= set(r for (_, r) in pb_def.props_rack_always_empty)
+    racks_in_props |= set(r for (_, (_, r)) in pb_def.props_jig_never_on_rack)
+    racks_in_props |= set(r for (_, (_, r)) in pb_def.props_jig_only_if_ever_on_rack)
+    racks_in_props |= set(r for (_, (_, r1, _, r2)) in pb_def.props_jig_to_rack_order for r in [r1, r2])
+
+    def _classes(names_by_key: dict) -> list[list[str]]:
+        return [names for names in names_by_key.values() if len(names) >= 2]
+
+    trailers_by_side: dict[str, list[str]] = {}
+    for (side, trailers) in [(SIDE_BELUGA, pb_def.trailers_beluga), (SIDE_FACTORY, pb_def.trailers_factory)]:
+        trailers_by_side[side] = [t.name for t in trailers if t.jig is None]
+
+    racks_by_size: dict[int, list[str]] = {}
+    for r in pb_def.racks:
+        if len(r.jigs) == 0 and r.name not in racks_in_props:
+            racks_by_size.setdefault(r.size, []).append(r.name)
+
+    return {
+        "trailers": _classes(trailers_by_side),
+        "hangars": _classes({ None: [h.name for h in pb_def.hangars if h.jig is None] }),
+        "racks": _classes(racks_by_size),
+    }
+
+def find_conflicting_properties(
+    pb_def: BelugaProblemDef,
+    prop_ids: list[PropId] | None = None,
+) -> tuple[list[PropId], str] | None:
+    """
+    Looks for a (small) subset of the given properties (all of them by default) that is obviously infeasible,
+    without building nor solving any model. Returns that subset along with the reason why it is infeasible,
+    or `None` if none was found (which does *not* mean the properties are feasible).
+    """
+
+    index = pb_def.index
+    selected = set(prop_ids) if prop_ids is not None else set(pb_def.properties_definitions().keys())
+
+    def _selected(props: list) -> list:
+        return [(prop_id, params) for (prop_id, params) in props if prop_id in selected]
+
+    unloads = _selected(pb_def.props_unload_beluga)
+    loads = _selected(pb_def.props_load_beluga)
+    delivers = _selected(pb_def.props_deliver_to_production_line)
+
+    # two jigs at the same position, or the same jig twice
+
+    for (props, what) in [(unloads, "unloaded from"), (loads, "loaded into"), (delivers, "delivered to")]:
+        by_position = {}
+        for (prop_id, (j, x, i)) in props:
+            if (x, i) in by_position:
+                return ([by_position[(x, i)], prop_id], "two jigs {} {} at position {}".format(what, x, i))
+            by_position[(x, i)] = prop_id
+
+    unloaded_jigs = {}
+    for (prop_id, (j, _, _)) in unloads:
+        if j in unloaded_jigs:
+            return ([unloaded_jigs[j], prop_id], "jig {} unloaded twice".format(j))
+        unloaded_jigs[j] = prop_id
+
+    loaded_jigs = {}
+    for (prop_id, (j, _, _)) in loads:
+        if j not in index.jigs:
+            continue
+        if j in loaded_jigs:
+            return ([loaded_jigs[j], prop_id], "jig {} loaded twice".format(j))
+        loaded_jigs[j] = prop_id
+
+    delivered_jigs = {}
+    for (prop_id, (j, _, _)) in delivers:
+        delivered_jigs.setdefault(j, prop_id)
+
+    # initial state of racks
+
+    for (prop_id, r) in _selected(pb_def.props_rack_always_empty):
+        if r in index.racks and len(index.racks[r].jigs) > 0:
+            return ([prop_id], "rack {} is not initially empty".format(r))
+
+    for (prop_id, (j, r)) in _selected(pb_def.props_jig_never_on_rack):
+        if index.jig_initial_rack(j) == r:
+            return ([prop_id], "jig {} is initially on rack {}".format(j, r))
+
+    for (prop_id, (j, r)) in _selected(pb_def.props_jig_only_if_ever_on_rack):
+        initial_rack = index.jig_initial_rack(j)
+        if initial_rack is not None and initial_rack != r:
+            return ([prop_id], "jig {} is initially on rack {}".format(j, initial_rack))
+
+    # jigs to load into flights must be empty (and available)
+
+    # (a jig initially on a flight is in one of its incoming slots, and a jig in a slot of a production line's schedule may
+    # be delivered: the jigs of base slots are unloaded / delivered in any plan, and so may be the ones of the other slots,
+    # as their properties do not have to hold if they are not selected)
+    def _available_empty(j: str) -> bool:
+        return index.jigs[j].empty or j in index.jig_scheduled
+
+    for (prop_id, (j, b, _)) in loads:
+        if j in index.jigs and not _available_empty(j):
+            return ([prop_id], "jig {} can never be empty and available for being loaded into {}".format(j, b))
+
+    loads_by_type = {}
+    for (prop_id, (j, _, _)) in loads:
+        jig_type = index.jigs[j].type if j in index.jigs else j
+        loads_by_type.setdefault(jig_type, []).append(prop_id)
+    for (jig_type, load_prop_ids) in loads_by_type.items():
+        num_candidates = sum(1 for jig in pb_def.jigs if jig.type == jig_type and _available_empty(jig.name))
+        if len(load_prop_ids) > num_candidates:
+            return (load_prop_ids, "more jigs of type {} to load than can ever be empty and available".format(jig_type))
+
+    # jigs that have to go through a rack (from the beluga side to a production line), but cannot be put on any
+
+    for (j, deliver_prop_id) in delivered_jigs.items():
+        (kind, name) = index.jig_initial_location.get(j, ("", ""))
+        # (jigs delivered after being unloaded from a flight, by a base slot or not, went through a rack)
+        if kind == "beluga" or (kind == "trailer" and index.trailers_side[name] == SIDE_BELUGA):
+            needed_prop_ids = [deliver_prop_id]
+        else:
+            continue
+
+        size = index.jig_initial_size(j)
+        excluding_prop_ids = []
+        for r in pb_def.racks:
+            excluding_prop_id = None
+            if r.size < size:
+                continue
+            for (prop_id, (jj, rr)) in _selected(pb_def.props_jig_never_on_rack):
+                if (jj, rr) == (j, r.name):
+                    excluding_prop_id = prop_id
+            for (prop_id, (jj, rr)) in _selected(pb_def.props_jig_only_if_ever_on_rack):
+                if jj == j and rr != r.name:
+                    excluding_prop_id = prop_id
+            for (prop_id, rr) in _selected(pb_def.props_rack_always_empty):
+                if rr == r.name:
+                    excluding_prop_id = prop_id
+            for (prop_id, (jj, sz)) in _selected(pb_def.props_jig_always_placed_on_rack_size_leq):
+                if jj == j and r.size > int(sz):
+                    excluding_prop_id = prop_id
+            if excluding_prop_id is None:
+                break
+            excluding_prop_ids.append(excluding_prop_id)
+        else:
+            return (needed_prop_ids + list(dict.fromkeys(excluding_prop_ids)), "jig {} cannot be put on any rack on its way to a production line".format(j))
+
+    # orders between deliveries that refer to deliveries which cannot happen
+
+    scheduled = set((j, pl.name) for pl in pb_def.production_lines for j in pl.schedule.values())
+
+    for (prop_id, (j1, pl1, j2, pl2)) in _selected(pb_def.props_jig_to_production_line_order):
+        if (j1, pl1) not in scheduled or (j2, pl2) not in scheduled or (j1, pl1) == (j2, pl2):
+            return ([prop_id], "no deliveries of {} to {} then {} to {}".format(j1, pl1, j2, pl2))
+
+    for (prop_id, (j, pl, b)) in _selected(pb_def.props_jig_to_production_line_before_flight):
+        if (j, pl) not in scheduled or index.flights_order.get(b, 0) == 0:
+            return ([prop_id], "no delivery of {} to {} before flight {}".format(j, pl, b))
+
+    return None
+
+def swaps_bounds(
+    pb_def: BelugaProblemDef,
+    prop_ids: list[PropId] | None = None,
+) -> tuple[int, int]:
+    """
+    Returns a lower bound on the number of swaps needed by any plan satisfying the given properties (all of them by default),
+    and a cheap estimate of how many swaps should be enough (which is *not* guaranteed).
+
+    A jig to deliver to a production line (resp. to load into a flight) that is initially on a rack has to be picked up from
+    its factory (resp. beluga) side, unless it is moved by a swap. All the jigs between it and that side have to be moved
+    out of the way first: either by their own delivery (resp. load), by a swap, or by being parked on a trailer for good
+    (jigs picked up from a rack can only be put back on one by a swap), which at most all trailers of that side but one allow.
+    """
+
+    index = pb_def.index
+    selected = set(prop_ids) if prop_ids is not None else set(pb_def.properties_definitions().keys())
+
+    # (the base deliveries / loads are mandatory, as are the ones of the selected properties)
+    delivered = set(j for pl in pb_def.production_lines for j in index.pl_schedule(pl.name, selected).values())
+    outgoing = set(j for fl in pb_def.flights for j in index.flight_outgoing(fl.name, selected).values())
+    loaded = set(j for j in outgoing if j in index.jigs)
+    types_loaded = set(j for j in outgoing if j not in index.jigs)
+
+    def _free_on_beluga_side(j: str) -> bool:
+        jig = index.jigs[j]
+        return j in loaded or (jig.type in types_loaded and (jig.empty or j in delivered))
+
+    def _bounds_for_side(
+        targets: set[str],
+        free,
+        num_trailers: int,
+        from_factory_side: bool,
+    ) -> tuple[int, int]:
+
+        # per rack, options (swaps of target jigs, blocking jigs left to move out of the way)
+        options_per_rack: list[list[tuple[int, int]]] = []
+        num_blocking_jigs = 0
+        for r in pb_def.racks:
+            jigs = list(reversed(r.jigs)) if from_factory_side else list(r.jigs)   # (accessible end first)
+            target_positions = [k for k, j in enumerate(jigs) if j in targets]
+            if len(target_positions) == 0:
+                continue
+
+            def _num_to_move(k: int) -> int:
+                return sum(1 for j in jigs[:k] if j not in targets and not free(j))
+
+            # swapping the t deepest target jigs, all the others still have to be reached from that side
+            options = []
+            for t in range(len(target_positions)+1):
+                remaining = target_positions[:len(target_positions)-t]
+                options.append((t, _num_to_move(max(remaining)) if len(remaining) > 0 else 0))
+            options_per_rack.append(options)
+            num_blocking_jigs += options[0][1]
+
+        if len(options_per_rack) == 0:
+            return (0, 0)
+
+        num_parkable = max(0, num_trailers-1)
+
+        # min over choices of: swaps of target jigs + max(0, jigs to move out of the way - jigs that can be parked)
+        best_swaps_per_num_to_move: dict[int, int] = { 0: 0 }
+        for options in options_per_rack:
+            new_best = {}
+            for (num_to_move, num_swaps) in best_swaps_per_num_to_move.items():
+                for (t, m) in options:
+                    key = num_to_move+m
+                    new_best[key] = min(new_best.get(key, t+num_swaps), t+num_swaps)
+            best_swaps_per_num_to_move = new_best
+
+        lower_bound = min(num_swaps + max(0, num_to_move - num_parkable) for (num_to_move, num_swaps) in best_swaps_per_num_to_move.items())
+        return (lower_bound, max(lower_bound, num_blocking_jigs))
+
+    (lb_factory, ub_factory) = _bounds_for_side(
+        set(j for j in delivered if index.jig_initial_rack(j) is not None),
+        lambda j: j in delivered,
+        len(pb_def.trailers_factory),
+        True,
+    )
+    (lb_beluga, ub_beluga) = _bounds_for_side(
+        set(j for j in loaded if index.jig_initial_rack(j) is not None),
+        _free_on_beluga_side,
+        len(pb_def.trailers_beluga),
+        False,
+    )
+
+    # (the jigs moved out of the way on both sides may overlap, hence the max for the lower bound)
+    return (max(lb_factory, lb_beluga), ub_factory + ub_beluga)
@@ -0,0 +1,138 @@
+import os
+import csv
+import json
+import multiprocessing as mp
+
+from parser import *
+from checker import *
+
+# Property checking over many plans (and many properties files) at once, e.g. for analytics over archives of plans.
+#
+# Entries of a manifest, i.e. (base, properties, plan) triples, are grouped by (base, properties) and split in chunks
+# of plans, spread over a pool of worker processes. Each worker parses a base problem and builds the (indexed) checker
+# for a properties file only once, and reuses it (see `BelugaPropertyChecker.snapshot` / `restore`) for all the plans
+# it is given, which are read as they are checked. Results are gathered in a single satisfaction matrix.
+
+MANIFEST_FILE_EXTENSIONS = [".json", ".ndjson"]
+
+def _expand_path(path: str) -> list[str]:
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, fn) for fn in os.listdir(path)
+            if os.path.splitext(fn)[1] in MANIFEST_FILE_EXTENSIONS
+        )
+    return [path]
+
+def read_manifest(filename: str) -> list[tuple[str, str, str]]:
+    """
+    (base, properties, plan) entries of a manifest: a JSON list of `{"base": ..., "props": ..., "plan": ...}` objects
+    (or `[base, props, plan]` lists). `props` and `plan` may be directories (of `.json` / `.ndjson` files),
+    in which case every properties file is checked against every plan. Relative paths are relative to the manifest.
+    """
+    with open(filename) as f:
+        d = json.load(f)
+
+    manifest_dir = os.path.dirname(os.path.abspath(filename))
+    res = []
+    for entry in d:
+        (base, props, plan) = (entry["base"], entry["props"], entry["plan"]) if isinstance(entry, dict) else entry
+        (base, props, plan) = (os.path.join(manifest_dir, p) for p in (base, props, plan))
+        for props_filename in _expand_path(props):
+            for plan_filename in _expand_path(plan):
+                res.append((base, props_filename, plan_filename))
+    return res
+
+# (per worker process)
+_parsed_bases: dict[str, BelugaProblemDef] = {}
+_checkers: dict[tuple[str, str], tuple[BelugaPropertyChecker, dict]] = {}
+
+def _checker_for(base_filename: str, props_filename: str) -> BelugaPropertyChecker:
+    if (base_filename, props_filename) not in _checkers:
+        if base_filename not in _parsed_bases:
+            # (properties do not change what the checker needs from the problem)
+            _parsed_bases[base_filename] = parse_problem(base_filename)
+        checker = property_checker_for_problem(_parsed_bases[base_filename], parse_properties_definitions(props_filename))
+        _checkers[(base_filename, props_filename)] = (checker, checker.snapshot())
+
+    (checker, initial_state) = _checkers[(base_filename, props_filename)]
+    checker.restore(initial_state)
+    return checker
+
+def _check_chunk(
+    task: tuple[list[int], str, str, list[str]],
+) -> tuple[list[int], list[tuple[list[PropId] | None, str | None]]]:
+    (entries_indices, base_filename, props_filename, plan_filenames) = task
+    res = []
+    for plan_filename in plan_filenames:
+        try:
+            checker = _checker_for(base_filename, props_filename)
+            with open(plan_filename) as f:
+                for act in iter_plan_actions(f):
+                    checker.push(act)
+            res.append((checker.satisfied_properties(), None))
+        except Exception as e:
+            res.append((None, repr(e)))
+    return (entries_indices, res)
+
+def check_props_batch(
+    entries: list[tuple[str, str, str]],
+    num_workers: int,
+    chunk_size: int = 64,
+) -> list[tuple[list[PropId] | None, str | None]]:
+    """
+    For each entry, the properties the plan satisfies (or `None`, and the error that occurred while checking it).
+    """
+    groups: dict[tuple[str, str], list[int]] = {}
+    for k, (base_filename, props_filename, _) in enumerate(entries):
+        groups.setdefault((base_filename, props_filename), []).append(k)
+
+    tasks = []
+    for ((base_filename, props_filename), indices) in groups.items():
+        for i in range(0, len(indices), chunk_size):
+            chunk = indices[i:i+chunk_size]
+            tasks.append((chunk, base_filename, props_filename, [entries[k][2] for k in chunk]))
+
+    results: list[tuple[list[PropId] | None, str | None]] = [(None, None)] * len(entries)
+
+    def _gather(chunks_results):
+        for (indices, res) in chunks_results:
+            for k, r in zip(indices, res):
+                results[k] = r
+
+    if num_workers <= 1:
+        _gather(map(_check_chunk, tasks))
+    else:
+        with mp.Pool(num_workers) as pool:
+            _gather(pool.imap_unordered(_check_chunk, tasks))
+
+    return results
+
+def write_satisfaction_matrix(
+    filename: str,
+    entries: list[tuple[str, str, str]],
+    results: list[tuple[list[PropId] | None, str | None]],
+):
+    """
+    One row per entry and one column per property (of any of the properties files): 1 if satisfied, 0 if not,
+    and empty if the property is not one of the entry's (or the plan could not be checked, see the `error` column).
+    """
+    props_ids: dict[str, list[PropId]] = {}
+    for (_, props_filename, _) in entries:
+        if props_filename not in props_ids:
+            props_ids[props_filename] = list(parse_properties_definitions(props_filename).keys())
+    columns = list(dict.fromkeys(prop_id for ids in props_ids.values() for prop_id in ids))
+
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(["base", "props", "plan"] + columns + ["error"])
+        for ((base_filename, props_filename, plan_filename), (satisfied, error)) in zip(entries, results):
+            entry_props_ids = set(props_ids[props_filename])
+            satisfied_ids = set(satisfied) if satisfied is not None else set()
+            w.writerow(
+                [base_filename, props_filename, plan_filename]
+                + [
+                    "" if satisfied is None or prop_id not in entry_props_ids else int(prop_id in satisfied_ids)
+                    for prop_id in columns
+                ]
+                + [error or ""]
+            )
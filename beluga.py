@@ -4,8 +4,20 @@ import sys
 import os
 
 from parser import *
-from model import *
 from checker import *
+from analysis import *
+from simulator import *
+
+# (`model`, and with it `unified_planning`, takes most of the start-up time: it is only imported by the subcommands that need it,
+# so that property / plan checking start as fast as plain Python)
+
+def exit_if_obviously_infeasible(pb_def: BelugaProblemDef, prop_ids: list[PropId] | None = None):
+    # (no need to build a model and call the engine, for each number of swaps, to find out)
+    conflict = find_conflicting_properties(pb_def, prop_ids)
+    if conflict is not None:
+        (conflicting_prop_ids, reason) = conflict
+        print("conflicting properties {}: {}".format(conflicting_prop_ids, reason))
+        sys.exit(2)
 
 if __name__ == "__main__":
 
@@ -19,6 +31,10 @@ if __name__ == "__main__":
 
     if sys.argv[1] == "solve":
 
+        from greedy import solve_greedy
+        from model_cache import default_model_cache
+        from solution_cache import BelugaSolutionCache
+
         base_filename = sys.argv[2]
         props_filename = sys.argv[3]
         test_pb_def = parse_problem_and_properties(base_filename, props_filename)
@@ -66,27 +82,66 @@ if __name__ == "__main__":
                 sys.exit(2)                                      # FIXME TODO temporary ?
          """
         # # # ALT: with growing num of allowed_swaps (until limit or sol found) # # # 
+
+        exit_if_obviously_infeasible(test_pb_def)
+
+        # (no plan can use fewer swaps than the lower bound: no need to solve for these)
+        (swaps_lower_bound, swaps_estimate) = swaps_bounds(test_pb_def)
+        print('swaps lower bound: {} swaps estimate: {}'.format(swaps_lower_bound, swaps_estimate))
+
+        # (the engine is only called if the greedy planner fails, violates some of the properties,
+        # or uses more swaps than the lower bound, i.e. its plan may not use as few swaps as possible)
+        if os.environ.get('GREEDY', '1') == '1':
+            test_plan_as_json = solve_greedy(
+                test_pb_def,
+                list(test_pb_def.properties_definitions().keys()),
+                int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10)),
+            )
+            num_greedy_swaps = count_swaps_in_plan(plan_def_from_json(test_plan_as_json)) if test_plan_as_json is not None else None
+            if num_greedy_swaps is not None and num_greedy_swaps > swaps_lower_bound:
+                print('greedy plan found, swaps used: {} (more than the lower bound, solving with the engine)'.format(num_greedy_swaps))
+            elif num_greedy_swaps is not None:
+                print('greedy plan found, swaps used: {}'.format(num_greedy_swaps))
+                print(test_plan_as_json)
+                os.makedirs(os.path.dirname(output_plan_path), exist_ok=True)
+                with open(output_plan_path, 'w', encoding='utf-8') as f:
+                    json.dump(test_plan_as_json, f, ensure_ascii=False, indent=4)
+                sys.exit(0)
     
-        num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
-        test_beluga_model = BelugaModelOptSched(test_pb_def, base_filename+"_"+props_filename, num_available_swaps, None)
-        serialize_problem(test_beluga_model.pb, output_upp_path)
+        # (a plan for a slightly different version of the problem, used as a warm start)
+        ref_plan_filename = os.environ.get('REF_PLAN', None)
+        ref_plan_def = parse_plan(ref_plan_filename) if ref_plan_filename is not None else None
+
+        if ref_plan_def is not None:
+            num_available_swaps = count_swaps_in_plan(ref_plan_def) + int(os.environ.get('REF_PLAN_SWAPS_MARGIN', 2))
+        else:
+            num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
+        model_cache = default_model_cache(output_folder)
+        (model_key, test_beluga_model) = model_cache.get_or_build_model(test_pb_def, base_filename+"_"+props_filename, num_available_swaps)
+        model_cache.write_upp(model_key, output_upp_path)
+
+        test_beluga_model.solution_cache = BelugaSolutionCache(os.path.join(output_folder, "cache/solutions.json"))
+
+        hints = test_beluga_model.make_hints(ref_plan_def) if ref_plan_def is not None else None
+        hints_timeout = float(os.environ.get('REF_PLAN_HINTS_TIMEOUT', 10))
 
-        n = 0
+        n = swaps_lower_bound
         while True:
             print('swaps "spawned": {} swaps allowed: {}'.format(num_available_swaps, n))
         
             (test_plan, test_plan_as_json) = test_beluga_model.solve_with_properties(
                 list(test_beluga_model.properties.keys()),
-                n
+                n,
+                hints=hints,
+                hints_timeout=hints_timeout,
             )
         
-            if test_plan is not None:
+            if test_plan_as_json is not None:
                 break
             n += 1
             if n > num_available_swaps:   # FIXME TODO temporary ?
                 sys.exit(2)                # FIXME TODO temporary ?
 
-        assert (test_plan is None and test_plan_as_json is None) or (test_plan is not None and test_plan_as_json is not None)
         print(test_plan_as_json)
 
         if test_plan_as_json is not None:
@@ -98,8 +153,140 @@ if __name__ == "__main__":
 
         assert False
 
+    elif sys.argv[1] == "solve-portfolio":
+
+        from portfolio import solve_portfolio_over_swaps
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        num_workers = (os.cpu_count() or 1) if len(sys.argv) < 5 else int(sys.argv[4])
+        deadline = None if len(sys.argv) < 6 else float(sys.argv[5])
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        print(test_pb_def)
+
+        exit_if_obviously_infeasible(test_pb_def)
+
+        num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
+
+        (swaps_lower_bound, swaps_estimate) = swaps_bounds(test_pb_def)
+        print('swaps lower bound: {} swaps estimate: {}'.format(swaps_lower_bound, swaps_estimate))
+
+        (n, test_plan_as_json, proven_minimal) = solve_portfolio_over_swaps(
+            test_pb_def,
+            base_filename+"_"+props_filename,
+            num_available_swaps,
+            num_workers,
+            deadline,
+            os.environ.get('CHAIN_PRECEDENCES', '0') == '1',
+            os.environ.get('SYMMETRY_BREAKING', '0') == '1',
+            swaps_lower_bound,
+        )
+        if test_plan_as_json is None:
+            sys.exit(2)
+
+        print('swaps "spawned": {} swaps allowed: {}'.format(num_available_swaps, n))
+        if not proven_minimal:
+            print('(not proven minimal: smaller numbers of swaps were not all proven infeasible)')
+        print(test_plan_as_json)
+
+        os.makedirs(os.path.dirname(output_plan_path), exist_ok=True)
+        with open(output_plan_path, 'w', encoding='utf-8') as f:
+            json.dump(test_plan_as_json, f, ensure_ascii=False, indent=4)
+
+        sys.exit(0)
+
+    elif sys.argv[1] == "solve-rolling-horizon":
+
+        from rolling_horizon import solve_rolling_horizon, window_invariant_prop_ids
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        window_size = 3 if len(sys.argv) < 5 else int(sys.argv[4])
+        window_overlap = 1 if len(sys.argv) < 6 else int(sys.argv[5])
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        print(test_pb_def)
+
+        # (the other properties are not enforced by the decomposition)
+        exit_if_obviously_infeasible(test_pb_def, window_invariant_prop_ids(test_pb_def))
+
+        num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
+
+        test_plan_as_json = solve_rolling_horizon(
+            test_pb_def,
+            base_filename+"_"+props_filename,
+            num_available_swaps,
+            window_size,
+            window_overlap,
+            None,
+            os.environ.get('CHAIN_PRECEDENCES', '0') == '1',
+            os.environ.get('SYMMETRY_BREAKING', '0') == '1',
+        )
+        if test_plan_as_json is None:
+            sys.exit(2)
+
+        print(test_plan_as_json)
+        # (only some properties are taken into account by the decomposition)
+        print('satisfied properties: {}'.format(check_plan_properties_for_problem(test_pb_def, plan_def_from_json(test_plan_as_json))))
+
+        os.makedirs(os.path.dirname(output_plan_path), exist_ok=True)
+        with open(output_plan_path, 'w', encoding='utf-8') as f:
+            json.dump(test_plan_as_json, f, ensure_ascii=False, indent=4)
+
+        sys.exit(0)
+
+    elif sys.argv[1] == "solve-min-swaps":
+
+        from model_cache import default_model_cache
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        timeout = None if len(sys.argv) < 5 else float(sys.argv[4])
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        print(test_pb_def)
+
+        exit_if_obviously_infeasible(test_pb_def)
+
+        num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
+        model_cache = default_model_cache(output_folder)
+        (model_key, test_beluga_model) = model_cache.get_or_build_model(test_pb_def, base_filename+"_"+props_filename, num_available_swaps)
+        model_cache.write_upp(model_key, output_upp_path)
+
+        (swaps_lower_bound, swaps_estimate) = swaps_bounds(test_pb_def)
+        print('swaps lower bound: {} swaps estimate: {}'.format(swaps_lower_bound, swaps_estimate))
+
+        def _on_better_plan(num_swaps, plan_as_json):
+            # the latest (best) plan is always available on disk, even if the solve is interrupted
+            print('better plan found, swaps used: {}'.format(num_swaps))
+            os.makedirs(os.path.dirname(output_plan_path), exist_ok=True)
+            with open(output_plan_path, 'w', encoding='utf-8') as f:
+                json.dump(plan_as_json, f, ensure_ascii=False, indent=4)
+
+        (n, proven_optimal, test_plan_as_json) = test_beluga_model.solve_with_properties_minimizing_swaps(
+            list(test_beluga_model.properties.keys()),
+            timeout,
+            _on_better_plan,
+        )
+        if test_plan_as_json is None:
+            sys.exit(2)
+
+        # (reaching the lower bound is a proof of optimality too)
+        proven_optimal = proven_optimal or n == swaps_lower_bound
+
+        print(test_plan_as_json)
+        print('swaps "spawned": {} swaps used: {} ({})'.format(num_available_swaps, n, "proven optimal" if proven_optimal else "not proven optimal"))
+        if proven_optimal:
+            # the linear loop would have made n+1 feasibility calls (for 0, 1, ..., n swaps)
+            print('engine calls saved compared to the linear loop: {}'.format(n))
+
+        sys.exit(0)
+
     elif sys.argv[1] == "explain":
 
+        from model_cache import default_model_cache
+
         base_filename = sys.argv[2]
         props_filename = sys.argv[3]
         test_pb_def = parse_problem_and_properties(base_filename, props_filename)
@@ -113,8 +300,9 @@ if __name__ == "__main__":
         print(test_pb_def.props_ids_hard_list)
 
         num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 2))
-        test_beluga_model = BelugaModelOptSched(test_pb_def, base_filename+"_"+props_filename, num_available_swaps, None)
-        serialize_problem(test_beluga_model.pb, output_upp_path)        
+        model_cache = default_model_cache(output_folder)
+        model_key = model_cache.get_or_build_upp(test_pb_def, base_filename+"_"+props_filename, num_available_swaps)
+        model_cache.write_upp(model_key, output_upp_path)
 
         import subprocess
 
@@ -156,6 +344,48 @@ if __name__ == "__main__":
 
         sys.exit(0)
 
+    elif sys.argv[1] == "repair":
+
+        from repair import repair_plan
+        from model_cache import default_model_cache
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        plan_filename = sys.argv[4]
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        print(test_pb_def)
+        test_plan_def = parse_plan(plan_filename)
+        assert test_plan_def is not None
+
+        exit_if_obviously_infeasible(test_pb_def)
+
+        num_available_swaps = count_swaps_in_plan(test_plan_def) + int(os.environ.get('REF_PLAN_SWAPS_MARGIN', 2))
+        model_cache = default_model_cache(output_folder)
+        (model_key, test_beluga_model) = model_cache.get_or_build_model(test_pb_def, base_filename+"_"+props_filename, num_available_swaps)
+        model_cache.write_upp(model_key, output_upp_path)
+
+        # (the properties to satisfy, all of them by default)
+        prop_ids = list(test_beluga_model.properties.keys()) if len(sys.argv) < 6 else list(map(PropId, sys.argv[5].strip('[]').replace(" ","").split(',')))
+
+        test_plan_as_json = repair_plan(
+            test_beluga_model,
+            test_plan_def,
+            prop_ids,
+            window_timeout=float(os.environ.get('REPAIR_WINDOW_TIMEOUT', 10)),
+            window_margin=int(os.environ.get('REPAIR_WINDOW_MARGIN', 1)),
+        )
+        if test_plan_as_json is None:
+            sys.exit(2)
+
+        print(test_plan_as_json)
+
+        os.makedirs(os.path.dirname(output_plan_path), exist_ok=True)
+        with open(output_plan_path, 'w', encoding='utf-8') as f:
+            json.dump(test_plan_as_json, f, ensure_ascii=False, indent=4)
+
+        sys.exit(0)
+
     elif sys.argv[1] == "check-props":
 
         base_filename = sys.argv[2]
@@ -168,16 +398,10 @@ if __name__ == "__main__":
         assert test_plan_def is not None
         # print(test_plan_def)
 
-        d = json.load(open(props_filename))
-        properties = { entry["_id"]: entry["definition"] for entry in d }
-
-        satisfied_properties = check_plan_properties(
-            properties,
+        # (all the properties of the problem definition)
+        satisfied_properties = check_plan_properties_for_problem(
+            test_pb_def,
             test_plan_def,
-            [ fl.name for fl in test_pb_def.flights ],
-            { j.name: j.type for j in test_pb_def.jigs },
-            { r.name: r.jigs for r in test_pb_def.racks },
-            { r.name: r.size for r in test_pb_def.racks },
         )
 
         for prop_id in satisfied_properties:
@@ -191,5 +415,101 @@ if __name__ == "__main__":
         
         assert False
 
+    elif sys.argv[1] == "check-props-batch":
+
+        from batch_check import read_manifest, check_props_batch, write_satisfaction_matrix
+
+        manifest_filename = sys.argv[2]
+        num_workers = (os.cpu_count() or 1) if len(sys.argv) < 4 else int(sys.argv[3])
+        output_matrix_path = os.path.join(output_folder, "sat_props/sat_props_matrix.csv") if len(sys.argv) < 5 else sys.argv[4]
+
+        entries = read_manifest(manifest_filename)
+        results = check_props_batch(entries, num_workers)
+
+        num_errors = sum(1 for (_, error) in results if error is not None)
+        print("plans checked: {} (errors: {})".format(len(entries), num_errors))
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_matrix_path)), exist_ok=True)
+        write_satisfaction_matrix(output_matrix_path, entries, results)
+
+        sys.exit(0 if num_errors == 0 else 2)
+
+    elif sys.argv[1] == "check-props-stream":
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        plan_filename = sys.argv[4]
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+
+        # (the plan, a JSON array or NDJSON, is checked as it is read)
+        satisfied_properties = check_plan_file_properties(test_pb_def, plan_filename)
+
+        for prop_id in satisfied_properties:
+            print(prop_id)
+
+        os.makedirs(os.path.dirname(output_sat_props_path), exist_ok=True)
+        with open(output_sat_props_path, 'w', encoding='utf-8') as f:
+            json.dump([prop_id for prop_id in satisfied_properties], f, ensure_ascii=False, indent=4)
+
+        sys.exit(0)
+
+    elif sys.argv[1] == "monitor":
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        monitor = property_monitor_for_problem(test_pb_def)
+
+        print(json.dumps({ "status": monitor.status() }), flush=True)
+
+        # (one action per line, as it is executed; the properties whose status changed are printed after each)
+        for line in sys.stdin:
+            if line.strip() == "":
+                continue
+            [act] = plan_def_from_json([json.loads(line)])
+            print(json.dumps({ "transitions": dict(monitor.push(act)) }), flush=True)
+
+        print(json.dumps({ "satisfied": monitor.satisfied_properties() }), flush=True)
+        sys.exit(0)
+
+    elif sys.argv[1] == "check-plan":
+
+        base_filename = sys.argv[2]
+        props_filename = sys.argv[3]
+        plan_filename = sys.argv[4]
+        # (the slots of unload / load / deliver properties must only be used if these properties were selected)
+        prop_ids = [PropId(prop_id) for prop_id in sys.argv[5:]]
+
+        test_pb_def = parse_problem_and_properties(base_filename, props_filename)
+        test_plan_def = parse_plan(plan_filename)
+        assert test_plan_def is not None
+
+        invalid = BelugaPlanSimulator(test_pb_def).validate(test_plan_def, complete=True, prop_ids=prop_ids)
+        if invalid is not None:
+            (k, reason) = invalid
+            print("invalid action {}: {} ({})".format(k, test_plan_def[k] if k < len(test_plan_def) else "end of plan", reason))
+            sys.exit(2)
+
+        print("valid plan")
+        sys.exit(0)
+
+    elif sys.argv[1] == "serve":
+
+        from server import BelugaSolveServer
+        from model_cache import default_model_cache
+
+        socket_path = None if len(sys.argv) < 3 else sys.argv[2]
+
+        num_available_swaps = int(os.environ.get('MAX_NUM_AVAILABLE_SWAPS', 10))
+        with BelugaSolveServer(num_available_swaps, default_model_cache(output_folder)) as solve_server:
+            if socket_path is None:
+                solve_server.serve_stdio()
+            else:
+                solve_server.serve_socket(socket_path)
+
+        sys.exit(0)
+
     else:
         print("UNKNOWN (OR NOT YET IMPLEMENTED) SUBCOMMAND {}".format(sys.argv[1]))
@@ -0,0 +1,50 @@
+#! /usr/bin/env python3
+
+import sys
+import os
+import time
+import tempfile
+import statistics
+import subprocess
+
+# Start-up time of `beluga.py` subcommands (cold starts, i.e. a new interpreter each time, whatever their exit code),
+# compared to plain Python and to importing `model` (and with it `unified_planning`), which the property / plan checking
+# subcommands do not need.
+#
+# Usage: ./bench_startup.py [num_runs] [path_to_problem_base_spec.json path_to_problem_properties_spec.json]
+
+def _time_runs(cmd: list[str], num_runs: int, cwd: str) -> list[float]:
+    res = []
+    for _ in range(num_runs):
+        start_time = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        res.append(time.perf_counter() - start_time)
+    return res
+
+if __name__ == "__main__":
+
+    repo_dir = os.path.abspath(os.path.dirname(__file__))
+
+    num_runs = 10 if len(sys.argv) < 2 else int(sys.argv[1])
+    base_filename = os.path.join(repo_dir, "example_problems/test03_base.json") if len(sys.argv) < 4 else os.path.abspath(sys.argv[2])
+    props_filename = os.path.join(repo_dir, "example_problems/test03_props.json") if len(sys.argv) < 4 else os.path.abspath(sys.argv[3])
+
+    # (outputs of the subcommands are written to a temporary directory, as is the (empty) plan checked)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plan_filename = os.path.join(tmp_dir, "plan.json")
+        with open(plan_filename, 'w') as f:
+            f.write("[]")
+
+        beluga = os.path.join(repo_dir, "beluga.py")
+        cmds = {
+            "python (bare)": [sys.executable, "-c", "pass"],
+            "check-props": [sys.executable, beluga, "check-props", base_filename, props_filename, plan_filename],
+            "check-props-stream": [sys.executable, beluga, "check-props-stream", base_filename, props_filename, plan_filename],
+            "check-plan": [sys.executable, beluga, "check-plan", base_filename, props_filename, plan_filename],
+            "import model": [sys.executable, "-c", "import sys; sys.path.insert(0, {}); import model".format(repr(repo_dir))],
+        }
+
+        print("{:<20} {:>10} {:>10}   ({} runs)".format("", "median (s)", "min (s)", num_runs))
+        for name, cmd in cmds.items():
+            runs = _time_runs(cmd, num_runs, tmp_dir)
+            print("{:<20} {:>10.3f} {:>10.3f}".format(name, statistics.median(runs), min(runs)))
@@ -1,17 +1,16 @@
+import copy
+
 from parser import *
 
 # vvv NOTE vvv !!!! Independent of model / planner !!!!
 
-def check_plan_properties(
-    properties: dict[PropId, dict[str, str]],
-    plan_def: BelugaPlanDef,
-    flights_in_order: list[str],
-    jig_types: dict[str, str],
-    racks_initial_jigs: dict[str, list[str]],
-    racks_size: dict[str, int],
-) -> list[str]:
+class BelugaPropertyChecker:
+    """
+    Checks properties on a plan fed one action at a time (see `push`), e.g. as it is read (see `iter_plan_actions`).
 
-    props_satisfied: dict[str, bool] = {}
+    Properties are indexed by what the actions they depend on are about (flight and position, (jig, rack), (jig, production line), ...),
+    so that each action only looks at the properties it affects, and only a bounded state (independent of the length of the plan) is kept.
+    """
 
     # addressed / checkable properties:
     #
@@ -28,242 +27,363 @@ def check_plan_properties(
     # [V] jig_to_rack_order
     # [V] jig_to_production_line_before_flight
 
-    props_unload_beluga: dict[tuple[str, str, int], str] = {}
-    props_load_beluga: dict[tuple[str, str, int], str] = {}
-    props_deliver_to_production_line: dict[tuple[str, str, int], str] = {}
-    props_rack_always_empty: dict[str, str] = {}
-    prop_at_least_one_rack_always_empty: str = ""
-    props_jig_always_placed_on_rack_size_leq: dict[tuple[str, int], str] = {}
-    props_num_swaps_used_leq: dict[int, str] = {}
-    props_jig_never_on_rack: dict[tuple[str, str], str] = {}
-    props_jig_only_if_ever_on_rack: dict[tuple[str, str], str] = {}
-    props_jig_to_production_line_order: dict[tuple[str, str, str, str], str] = {}
-    props_jig_to_rack_order: dict[tuple[str, str, str, str], str] = {}
-    props_jig_to_production_line_before_flight: dict[tuple[str, str, str], str] = {}
-
-    for (prop_id, prop_name_and_params) in properties.items():
-        prop_name = prop_name_and_params['name']
-        prop_params = prop_name_and_params['parameters']
-
-        if prop_name == "unload_beluga":
-            j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
-            props_unload_beluga[(j, b, ji)] = prop_id
-
-        elif prop_name == "load_beluga":
-            j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
-            props_load_beluga[(j, b, ji)] = prop_id
-
-        elif prop_name == "deliver_to_production_line":
-            j, pl, pli = prop_params[0], prop_params[1], int(prop_params[2])
-            props_deliver_to_production_line[(j, pl, pli)] = prop_id
-
-        elif prop_name == "rack_always_empty":
-            r = prop_params[0]
-            props_rack_always_empty[r] = prop_id
-
-        elif prop_name == "at_least_one_rack_always_empty":
-            prop_at_least_one_rack_always_empty = prop_id
-
-        elif prop_name == "jig_always_placed_on_rack_size_leq":
-            j, rs = prop_params[0], int(prop_params[1])
-            props_jig_always_placed_on_rack_size_leq[(j, rs)] = prop_id
-
-        elif prop_name == "num_swaps_used_leq":
-            ns = int(prop_params[0])
-            props_num_swaps_used_leq[ns] = prop_id
-
-        elif prop_name == "jig_never_on_rack":
-            j, r = prop_params[0], prop_params[1]
-            props_jig_never_on_rack[(j, r)] = prop_id
-
-        elif prop_name == "jig_only_if_ever_on_rack":
-            j, r = prop_params[0], prop_params[1]
-            props_jig_only_if_ever_on_rack[(j, r)] = prop_id
-
-        elif prop_name == "jig_to_production_line_order":
-            j1, pl1, j2, pl2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
-            props_jig_to_production_line_order[(j1, pl1, j2, pl2)] = prop_id
-
-        elif prop_name == "jig_to_rack_order":
-            j1, r1, j2, r2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
-            props_jig_to_rack_order[(j1, r1, j2, r2)] = prop_id
-
-        elif prop_name == "jig_to_production_line_before_flight":
-            j, pl, b = prop_params[0], prop_params[1], prop_params[2],
-            props_jig_to_production_line_before_flight[(j, pl, b)] = prop_id
+    def __init__(
+        self,
+        properties: dict[PropId, dict[str, str]],
+        flights_in_order: list[str],
+        jig_types: dict[str, str],
+        racks_initial_jigs: dict[str, list[str]],
+        racks_size: dict[str, int],
+    ):
+        self.properties = properties
+        self.flights_in_order = flights_in_order
+        self.flights_order = { b: i for i, b in enumerate(flights_in_order) }
+        self.jig_types = jig_types
+        self.racks_size = racks_size
+
+        # (a property is in `props_satisfied` once an action decided it, and otherwise gets its default value at the end of the plan)
+        self.props_satisfied: dict[PropId, bool] = {}
+        self.props_default: dict[PropId, bool] = {}
+
+        self.props_unload_beluga: dict[tuple[str, int], list[tuple[str, PropId]]] = {}
+        self.props_load_beluga: dict[tuple[str, int], list[tuple[str, PropId]]] = {}    # (value: jig or jig type)
+        self.props_unload_load_beluga_by_flight: dict[str, list[PropId]] = {}
+        self.props_deliver_to_production_line: dict[tuple[str, int], list[tuple[str, PropId]]] = {}
+        self.props_rack_always_empty: dict[str, list[PropId]] = {}
+        self.props_at_least_one_rack_always_empty: list[PropId] = []
+        self.props_jig_always_placed_on_rack_size_leq: dict[str, list[tuple[int, PropId]]] = {}
+        self.props_num_swaps_used_leq: list[tuple[int, PropId]] = []
+        self.props_jig_never_on_rack: dict[tuple[str, str], list[PropId]] = {}
+        self.props_jig_only_if_ever_on_rack: dict[str, list[tuple[str, PropId]]] = {}
+        self.props_jig_to_production_line_order: dict[tuple[str, str], list[tuple[PropId, bool]]] = {}  # (value: whether first)
+        self.props_jig_to_rack_order: dict[tuple[str, str], list[tuple[PropId, bool]]] = {}             # (value: whether first)
+        self.props_jig_to_production_line_before_flight: dict[tuple[str, str], list[tuple[PropId, str]]] = {}
+        self.props_jig_to_production_line_before_flight_by_flight: dict[str, list[PropId]] = {}
+
+        for (prop_id, prop_name_and_params) in properties.items():
+            prop_name = prop_name_and_params['name']
+            prop_params = prop_name_and_params['parameters']
+
+            if prop_name == "unload_beluga":
+                j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
+                self.props_unload_beluga.setdefault((b, ji), []).append((j, prop_id))
+                self.props_unload_load_beluga_by_flight.setdefault(b, []).append(prop_id)
+                self.props_default[prop_id] = False
+
+            elif prop_name == "load_beluga":
+                j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
+                self.props_load_beluga.setdefault((b, ji), []).append((j, prop_id))
+                self.props_unload_load_beluga_by_flight.setdefault(b, []).append(prop_id)
+                self.props_default[prop_id] = False
+
+            elif prop_name == "deliver_to_production_line":
+                j, pl, pli = prop_params[0], prop_params[1], int(prop_params[2])
+                self.props_deliver_to_production_line.setdefault((pl, pli), []).append((j, prop_id))
+                self.props_default[prop_id] = False
+
+            elif prop_name == "rack_always_empty":
+                r = prop_params[0]
+                self.props_rack_always_empty.setdefault(r, []).append(prop_id)
+                self.props_default[prop_id] = True
+
+            elif prop_name == "at_least_one_rack_always_empty":
+                self.props_at_least_one_rack_always_empty.append(prop_id)
+                self.props_default[prop_id] = True
+
+            elif prop_name == "jig_always_placed_on_rack_size_leq":
+                j, rs = prop_params[0], int(prop_params[1])
+                self.props_jig_always_placed_on_rack_size_leq.setdefault(j, []).append((rs, prop_id))
+                self.props_default[prop_id] = True
+
+            elif prop_name == "num_swaps_used_leq":
+                ns = int(prop_params[0])
+                self.props_num_swaps_used_leq.append((ns, prop_id))
+                self.props_default[prop_id] = True
+
+            elif prop_name == "jig_never_on_rack":
+                j, r = prop_params[0], prop_params[1]
+                self.props_jig_never_on_rack.setdefault((j, r), []).append(prop_id)
+                self.props_default[prop_id] = True
+
+            elif prop_name == "jig_only_if_ever_on_rack":
+                j, r = prop_params[0], prop_params[1]
+                self.props_jig_only_if_ever_on_rack.setdefault(j, []).append((r, prop_id))
+                self.props_default[prop_id] = True
+
+            elif prop_name == "jig_to_production_line_order":
+                j1, pl1, j2, pl2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
+                self.props_jig_to_production_line_order.setdefault((j1, pl1), []).append((prop_id, True))
+                self.props_jig_to_production_line_order.setdefault((j2, pl2), []).append((prop_id, False))
+                self.props_default[prop_id] = False
+
+            elif prop_name == "jig_to_rack_order":
+                j1, r1, j2, r2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
+                self.props_jig_to_rack_order.setdefault((j1, r1), []).append((prop_id, True))
+                self.props_jig_to_rack_order.setdefault((j2, r2), []).append((prop_id, False))
+                self.props_default[prop_id] = False
+
+            elif prop_name == "jig_to_production_line_before_flight":
+                j, pl, b = prop_params[0], prop_params[1], prop_params[2],
+                self.props_jig_to_production_line_before_flight.setdefault((j, pl), []).append((prop_id, b))
+                self.props_jig_to_production_line_before_flight_by_flight.setdefault(b, []).append(prop_id)
+                self.props_default[prop_id] = False
 
-        else:
-            assert False, "unknown property name {}".format(prop_name)
+            else:
+                assert False, "unknown property name {}".format(prop_name)
 
-    racks_thought_empty = set(racks_initial_jigs.keys())
-    racks_used_to_put_jig: dict[str, set[str]] = {}
+        self.racks_thought_empty = set(racks_initial_jigs.keys())
 
-    for r, jigs_list in racks_initial_jigs.items():
-        if len(jigs_list) > 0:
-            if r in props_rack_always_empty:
-                props_satisfied[props_rack_always_empty[r]] = False
-            for j in jigs_list:
-                if (j, r) in props_jig_never_on_rack:
-                    props_satisfied[props_jig_never_on_rack[(j,r)]] = False
-                racks_used_to_put_jig.setdefault(j, set()).add(r)
-                racks_thought_empty.discard(r)
+        self.unloads_encountered: dict[str, int] = {}    # key: beluga / flight name, value: number of unloads from beluga
+        self.loads_encountered: dict[str, int] = {}      # key: beluga / flight name, value: number of loads to beluga
+        self.delivers_encountered: dict[str, int] = {}   # key: production line name, value: number of jigs delivered to it
+        self.num_switches_to_next_flight = 0
 
-    unloads_encountered: dict[str, int] = {}    # key: beluga / flight name, value: number of unloads from beluga
-    loads_encountered: dict[str, int] = {}      # key: beluga / flight name, value: number of loads to beluga
-    delivers_encountered: dict[str, int] = {}   # key: production line name, value: number of jigs delivered to it
-    switches_to_next_flight_encountered: set[str] = set()   # values: beluga / flight name
+        self.num_swaps = 0
+        self.jigs_picked_up_from_rack: set[str] = set()  # (see `count_swaps_in_plan`)
 
-    jigs_delivered_to_pl: dict[str, set[str]] = {}
-    
-    swaps_picks_and_puts: dict[tuple[str, str, str], int] = {}
-
-    for act in plan_def:
+        for r, jigs_list in racks_initial_jigs.items():
+            for j in jigs_list:
+                self._on_rack(j, r)
+        if len(self.racks_thought_empty) == 0:
+            for prop_id in self.props_at_least_one_rack_always_empty:
+                self._decide(prop_id, False)
+
+    def _decide(self, prop_id: PropId, sat: bool):
+        # (the first action deciding a property decides it for good)
+        self.props_satisfied.setdefault(prop_id, sat)
+
+    def _on_rack(self, j: str, r: str):
+        for prop_id in self.props_rack_always_empty.get(r, []):
+            self._decide(prop_id, False)
+        for prop_id in self.props_jig_never_on_rack.get((j, r), []):
+            self._decide(prop_id, False)
+        for (rr, prop_id) in self.props_jig_only_if_ever_on_rack.get(j, []):
+            if rr != r:
+                self._decide(prop_id, False)
+        for (rs, prop_id) in self.props_jig_always_placed_on_rack_size_leq.get(j, []):
+            if self.racks_size[r] > rs:
+                self._decide(prop_id, False)
+        for (prop_id, first) in self.props_jig_to_rack_order.get((j, r), []):
+            self._decide(prop_id, first)
+        if r in self.racks_thought_empty:
+            self.racks_thought_empty.discard(r)
+            if len(self.racks_thought_empty) == 0:
+                for prop_id in self.props_at_least_one_rack_always_empty:
+                    self._decide(prop_id, False)
+
+    def push(self, act: BelugaPlanAction):
 
         if act.name == "unload_beluga":
-            j = act.params['j']
-            b = act.params['b']
-            ji = unloads_encountered.setdefault(b, 0)
-
-            prop_id = props_unload_beluga.get((j, b, ji), None)
-            if prop_id is not None:
-                props_satisfied[prop_id] = True
-
-            unloads_encountered[b] += 1
+            j, b = act.params['j'], act.params['b']
+            ji = self.unloads_encountered.get(b, 0)
+            for (jj, prop_id) in self.props_unload_beluga.get((b, ji), []):
+                self._decide(prop_id, jj == j)
+            self.unloads_encountered[b] = ji + 1
 
         elif act.name == "load_beluga":
-            j = act.params['j']
-            b = act.params['b']
-            ji = loads_encountered.setdefault(b, 0)
-
-            prop_id = props_load_beluga.get((j, b, ji), None)
-            if prop_id is not None:
-                props_satisfied[prop_id] = True
-
-            prop_id = props_load_beluga.get((jig_types[j], b, ji), None)
-            if prop_id is not None:
-                props_satisfied[prop_id] = True
-
-            loads_encountered[b] += 1
+            j, b = act.params['j'], act.params['b']
+            ji = self.loads_encountered.get(b, 0)
+            for (jj, prop_id) in self.props_load_beluga.get((b, ji), []):
+                self._decide(prop_id, jj in [j, self.jig_types[j]])
+            self.loads_encountered[b] = ji + 1
+            self.jigs_picked_up_from_rack.discard(j)
 
         elif act.name == "put_down_rack":
-            j, r, t, s = act.params['j'], act.params['r'], act.params['t'], act.params['s']
-            if r in props_rack_always_empty:
-                props_satisfied[props_rack_always_empty[r]] = False
-            if (j,r) in props_satisfied:
-                props_satisfied[props_jig_never_on_rack[(j,r)]] = False
-            racks_thought_empty.discard(r)
-            racks_used_to_put_jig.setdefault(j, set()).add(r)
-
-            for ((j1, r1, j2, r2), prop_id) in props_jig_to_rack_order.items():
-                if j == j1 and r == r1:
-                    props_satisfied[prop_id] = (j2 not in racks_used_to_put_jig or r2 not in racks_used_to_put_jig[j2])
-                if j == j2 and r == r2:
-                    if (j1 in racks_used_to_put_jig and r1 in racks_used_to_put_jig[r1]):
-                        assert props_satisfied[prop_id]
-                    else:
-                        props_satisfied[prop_id] = False
-            
-            if (j, t, s) in swaps_picks_and_puts:
-                if swaps_picks_and_puts[(j, t, s)]%2 == 0:
-                    swaps_picks_and_puts[(j, t, s)] += 1
+            j, r = act.params['j'], act.params['r']
+            self._on_rack(j, r)
+            if j in self.jigs_picked_up_from_rack:
+                self.num_swaps += 1
+                for (ns, prop_id) in self.props_num_swaps_used_leq:
+                    if self.num_swaps > ns:
+                        self._decide(prop_id, False)
+            self.jigs_picked_up_from_rack.discard(j)
 
         elif act.name == "pick_up_rack":
-            j, r, t, s = act.params['j'], act.params['r'], act.params['t'], act.params['s']
-            if (j, t, s) in swaps_picks_and_puts:
-                assert swaps_picks_and_puts[(j, t, s)]%2 != 0
-                swaps_picks_and_puts[(j, t, s)] += 1
-            else:
-                swaps_picks_and_puts[(j, t, s)] = 0
+            self.jigs_picked_up_from_rack.add(act.params['j'])
 
         elif act.name == "deliver_to_hangar":
-            j = act.params['j']
-            pl = act.params['pl']
-            pli = delivers_encountered.setdefault(pl, 0)
-
-            prop_id = props_deliver_to_production_line.get((j, pl, pli), None)
-            if prop_id is not None:
-                props_satisfied[prop_id] = True
-
-            delivers_encountered[pl] += 1
+            j, pl = act.params['j'], act.params['pl']
+            pli = self.delivers_encountered.get(pl, 0)
+            for (jj, prop_id) in self.props_deliver_to_production_line.get((pl, pli), []):
+                self._decide(prop_id, jj == j)
+            self.delivers_encountered[pl] = pli + 1
 
-            jigs_delivered_to_pl.setdefault(pl, set()).add(j)
+            for (prop_id, first) in self.props_jig_to_production_line_order.get((j, pl), []):
+                self._decide(prop_id, first)
 
-            for ((j1, pl1, j2, pl2), prop_id) in props_jig_to_production_line_order.items():
-                if j == j1 and pl == pl1:
-                    props_satisfied[prop_id] = (pl2 not in jigs_delivered_to_pl or j2 not in jigs_delivered_to_pl[pl2])
-                if j == j2 and pl == pl2:
-                    if (pl1 in jigs_delivered_to_pl and j1 in jigs_delivered_to_pl[pl1]):
-                        assert props_satisfied[prop_id]
-                    else:
-                        props_satisfied[prop_id] = False
+            for (prop_id, b) in self.props_jig_to_production_line_before_flight.get((j, pl), []):
+                # (flight `b` is over once the plan switched to the next one: jigs are never delivered before an unknown flight)
+                self._decide(prop_id, self.flights_order.get(b, -1) > self.num_switches_to_next_flight)
 
-            for (jj, pll, b) in props_jig_to_production_line_before_flight:
-                if jj == j and pll == pl:
-                    prop_id = props_jig_to_production_line_before_flight[(j, pl, b)]
-                    props_satisfied[prop_id] = b not in switches_to_next_flight_encountered
+            self.jigs_picked_up_from_rack.discard(j)
 
         elif act.name == "get_from_hangar":
             pass
 
         elif act.name == "switch_to_next_beluga":
-            # switches_to_next_flight_encountered.add(beluga_index_from_name(act.params['b']))
-            switches_to_next_flight_encountered.add(flights_in_order[len(switches_to_next_flight_encountered) + 1])
+            # (unloads from / loads into the flight left that were not made by then never will be)
+            for prop_id in self.props_unload_load_beluga_by_flight.get(self.flights_in_order[self.num_switches_to_next_flight], []):
+                self._decide(prop_id, False)
+            self.num_switches_to_next_flight += 1
+            # (jigs not delivered yet are delivered after the arrival of the new flight)
+            for prop_id in self.props_jig_to_production_line_before_flight_by_flight.get(self.flights_in_order[self.num_switches_to_next_flight], []):
+                self._decide(prop_id, False)
 
         else:
             assert False, "unknown action name {}".format(act.name)
 
-    num_swaps_in_plan = sum(int(n / 2) for n in swaps_picks_and_puts.values())
-    assert num_swaps_in_plan == int(num_swaps_in_plan)
+    def satisfied_properties(self) -> list[PropId]:
+        """
+        Properties satisfied by the plan, assuming the actions pushed so far are all of it.
+        """
+        props_satisfied = { **self.props_default, **self.props_satisfied }
+        return [prop_id for prop_id in self.properties if props_satisfied[prop_id]]
+
+    # (only the running state is copied: property indexes are never modified, and are shared)
+    _STATE_ATTRS = [
+        "props_satisfied",
+        "racks_thought_empty",
+        "unloads_encountered",
+        "loads_encountered",
+        "delivers_encountered",
+        "num_switches_to_next_flight",
+        "num_swaps",
+        "jigs_picked_up_from_rack",
+    ]
+
+    def snapshot(self) -> dict:
+        return { a: copy.copy(getattr(self, a)) for a in self._STATE_ATTRS }
+
+    def restore(self, snapshot: dict):
+        for a, v in snapshot.items():
+            setattr(self, a, copy.copy(v))
 
-    assert all(prop_id not in props_satisfied or props_satisfied[prop_id] == True for prop_id in props_unload_beluga.values())
-    for prop_id in props_unload_beluga.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
-
-    assert all(prop_id not in props_satisfied or props_satisfied[prop_id] == True for prop_id in props_load_beluga.values())
-    for prop_id in props_load_beluga.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
-
-    assert all(prop_id not in props_satisfied or props_satisfied[prop_id] == True for prop_id in props_deliver_to_production_line.values())
-    for prop_id in props_deliver_to_production_line.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
-
-    assert all(prop_id not in props_satisfied or props_satisfied[prop_id] == False for prop_id in props_rack_always_empty.values())
-    for prop_id in props_rack_always_empty.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = True
-
-    assert all(prop_id not in props_satisfied or props_satisfied[prop_id] == False for prop_id in props_jig_never_on_rack.values())
-    for prop_id in props_jig_never_on_rack.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = True
-
-    props_satisfied[prop_at_least_one_rack_always_empty] = len(racks_thought_empty) > 0
-
-    for ((j, r), prop_id) in props_jig_only_if_ever_on_rack.items():
-        props_satisfied[prop_id] = (j not in racks_used_to_put_jig or len(racks_used_to_put_jig[j]) <= 1)
-
-    for ((j, rs), prop_id) in props_jig_always_placed_on_rack_size_leq.items():
-        props_satisfied[prop_id] = (
-            j not in racks_used_to_put_jig
-            or max(racks_size[r] for r in racks_used_to_put_jig[j]) <= rs
-        )
-
-    for ns, prop_id in props_num_swaps_used_leq.items():
-        props_satisfied[prop_id] = num_swaps_in_plan <= ns
+def check_plan_properties(
+    properties: dict[PropId, dict[str, str]],
+    plan_def: BelugaPlanDef,
+    flights_in_order: list[str],
+    jig_types: dict[str, str],
+    racks_initial_jigs: dict[str, list[str]],
+    racks_size: dict[str, int],
+) -> list[str]:
 
-    for prop_id in props_jig_to_production_line_order.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
+    checker = BelugaPropertyChecker(properties, flights_in_order, jig_types, racks_initial_jigs, racks_size)
+    for act in plan_def:
+        checker.push(act)
+    return checker.satisfied_properties()
+
+PROP_SATISFIED = "satisfied"
+PROP_VIOLATED = "violated"
+PROP_UNDECIDED = "undecided"
+
+class PropertyMonitor(BelugaPropertyChecker):
+    """
+    Status of properties as a plan is executed, one action at a time: properties are satisfied / violated
+    once no continuation of the plan can change that, and undecided otherwise
+    (e.g. `rack_always_empty` until the rack is used, or `jig_to_rack_order` until either jig is put down on its rack).
+
+    `push` returns the properties whose status changed, and `snapshot` / `restore` allow branching continuations of the plan.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.transitions: list[tuple[PropId, str]] = []
+        super().__init__(*args, **kwargs)
+
+    def _decide(self, prop_id: PropId, sat: bool):
+        if prop_id not in self.props_satisfied:
+            self.transitions.append((prop_id, PROP_SATISFIED if sat else PROP_VIOLATED))
+        super()._decide(prop_id, sat)
+
+    def push(self, act: BelugaPlanAction) -> list[tuple[PropId, str]]:
+        self.transitions = []
+        super().push(act)
+        return self.transitions
+
+    def status(self) -> dict[PropId, str]:
+        return {
+            prop_id: PROP_UNDECIDED if prop_id not in self.props_satisfied
+            else PROP_SATISFIED if self.props_satisfied[prop_id] else PROP_VIOLATED
+            for prop_id in self.properties
+        }
+
+def _property_checker_args(
+    pb_def: BelugaProblemDef,
+    properties: dict[PropId, dict] | None,
+) -> tuple:
+    index = pb_def.index
+    return (
+        properties if properties is not None else pb_def.properties_definitions(),
+        sorted(index.flights_order, key=index.flights_order.__getitem__),
+        { jn: j.type for jn, j in index.jigs.items() },
+        { rn: r.jigs for rn, r in index.racks.items() },
+        { rn: r.size for rn, r in index.racks.items() },
+    )
+
+def property_monitor_for_problem(
+    pb_def: BelugaProblemDef,
+    properties: dict[PropId, dict] | None = None,
+) -> PropertyMonitor:
+    """
+    A `PropertyMonitor`, taking what it needs from a parsed problem definition.
+    If `properties` is not given, all the properties of the problem definition are monitored.
+    """
+    return PropertyMonitor(*_property_checker_args(pb_def, properties))
+
+def property_checker_for_problem(
+    pb_def: BelugaProblemDef,
+    properties: dict[PropId, dict] | None = None,
+) -> BelugaPropertyChecker:
+    """
+    A `BelugaPropertyChecker`, taking what it needs from a parsed problem definition.
+    If `properties` is not given, all the properties of the problem definition are checked.
+    """
+    return BelugaPropertyChecker(*_property_checker_args(pb_def, properties))
+
+def check_plan_properties_for_problem(
+    pb_def: BelugaProblemDef,
+    plan_def: BelugaPlanDef,
+    properties: dict[PropId, dict] | None = None,
+) -> list[str]:
+    """
+    Same as `check_plan_properties`, taking what it needs from a parsed problem definition.
+    If `properties` is not given, all the properties of the problem definition are checked.
+    """
+    checker = property_checker_for_problem(pb_def, properties)
+    for act in plan_def:
+        checker.push(act)
+    return checker.satisfied_properties()
 
-    for prop_id in props_jig_to_rack_order.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
+def check_plan_file_properties(
+    pb_def: BelugaProblemDef,
+    plan_filename: str,
+    properties: dict[PropId, dict] | None = None,
+) -> list[str]:
+    """
+    Same as `check_plan_properties_for_problem`, reading the plan (JSON array or NDJSON) as it is checked,
+    rather than parsing all of it first.
+    """
+    checker = property_checker_for_problem(pb_def, properties)
+    with open(plan_filename) as f:
+        for act in iter_plan_actions(f):
+            checker.push(act)
+    return checker.satisfied_properties()
+
+def count_swaps_in_plan(plan_def: BelugaPlanDef) -> int:
+    """
+    Number of swaps of a plan: put-downs of jigs that were (last) picked up from a rack,
+    i.e. that did not go to a flight or a production line in between.
+    """
+    num_swaps = 0
+    jigs_picked_up_from_rack: set[str] = set()
 
-    for prop_id in props_jig_to_production_line_before_flight.values():
-        if prop_id not in props_satisfied:
-            props_satisfied[prop_id] = False
+    for act in plan_def:
+        if act.name == "pick_up_rack":
+            jigs_picked_up_from_rack.add(act.params['j'])
+        elif act.name == "put_down_rack":
+            if act.params['j'] in jigs_picked_up_from_rack:
+                num_swaps += 1
+            jigs_picked_up_from_rack.discard(act.params['j'])
+        elif act.name in ["load_beluga", "deliver_to_hangar"]:
+            jigs_picked_up_from_rack.discard(act.params['j'])
 
-    return [prop for prop, prop_sat in props_satisfied.items() if prop_sat]
+    return num_swaps
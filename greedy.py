@@ -0,0 +1,257 @@
+from parser import *
+from checker import *
+from simulator import *
+
+# Rule-based (greedy) planner, as a fast path ahead of the engine (independent of model / planner).
+#
+# Flights are processed in order: incoming jigs are unloaded and put down on the emptiest rack they fit in
+# (among the ones they are the least in the way on, given the order in which jigs leave racks),
+# outgoing jigs are the empty jigs (of the right type) with the fewest jigs in front of them, and jigs are delivered
+# (and their empty jig put back on a rack) once they are next in their production line's schedule.
+# Jigs in the way are moved to another rack (i.e. swapped). Deliveries and loads are made as early as possible (they free
+# room on racks), and the ones that cannot be made yet (i.e. for lack of a rack to move jigs in the way to) are retried later.
+# Only the base slots of flights / production lines, and those of the selected unload / load / deliver properties, are
+# planned for. Plans are in the same format as `solve_with_properties`'.
+
+class _GreedyFailure(Exception):
+    pass
+
+class _GreedyDeferred(_GreedyFailure):
+    # (raised before anything is done about the jig, which may then be retried later)
+    pass
+
+class BelugaGreedyPlanner:
+
+    def __init__(
+        self,
+        pb_def: BelugaProblemDef,
+        prop_ids: list[PropId],
+        max_num_swaps: int,
+    ):
+        self.pb_def = pb_def
+        self.max_num_swaps = max_num_swaps
+
+        index = pb_def.index
+        selected = set(prop_ids)
+        self.incoming = { fl.name: [j for _, j in sorted(index.flight_incoming(fl.name, selected).items())] for fl in pb_def.flights }
+        self.outgoing = { fl.name: [x for _, x in sorted(index.flight_outgoing(fl.name, selected).items())] for fl in pb_def.flights }
+        self.schedules = { pl.name: [j for _, j in sorted(index.pl_schedule(pl.name, selected).items())] for pl in pb_def.production_lines }
+        self.jig_scheduled = { j: (pl_name, i) for pl_name, schedule in self.schedules.items() for i, j in enumerate(schedule) }
+
+        self.num_swaps = 0
+        self.state = BelugaState.initial(pb_def)
+        self.plan_as_json: list[dict[str, str]] = []
+
+    def _do(self, name: str, **params: str):
+        act = BelugaPlanAction(name, params)
+        self.state.apply(act)
+        self.plan_as_json.append({ "name": name, **params })
+
+    def _jig_size(self, j: str) -> int:
+        jig_type = self.pb_def.get_jig_type(self.pb_def.get_jig(j).type)
+        return jig_type.size_empty if self.state.jig_empty[j] else jig_type.size_loaded
+
+    def _rack_free_space(self, r: str) -> int:
+        return self.pb_def.index.racks[r].size - sum(self._jig_size(j) for j in self.state.racks[r])
+
+    def _free_trailer(self, side: str) -> str:
+        trailers = self.pb_def.trailers_beluga if side == SIDE_BELUGA_NAME else self.pb_def.trailers_factory
+        for t in trailers:
+            if self.state.trailers[t.name] is None:
+                return t.name
+        raise _GreedyFailure("no free trailer on side {}".format(side))
+
+    def _free_hangar(self) -> str:
+        for h in self.pb_def.hangars:
+            if self.state.hangars[h.name] is None:
+                return h.name
+        raise _GreedyFailure("no free hangar")
+
+    def _delivery_rank(self, j: str) -> float:
+        (pl_name, i) = self.jig_scheduled.get(j, ("", None))
+        if i is None or self.state.jig_empty[j]:
+            return float('inf')
+        return i - self.state.num_delivered[pl_name]
+
+    def _num_blocked(self, j: str, r: str, side: str) -> int:
+        """
+        Number of jigs of the rack that would be in the way of the jig (or the jig in their way), if it were put down on it.
+        Full jigs leave racks from the factory side (to be delivered), empty ones from the beluga side (to be loaded).
+        """
+        res = 0
+        for jj in self.state.racks[r]:
+            if side == SIDE_BELUGA_NAME:
+                if self.state.jig_empty[jj] or (not self.state.jig_empty[j] and self._delivery_rank(jj) > self._delivery_rank(j)):
+                    res += 1
+            else:
+                if not self.state.jig_empty[jj] and (self.state.jig_empty[j] or self._delivery_rank(jj) < self._delivery_rank(j)):
+                    res += 1
+        return res
+
+    def _best_rack(self, j: str, side: str, excluded_rack: str | None = None) -> str | None:
+        # (rack the jig fits in and is the least in the way on, the emptiest one first)
+        fitting = [
+            (self._num_blocked(j, r.name, side), -self._rack_free_space(r.name), r.name) for r in self.pb_def.racks
+            if r.name != excluded_rack and self._rack_free_space(r.name) >= self._jig_size(j)
+        ]
+        return min(fitting)[2] if len(fitting) > 0 else None
+
+    def _jigs_in_front(self, j: str, side: str) -> list[str]:
+        # (nearest to the side first)
+        rack_jigs = self.state.racks[self.state.jig_location[j][1]]
+        k = rack_jigs.index(j)
+        return rack_jigs[:k] if side == SIDE_BELUGA_NAME else list(reversed(rack_jigs[k+1:]))
+
+    def _put_down(self, j: str, t: str, side: str):
+        r = self._best_rack(j, side)
+        if r is None:
+            raise _GreedyFailure("no rack to put {} on".format(j))
+        self._do("put_down_rack", j=j, t=t, r=r, s=side)
+
+    def _pick_up(self, j: str, side: str) -> str:
+        """
+        Picks up a jig (on a rack) from the given side, swapping the jigs in front of it to other racks first.
+        Returns the trailer the jig is on.
+        """
+        r = self.state.jig_location[j][1]
+        for jj in self._jigs_in_front(j, side):
+            if self.num_swaps >= self.max_num_swaps:
+                raise _GreedyFailure("more than {} swaps needed".format(self.max_num_swaps))
+            # (checked before picking it up: the jigs already moved out of the way are on racks, and the jig may be retried)
+            rr = self._best_rack(jj, side, r)
+            if rr is None:
+                raise _GreedyDeferred("no rack to move {} (in front of {}) to".format(jj, j))
+            t = self._free_trailer(side)
+            self._do("pick_up_rack", j=jj, t=t, r=r, s=side)
+            self._do("put_down_rack", j=jj, t=t, r=rr, s=side)
+            self.num_swaps += 1
+        t = self._free_trailer(side)
+        self._do("pick_up_rack", j=j, t=t, r=r, s=side)
+        return t
+
+    def _put_away_initial_jigs(self):
+        for t in self.pb_def.trailers_beluga:
+            if t.jig is not None:
+                self._put_down(t.jig, t.name, SIDE_BELUGA_NAME)
+        for t in self.pb_def.trailers_factory:
+            if t.jig is not None:
+                self._put_down(t.jig, t.name, SIDE_FACTORY_NAME)
+        for h in self.pb_def.hangars:
+            if h.jig is not None:
+                t = self._free_trailer(SIDE_FACTORY_NAME)
+                self._do("get_from_hangar", j=h.jig, h=h.name, t=t)
+                self._put_down(h.jig, t, SIDE_FACTORY_NAME)
+
+    def _deliver_all_available(self):
+        progress = True
+        while progress:
+            progress = False
+            for pl in self.pb_def.production_lines:
+                schedule = self.schedules[pl.name]
+                i = self.state.num_delivered[pl.name]
+                if i >= len(schedule):
+                    continue
+                j = schedule[i]
+                if self.state.jig_location.get(j, ("", ""))[0] != "rack" or self.state.jig_empty[j]:
+                    continue
+                try:
+                    t = self._pick_up(j, SIDE_FACTORY_NAME)
+                except _GreedyDeferred:
+                    continue
+                h = self._free_hangar()
+                self._do("deliver_to_hangar", j=j, h=h, t=t, pl=pl.name)
+                # (the hangar is freed right away, the empty jig being put back on a rack)
+                t = self._free_trailer(SIDE_FACTORY_NAME)
+                self._do("get_from_hangar", j=j, h=h, t=t)
+                self._put_down(j, t, SIDE_FACTORY_NAME)
+                progress = True
+
+    def _outgoing_jig(self, jig_or_jig_type_name: str) -> str | None:
+        if jig_or_jig_type_name in self.pb_def.index.jigs:
+            candidates = [jig_or_jig_type_name]
+        else:
+            candidates = [j.name for j in self.pb_def.jigs if j.type == jig_or_jig_type_name]
+        candidates = [
+            j for j in candidates
+            if self.state.jig_location.get(j, ("", ""))[0] == "rack" and self.state.jig_empty[j]
+        ]
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda j: len(self._jigs_in_front(j, SIDE_BELUGA_NAME)))
+
+    def _load_all_available(self, flight_name: str, outgoing: list[str]):
+        # (loads are made in order, as long as there is an empty jig to load)
+        while len(outgoing) > 0:
+            j = self._outgoing_jig(outgoing[0])
+            if j is None:
+                return
+            try:
+                t = self._pick_up(j, SIDE_BELUGA_NAME)
+            except _GreedyDeferred:
+                return
+            self._do("load_beluga", j=j, b=flight_name, t=t)
+            outgoing.pop(0)
+
+    def plan(self) -> list[dict[str, str]]:
+        self._put_away_initial_jigs()
+
+        for flight_index, fl in enumerate(self.pb_def.flights):
+            if flight_index > 0:
+                self._do("switch_to_next_beluga")
+
+            outgoing = list(self.outgoing[fl.name])
+
+            # (delivered jigs take less room, and loaded ones none)
+            self._deliver_all_available()
+            self._load_all_available(fl.name, outgoing)
+
+            for j in self.incoming[fl.name]:
+                if self._best_rack(j, SIDE_BELUGA_NAME) is None:
+                    self._deliver_all_available()
+                    self._load_all_available(fl.name, outgoing)
+                t = self._free_trailer(SIDE_BELUGA_NAME)
+                self._do("unload_beluga", j=j, b=fl.name, t=t)
+                self._put_down(j, t, SIDE_BELUGA_NAME)
+
+            # (delivered jigs are empty)
+            self._deliver_all_available()
+            self._load_all_available(fl.name, outgoing)
+            if len(outgoing) > 0:
+                raise _GreedyFailure("no empty jig to load for {}".format(outgoing[0]))
+
+        self._deliver_all_available()
+        for (pl_name, schedule) in self.schedules.items():
+            if self.state.num_delivered[pl_name] < len(schedule):
+                raise _GreedyFailure("could not deliver {} to {}".format(schedule[self.state.num_delivered[pl_name]], pl_name))
+
+        return self.plan_as_json
+
+def solve_greedy(
+    pb_def: BelugaProblemDef,
+    prop_ids: list[PropId],
+    max_num_swaps: int,
+) -> list[dict[str, str]] | None:
+    """
+    Returns a plan satisfying `prop_ids` found by the greedy planner, or `None`.
+    """
+    try:
+        plan_as_json = BelugaGreedyPlanner(pb_def, prop_ids, max_num_swaps).plan()
+    except _GreedyFailure as e:
+        print("greedy planner failed: {}".format(e))
+        return None
+
+    plan_def = plan_def_from_json(plan_as_json)
+
+    # (the plan is replayed from scratch, independently of how it was built)
+    invalid = BelugaPlanSimulator(pb_def).validate(plan_def, complete=True, prop_ids=prop_ids)
+    if invalid is not None:
+        print("greedy planner failed: invalid action {} ({})".format(invalid[0], invalid[1]))
+        return None
+
+    satisfied_prop_ids = set(check_plan_properties_for_problem(pb_def, plan_def))
+    violated_prop_ids = [prop_id for prop_id in prop_ids if prop_id not in satisfied_prop_ids]
+    if len(violated_prop_ids) > 0:
+        print("greedy planner failed: properties {} violated".format(violated_prop_ids))
+        return None
+
+    return plan_as_json
@@ -1,14 +1,24 @@
 import sys
 import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
 from unified_planning.grpc.proto_writer import ProtobufWriter
+from unified_planning.grpc.proto_reader import ProtobufReader
+import unified_planning.grpc.generated.unified_planning_pb2 as proto
 
 import unified_planning.shortcuts as up
 
 from unified_planning.model.scheduling.scheduling_problem import SchedulingProblem
 from unified_planning.model.scheduling.activity import Activity
 from unified_planning.plans import Schedule
+from unified_planning.engines import PlanGenerationResultStatus
 
 from parser import *
+from checker import *
+from analysis import *
+from solution_cache import *
 
 def serialize_problem(pb: up.Problem, filename: str):
     writer = ProtobufWriter()
@@ -17,15 +27,51 @@ def serialize_problem(pb: up.Problem, filename: str):
     with open(filename, "wb") as file:
         file.write(msg.SerializeToString())
 
-def solve_problem(pb: SchedulingProblem, timeout:float|None) -> Schedule: # type: ignore
-    with up.OneshotPlanner(name="aries") as planner:
-        result = planner.solve( # type: ignore
+def deserialize_problem(filename: str) -> SchedulingProblem:
+    msg = proto.Problem()
+    with open(filename, "rb") as file:
+        msg.ParseFromString(file.read())
+    reader = ProtobufReader()
+    return reader.convert(msg)
+
+def _source_digest(filename: str) -> str:
+    with open(filename, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+# (digest of the source of this module: whatever was derived from a model built by other code is not reused)
+MODEL_SOURCE_DIGEST = _source_digest(__file__)
+
+# (ids of the problems to which assumptions are currently added in place, see `BelugaModelOptSched._assumptions`)
+_problems_with_assumptions: set[int] = set()
+_problems_with_assumptions_lock = threading.Lock()
+
+def solve_problem(pb: SchedulingProblem, timeout:float|None, planner=None) -> Schedule: # type: ignore
+    """
+    If `planner` is given (an already opened `up.OneshotPlanner`), it is reused rather than
+    starting up a new engine, which is what long-lived callers (e.g. the solve server) want.
+    """
+    if planner is None:
+        with up.OneshotPlanner(name="aries") as planner:
+            return solve_problem(pb, timeout, planner)
+    result = planner.solve( # type: ignore
+        pb,
+        timeout=timeout,
+        output_stream=sys.stdout,
+    )
+    return result.plan
+
+def solve_problem_anytime(pb: SchedulingProblem, timeout:float|None):
+    """
+    Yields `(plan, proven_optimal)` for each (better) plan found by the engine on an optimization problem.
+    """
+    with up.AnytimePlanner(name="aries") as planner:
+        for result in planner.get_solutions( # type: ignore
             pb,
             timeout=timeout,
             output_stream=sys.stdout,
-        )
-        plan = result.plan
-    return plan
+        ):
+            if result.plan is not None:
+                yield (result.plan, result.status == PlanGenerationResultStatus.SOLVED_OPTIMALLY)
 
 class BelugaModelOptSched:
 
@@ -35,7 +81,19 @@ class BelugaModelOptSched:
         name: str,
         num_available_swaps_margin: int,
         ref_plan_def: BelugaPlanDef | None,
+        chain_precedences: bool = False,
+        symmetry_breaking: bool = False,
     ):
+        """
+        If `chain_precedences` is set, the precedences between the activities of a sequence (flights' unloads / loads,
+        production lines' deliveries, ...) are only stated between consecutive activities (see `_add_precedences`),
+        instead of between every pair of them.
+
+        If `symmetry_breaking` is set, interchangeable trailers, hangars and racks are used in a fixed order
+        (see `_add_symmetry_breaking`).
+
+        If `ref_plan_def` is given, `num_available_swaps_margin` is a margin over the number of swaps of that (reference) plan.
+        """
         # # #
 
         self.pb: SchedulingProblem
@@ -104,6 +162,11 @@ class BelugaModelOptSched:
 
         self.num_flights: int
 
+        self.chain_precedences = chain_precedences
+        self.num_avoided_precedence_constraints = 0
+        self.num_pruned_domain_values = 0
+        self.symmetry_breaking = symmetry_breaking
+
         self.all_proceeds_to_next_flight: list[tuple[str, Activity]] = []
         self.all_unloads_w_putdowns: dict[tuple[str, str, int], tuple[Activity, Activity]] = {}
         self.all_loads_w_pickups: dict[tuple[str, str, int], tuple[Activity, Activity]] = {}
@@ -114,6 +177,15 @@ class BelugaModelOptSched:
         self.all_putdowns: list[Activity] = []
         self.all_pickups: list[Activity] = []
 
+        # parameters of each activity, or the values substituted for them when known at build time (see `_add_args`)
+        self._activity_args: dict[str, dict[str, up.Object | up.Parameter]] = {}
+
+        # jig each put-down is bound to at build time (swap put-downs are not bound to any jig)
+        self.putdowns_jig: dict[str, str | None] = {}
+
+        self.delivers_by_jig_and_pl: dict[tuple[str, str], Activity]
+        self.proceeds_by_flight: dict[str, Activity]
+
         # # #
 
         self.num_used_swaps: up.Parameter
@@ -124,6 +196,11 @@ class BelugaModelOptSched:
 
         # # #
 
+        self.solution_cache = None
+        self._problem_hash: str | None = None
+
+        # # #
+
         self.pb_def = pb_def
         self.num_flights = len(pb_def.flights)
 
@@ -141,41 +218,51 @@ class BelugaModelOptSched:
         self._add_flights_loads_w_pickups()
         self._add_pls_deliveries_w_pickups_and_retrievals_w_opt_putdowns()
 
-        # if ref_plan_def is not None:
-        #     # num_swaps_used_in_ref_plan = self._get_number_of_swaps_in_reference_plan(ref_plan_def)
-        #     # self.num_available_swaps = num_swaps_used_in_ref_plan + num_available_swaps_margin
+        if ref_plan_def is not None:
+            num_swaps_used_in_ref_plan = count_swaps_in_plan(ref_plan_def)
+            self.num_available_swaps = num_swaps_used_in_ref_plan + num_available_swaps_margin
         self._add_swaps()
 
         self._add_trailers_initial_jigs_opt_putdowns()
         self._add_hangars_initial_jigs_retrievals_w_opt_putdowns()
         self._add_opt_pickup_for_each_jig_last_non_swap()
+
+        self._restrict_domains()
+
+        if self.symmetry_breaking:
+            self._add_symmetry_breaking()
+
+        if self.chain_precedences:
+            print("precedence constraints avoided: {}".format(self.num_avoided_precedence_constraints))
+
+        # # #
+
+        self._index_activities()
+
         # # #
 
         for (j_name, flight_name, i), (unload_a, _) in self.all_unloads_w_putdowns.items():
             pres_val = up.TRUE()
-            for prop_id, (jj, bb, ii) in self.pb_def.props_unload_beluga:
-                if (j_name == jj and flight_name == bb and i == ii):
-                    self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_unload_{j_name}_{flight_name}_{i}", up.BoolType())
-                    pres_val = self.properties[prop_id]
-                    break
+            prop_id = self.pb_def.index.props_unload_beluga.get((j_name, flight_name, i), None)
+            if prop_id is not None:
+                self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_unload_{j_name}_{flight_name}_{i}", up.BoolType())
+                pres_val = self.properties[prop_id]
             self.pb.add_constraint(up.Iff(unload_a.present, pres_val))
 
         for (j_or_j_type_name, flight_name, i), (load_a, _) in self.all_loads_w_pickups.items():
             pres_val = up.TRUE()
-            for prop_id, (jj, bb, ii) in self.pb_def.props_load_beluga:
-                if (j_or_j_type_name == jj and flight_name == bb and i == ii):
-                    self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_load_{j_or_j_type_name}_{flight_name}_{i}", up.BoolType())
-                    pres_val = self.properties[prop_id]
-                    break
+            prop_id = self.pb_def.index.props_load_beluga.get((j_or_j_type_name, flight_name, i), None)
+            if prop_id is not None:
+                self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_load_{j_or_j_type_name}_{flight_name}_{i}", up.BoolType())
+                pres_val = self.properties[prop_id]
             self.pb.add_constraint(up.Iff(load_a.present, pres_val))
 
         for (j_name, pl_name, i), (deliver_a, _) in self.all_delivers_w_pickups.items():
             pres_val = up.TRUE()
-            for prop_id, (jj, pl, ii) in self.pb_def.props_deliver_to_production_line:
-                if (j_name == jj and pl_name == pl and i == ii):
-                    self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_deliver_{j_name}_{pl_name}_{i}", up.BoolType())
-                    pres_val = self.properties[prop_id]
-                    break
+            prop_id = self.pb_def.index.props_deliver_to_production_line.get((j_name, pl_name, i), None)
+            if prop_id is not None:
+                self.properties[prop_id] = self.pb.add_variable(f"{'hard_' if prop_id in self.pb_def.props_ids_hard_list else ''}prop_{prop_id}_deliver_{j_name}_{pl_name}_{i}", up.BoolType())
+                pres_val = self.properties[prop_id]
             self.pb.add_constraint(up.Iff(deliver_a.present, pres_val))
 
         assert all(prop_id in self.properties for (prop_id, _) in self.pb_def.props_unload_beluga)
@@ -213,92 +300,430 @@ class BelugaModelOptSched:
             if v.name.startswith("hard_prop_"):
                 self.pb.add_constraint(v)
 
+    @property
+    def problem_hash(self) -> str:
+        if self._problem_hash is None:
+            # (results cached by other versions of the model, e.g. wrongly infeasible ones while assumptions were not retracted, are discarded)
+            self._problem_hash = problem_def_digest(self.pb_def)+"_"+str(self.num_available_swaps)+"_"+SOLUTION_CACHE_VERSION+"_"+MODEL_SOURCE_DIGEST[:16]
+        return self._problem_hash
+
+    def serialized_metadata(self) -> dict:
+        """
+        What is needed (along with the serialized problem) to restore this model without rebuilding it:
+        names of the variables and activities referred to by the model, rather than the objects themselves.
+        """
+        return {
+            "name": self.pb.name,
+            "num_available_swaps": self.num_available_swaps,
+            "activities_uid_counter": self._activities_uid_counter,
+            "chain_precedences": self.chain_precedences,
+            "num_avoided_precedence_constraints": self.num_avoided_precedence_constraints,
+            "num_pruned_domain_values": self.num_pruned_domain_values,
+            "symmetry_breaking": self.symmetry_breaking,
+            "num_used_swaps": self.num_used_swaps.name,
+            "properties": { prop_id: v.name for prop_id, v in self.properties.items() },
+            "all_proceeds_to_next_flight": [(bn, a.name) for (bn, a) in self.all_proceeds_to_next_flight],
+            "all_unloads_w_putdowns": [(list(k), a1.name, a2.name) for k, (a1, a2) in self.all_unloads_w_putdowns.items()],
+            "all_loads_w_pickups": [(list(k), a1.name, a2.name) for k, (a1, a2) in self.all_loads_w_pickups.items()],
+            "all_delivers_w_pickups": [(list(k), a1.name, a2.name) for k, (a1, a2) in self.all_delivers_w_pickups.items()],
+            "all_gets_w_putdowns": [(k, a1.name, a2.name) for k, (a1, a2) in self.all_gets_w_putdowns.items()],
+            "all_swap_pickups_n_putdowns": [(k, a1.name, a2.name) for k, (a1, a2) in self.all_swap_pickups_n_putdowns.items()],
+            "all_putdowns": [a.name for a in self.all_putdowns],
+            "putdowns_jig": self.putdowns_jig,
+            "activity_args": {
+                an: { param_name: self._serialized_arg(arg) for param_name, arg in args.items() }
+                for an, args in self._activity_args.items()
+            },
+            "all_pickups": [a.name for a in self.all_pickups],
+        }
+
+    def _serialized_arg(self, arg: up.Object | up.Parameter) -> tuple[str, str | None]:
+        if isinstance(arg, up.Object):
+            return ("object", arg.name)
+        if self.pb.has_name(arg.name):
+            return ("variable", arg.name)
+        return ("parameter", None)
+
+    def _deserialized_arg(self, a: Activity, param_name: str, arg: tuple[str, str | None]) -> up.Object | up.Parameter:
+        (kind, name) = arg
+        if kind == "object":
+            return self.pb.object(name)
+        if kind == "variable":
+            return self.pb.get_variable(name)
+        return a.get_parameter(param_name)
+
+    @classmethod
+    def from_serialized(
+        cls,
+        pb_def: BelugaProblemDef,
+        pb: SchedulingProblem,
+        metadata: dict,
+    ) -> 'BelugaModelOptSched':
+        """
+        Restores a model from a (deserialized) problem and the metadata given by `serialized_metadata`,
+        skipping the whole model building.
+        """
+        self = cls.__new__(cls)
+
+        self.solution_cache = None
+        self._problem_hash = None
+
+        self.pb_def = pb_def
+        self.pb = pb
+        self.num_flights = len(pb_def.flights)
+        self.num_available_swaps = metadata["num_available_swaps"]
+        self._activities_uid_counter = metadata["activities_uid_counter"]
+        self.chain_precedences = metadata["chain_precedences"]
+        self.num_avoided_precedence_constraints = metadata["num_avoided_precedence_constraints"]
+        self.num_pruned_domain_values = metadata["num_pruned_domain_values"]
+        self.symmetry_breaking = metadata["symmetry_breaking"]
+
+        self.jig_objects = { j.name: pb.object(j.name) for j in pb_def.jigs }
+        self.rack_objects = { r.name: pb.object(r.name) for r in pb_def.racks }
+        self.beluga_objects = { fl.name: pb.object(fl.name) for fl in pb_def.flights }
+        self.hangar_objects = { h.name: pb.object(h.name) for h in pb_def.hangars }
+        self.production_line_objects = { pl.name: pb.object(pl.name) for pl in pb_def.production_lines }
+        self.trailer_objects = { t.name: pb.object(t.name) for t in pb_def.trailers_beluga + pb_def.trailers_factory }
+
+        activities = { a.name: a for a in pb.activities }
+
+        self.all_proceeds_to_next_flight = [(bn, activities[an]) for (bn, an) in metadata["all_proceeds_to_next_flight"]]
+        self.all_unloads_w_putdowns = { tuple(k): (activities[an1], activities[an2]) for (k, an1, an2) in metadata["all_unloads_w_putdowns"] }
+        self.all_loads_w_pickups = { tuple(k): (activities[an1], activities[an2]) for (k, an1, an2) in metadata["all_loads_w_pickups"] }
+        self.all_delivers_w_pickups = { tuple(k): (activities[an1], activities[an2]) for (k, an1, an2) in metadata["all_delivers_w_pickups"] }
+        self.all_gets_w_putdowns = { k: (activities[an1], activities[an2]) for (k, an1, an2) in metadata["all_gets_w_putdowns"] }
+        self.all_swap_pickups_n_putdowns = { k: (activities[an1], activities[an2]) for (k, an1, an2) in metadata["all_swap_pickups_n_putdowns"] }
+        self.all_putdowns = [activities[an] for an in metadata["all_putdowns"]]
+        self.putdowns_jig = metadata["putdowns_jig"]
+        self._activity_args = {
+            an: { param_name: self._deserialized_arg(activities[an], param_name, arg) for param_name, arg in args.items() }
+            for an, args in metadata["activity_args"].items()
+        }
+        self.all_pickups = [activities[an] for an in metadata["all_pickups"]]
+
+        self._index_activities()
+
+        self.num_used_swaps = pb.get_variable(metadata["num_used_swaps"])
+        self.properties = { PropId(prop_id): pb.get_variable(vn) for prop_id, vn in metadata["properties"].items() }
+
+        return self
+
     def solve_with_properties(
         self,
         prop_ids: list[PropId],
         num_swaps_to_use: int | None=None,
         timeout:float|None=None,
-    ) -> tuple[Schedule, list[dict[str, str]]]:
+        planner=None,
+        hints: list[up.FNode] | None=None,
+        hints_timeout:float|None=None,
+    ) -> tuple[Schedule | None, list[dict[str, str]] | None]:
         
-        pb = self.pb.clone()
+        """
+        If a solution cache is set (see `solution_cache.py`) and can answer the query, no solve is made,
+        in which case the returned `Schedule` is `None` (but the plan, if any, is still returned as JSON).
+        Neither is a solve made if the properties are obviously infeasible (see `find_conflicting_properties`).
+
+        If `hints` are given (see `make_hints`), a first solve is made assuming them too, for at most `hints_timeout`.
+        Only if it does not find a plan is the query solved without them (within what is left of `timeout`).
+        """
+
+        if self.solution_cache is not None:
+            (hit, pl_as_json) = self.solution_cache.lookup(self.problem_hash, prop_ids, num_swaps_to_use)
+            if hit:
+                return (None, pl_as_json)
+
+        if self._precheck_infeasible(prop_ids):
+            return (None, None)
+
+        pl = None
+
+        if hints:
+            start_time = time.perf_counter()
+            with self._assumptions(self.make_assumptions(prop_ids, num_swaps_to_use) + hints) as pb:
+                pl = solve_problem(pb, hints_timeout if timeout is None else min(hints_timeout or timeout, timeout), planner)
+            print("hinted solve: {}".format("plan found" if pl is not None else "no plan found, solving without hints"))
+            # (the hints, e.g. from a plan for another version of the problem, may well contradict the properties:
+            # the solve without them only has the time left)
+            if timeout is not None:
+                timeout = max(0., timeout - (time.perf_counter() - start_time))
+
+        if pl is None:
+            with self._assumptions(self.make_assumptions(prop_ids, num_swaps_to_use)) as pb:
+                pl = solve_problem(pb, timeout, planner)
+
+        pl_as_json = self._plan_to_json(pl) if pl is not None else None
+
+        # (without a timeout, not finding a plan means the query is infeasible)
+        if self.solution_cache is not None and (pl is not None or timeout is None):
+            self.solution_cache.record(self.problem_hash, self.pb_def, prop_ids, num_swaps_to_use, pl_as_json)
+
+        return (pl, pl_as_json)
+
+    def solve_with_properties_minimizing_swaps(
+        self,
+        prop_ids: list[PropId],
+        timeout:float|None=None,
+        on_better_plan=None,
+    ) -> tuple[int | None, bool, list[dict[str, str]] | None]:
+        """
+        Single optimising solve, minimizing `num_used_swaps` (instead of repeated feasibility
+        solves for a growing number of swaps). Each time the engine finds a better plan,
+        `on_better_plan(num_used_swaps, plan_as_json)` is called (if given).
+
+        Returns the number of swaps of the best plan found, whether it was proven optimal, and that plan.
+        """
+
+        best_num_swaps = None
+        best_pl_as_json = None
+        proven_optimal = False
+
+        if self._precheck_infeasible(prop_ids):
+            return (best_num_swaps, proven_optimal, best_pl_as_json)
+
+        with self._assumptions(self.make_assumptions(prop_ids, None)) as pb:
+            pb.add_quality_metric(up.MinimizeExpressionOnFinalState(self.num_used_swaps))
+            try:
+                for (pl, optimal) in solve_problem_anytime(pb, timeout):
+                    num_swaps = pl.assignment[self.num_used_swaps].constant_value()
+                    if best_num_swaps is None or num_swaps < best_num_swaps:
+                        best_num_swaps = num_swaps
+                        best_pl_as_json = self._plan_to_json(pl)
+                        if on_better_plan is not None:
+                            on_better_plan(best_num_swaps, best_pl_as_json)
+                    proven_optimal = optimal
+            finally:
+                pb.clear_quality_metrics()
+
+        return (best_num_swaps, proven_optimal, best_pl_as_json)
+
+    def _precheck_infeasible(
+        self,
+        prop_ids: list[PropId],
+    ) -> bool:
+        conflict = find_conflicting_properties(self.pb_def, prop_ids)
+        if conflict is None:
+            return False
+
+        (conflicting_prop_ids, reason) = conflict
+        print("conflicting properties {}: {}".format(conflicting_prop_ids, reason))
+        # (infeasible whatever the number of swaps)
+        if self.solution_cache is not None:
+            self.solution_cache.record(self.problem_hash, self.pb_def, conflicting_prop_ids, None, INFEASIBLE)
+        return True
+
+    def make_assumptions(
+        self,
+        prop_ids: list[PropId],
+        num_swaps_to_use: int | None,
+    ) -> list[up.FNode]:
+        """
+        Literals over the (reified) property variables and the number of used swaps,
+        to be assumed by a query on the (otherwise shared and unchanged) base problem.
+        """
+        assumptions = []
 
         if num_swaps_to_use is not None:
-            pb.add_constraint(up.Equals(self.num_used_swaps, num_swaps_to_use)) # or also GE ? LE ? -> All have different pros/cons (depending on the situation, too...!..?)
+            assumptions.append(up.Equals(self.num_used_swaps, num_swaps_to_use)) # or also GE ? LE ? -> All have different pros/cons (depending on the situation, too...!..?)
 
         for prop_id in prop_ids:
-            pb.add_constraint(self.properties[prop_id])
+            assumptions.append(self.properties[prop_id])
 
-##        prop_ids_yes = ["id00","id01","id02","id03","id04","id05","id06","id07","id08","id09","id10"]
-#        prop_ids_yes = ["id00","id01","id02","id03","id04","id06","id07","id08","id10"]
-#        prop_ids_no = ["id05","id09"]
-##        prop_ids_yes = ["id01","id02","id03","id04","id05","id06","id07"]
-##        prop_ids_no = ["id00"]
-#        for prop_id in prop_ids_yes:
-#            pb.add_constraint(self.properties[prop_id])
-#        for prop_id in prop_ids_no:
-#            pb.add_constraint(up.Not(self.properties[prop_id]))
+        return assumptions
 
-        pl = solve_problem(pb, timeout)
+    def make_hints(
+        self,
+        ref_plan_def: BelugaPlanDef,
+        free_actions: set[int] | None = None,
+    ) -> list[up.FNode]:
+        """
+        Literals mapping a reference plan (e.g. one found for a slightly different version of the problem)
+        onto the activities of the model: their presence, and the jigs / racks / hangars they use.
+        Actions of the reference plan without a counterpart in the model are skipped, and so are
+        the ones whose index is in `free_actions` (e.g. to only freeze part of the plan, see `repair.py`).
+        """
+        hints = []
+        frozen = True
+
+        def _add(hint: up.FNode):
+            if frozen:
+                hints.append(hint)
+
+        def _hint(a: Activity, param_name: str, obj: up.Object | None):
+            arg = self._arg(a, param_name)
+            if obj is not None and not isinstance(arg, up.Object):
+                _add(up.Equals(arg, obj))
+
+        unloads_by_jig_and_flight = { (jn, bn): activities for (jn, bn, _), activities in self.all_unloads_w_putdowns.items() }
+        delivers_by_jig_and_pl = { (jn, pln): activities for (jn, pln, _), activities in self.all_delivers_w_pickups.items() }
+        loads_by_flight: dict[str, list[tuple[str, Activity, Activity]]] = {}
+        for (jn_or_jtn, bn, _), (load_a, pickup_a) in sorted(self.all_loads_w_pickups.items(), key=lambda item: item[0][2]):
+            loads_by_flight.setdefault(bn, []).append((jn_or_jtn, load_a, pickup_a))
+
+        num_loads: dict[str, int] = {}
+        num_swaps = 0
+        delivered_jigs: set[str] = set()
+        # rack each jig on a trailer was (last) picked up from
+        picked_up_from_rack: dict[str, str] = {}
+        # put-down that the next put-down of each jig on a trailer maps to
+        next_putdown: dict[str, Activity] = {}
+
+        for k, act in enumerate(ref_plan_def):
+            j = act.params.get('j', None)
+            frozen = free_actions is None or k not in free_actions
+
+            if act.name == "unload_beluga":
+                if (j, act.params['b']) in unloads_by_jig_and_flight:
+                    (unload_a, putdown_a) = unloads_by_jig_and_flight[(j, act.params['b'])]
+                    _add(unload_a.present)
+                    next_putdown[j] = putdown_a
+
+            elif act.name == "get_from_hangar":
+                if j in delivered_jigs and j in self.all_gets_w_putdowns:
+                    next_putdown[j] = self.all_gets_w_putdowns[j][1]
+
+            elif act.name == "pick_up_rack":
+                picked_up_from_rack[j] = act.params['r']
+
+            elif act.name == "put_down_rack":
+                if j in picked_up_from_rack:
+                    if num_swaps in self.all_swap_pickups_n_putdowns:
+                        (pickup_a, putdown_a) = self.all_swap_pickups_n_putdowns[num_swaps]
+                        _add(pickup_a.present)
+                        _hint(pickup_a, "j", self.jig_objects.get(j, None))
+                        _hint(pickup_a, "r", self.rack_objects.get(picked_up_from_rack[j], None))
+                        _hint(pickup_a, "s", self.side_beluga if act.params['s'] == self.side_beluga.name else self.side_production)
+                        _hint(putdown_a, "r", self.rack_objects.get(act.params['r'], None))
+                    num_swaps += 1
+                elif j in next_putdown:
+                    _add(next_putdown[j].present)
+                    _hint(next_putdown[j], "r", self.rack_objects.get(act.params['r'], None))
+                picked_up_from_rack.pop(j, None)
+                next_putdown.pop(j, None)
+
+            elif act.name in ["load_beluga", "deliver_to_hangar"]:
+                pickup_a = None
+                if act.name == "load_beluga":
+                    i = num_loads.get(act.params['b'], 0)
+                    num_loads[act.params['b']] = i+1
+                    loads = loads_by_flight.get(act.params['b'], [])
+                    if i < len(loads) and j in self.jig_objects and loads[i][0] in [j, self.pb_def.index.jigs[j].type]:
+                        (_, load_a, pickup_a) = loads[i]
+                        _add(load_a.present)
+                        _hint(load_a, "j", self.jig_objects[j])
+                else:
+                    delivered_jigs.add(j)
+                    if (j, act.params['pl']) in delivers_by_jig_and_pl:
+                        (deliver_a, pickup_a) = delivers_by_jig_and_pl[(j, act.params['pl'])]
+                        _add(deliver_a.present)
+                        _hint(deliver_a, "h", self.hangar_objects.get(act.params['h'], None))
+
+                if pickup_a is not None and j in picked_up_from_rack:
+                    _add(pickup_a.present)
+                    _hint(pickup_a, "r", self.rack_objects.get(picked_up_from_rack[j], None))
+                # (the jig went straight from where it was unloaded / retrieved to a flight / production line)
+                if j in next_putdown:
+                    _add(up.Not(next_putdown[j].present))
+                picked_up_from_rack.pop(j, None)
+                next_putdown.pop(j, None)
+
+        return hints
+
+    @contextmanager
+    def _assumptions(self, assumptions: list[up.FNode]):
+        """
+        Temporarily adds the given assumptions to the base problem (rather than solving a deep copy of it).
+        They are retracted on exit, leaving the base problem exactly as it was.
+
+        If assumptions are already added to the base problem (i.e. nested or overlapping queries, e.g. in the server),
+        a copy of it is solved instead.
+        """
+        # NOTE: `pb.base_constraints` returns a copy: the list actually held by the problem is that of its base chronicle
+        # (a private attribute of UP problems: if it is not found, a copy of the problem is solved as well).
+        # Constraints that are already present are not added again, so truncating
+        # the list back to its initial length only retracts the assumptions that were actually added.
+        base_constraints = getattr(getattr(self.pb, "_base", None), "constraints", None)
+        with _problems_with_assumptions_lock:
+            in_place = isinstance(base_constraints, list) and id(self.pb) not in _problems_with_assumptions
+            if in_place:
+                _problems_with_assumptions.add(id(self.pb))
+
+        if not in_place:
+            pb = self.pb.clone()
+            for assumption in assumptions:
+                pb.add_constraint(assumption)
+            yield pb
+            return
+
+        num_base_constraints = len(base_constraints)
+        try:
+            for assumption in assumptions:
+                self.pb.add_constraint(assumption)
+            yield self.pb
+        finally:
+            del base_constraints[num_base_constraints:]
+            with _problems_with_assumptions_lock:
+                _problems_with_assumptions.discard(id(self.pb))
+
+    def _plan_to_json(self, pl: Schedule) -> list[dict[str, str]]:
 
         pl_as_json = []
 
-        if pl is not None:
-            for a in pl.activities:
-                if a.name.startswith("unload_beluga"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "b": pl.assignment[a.get_parameter("b")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                    }
-                elif a.name.startswith("load_beluga"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "b": pl.assignment[a.get_parameter("b")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                    }
-                elif a.name.startswith("put_down_rack"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                        "r": pl.assignment[a.get_parameter("r")].object().name,
-                        "s": pl.assignment[a.get_parameter("s")].object().name,
-                    }
-                elif a.name.startswith("pick_up_rack"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                        "r": pl.assignment[a.get_parameter("r")].object().name,
-                        "s": pl.assignment[a.get_parameter("s")].object().name,
-                    }
-                elif a.name.startswith("deliver_to_hangar"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "h": pl.assignment[a.get_parameter("h")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                        "pl": pl.assignment[a.get_parameter("pl")].object().name,
-                    }
-                elif a.name.startswith("get_from_hangar"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                        "j": pl.assignment[a.get_parameter("j")].object().name,
-                        "h": pl.assignment[a.get_parameter("h")].object().name,
-                        "t": pl.assignment[a.get_parameter("t")].object().name,
-                    }
-                elif a.name.startswith("switch_to_next_beluga"):
-                    aa = { 
-                        "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
-                    }
-                else:
-                    assert False
-                
-                pl_as_json.append(aa)
+        for a in pl.activities:
+            if a.name.startswith("unload_beluga"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "b": self._arg_value(pl, a, "b"),
+                    "t": self._arg_value(pl, a, "t"),
+                }
+            elif a.name.startswith("load_beluga"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "b": self._arg_value(pl, a, "b"),
+                    "t": self._arg_value(pl, a, "t"),
+                }
+            elif a.name.startswith("put_down_rack"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "t": self._arg_value(pl, a, "t"),
+                    "r": self._arg_value(pl, a, "r"),
+                    "s": self._arg_value(pl, a, "s"),
+                }
+            elif a.name.startswith("pick_up_rack"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "t": self._arg_value(pl, a, "t"),
+                    "r": self._arg_value(pl, a, "r"),
+                    "s": self._arg_value(pl, a, "s"),
+                }
+            elif a.name.startswith("deliver_to_hangar"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "h": self._arg_value(pl, a, "h"),
+                    "t": self._arg_value(pl, a, "t"),
+                    "pl": self._arg_value(pl, a, "pl"),
+                }
+            elif a.name.startswith("get_from_hangar"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                    "j": self._arg_value(pl, a, "j"),
+                    "h": self._arg_value(pl, a, "h"),
+                    "t": self._arg_value(pl, a, "t"),
+                }
+            elif a.name.startswith("switch_to_next_beluga"):
+                aa = { 
+                    "name": a.name[:a.name.find(self._get_activity_uid_prefix())],
+                }
+            else:
+                assert False
+            
+            pl_as_json.append(aa)
 
-        return (pl, pl_as_json)        
+        return pl_as_json
 
     def _make_types_and_fluents_and_initial_values(self):
 
@@ -324,7 +749,7 @@ class BelugaModelOptSched:
         for jig in self.pb_def.jigs:
             jig_obj = self.pb.add_object(jig.name, self.jig_subtypes[jig.type])
             tpe = self.pb_def.get_jig_type(jig.type)
-            self.pb.set_initial_value(self.jig_size(jig_obj), tpe.size_empty if jig.empty else tpe.size_loaded)
+            self.pb.set_initial_value(self.jig_size(jig_obj), self.pb_def.index.jig_initial_size(jig.name))
             self.pb.set_initial_value(self.jig_size_empty(jig_obj), tpe.size_empty)
             self.pb.set_initial_value(self.jig_is_empty(jig_obj), up.Bool(jig.empty))
             self.jig_objects[jig.name] = jig_obj
@@ -356,14 +781,20 @@ class BelugaModelOptSched:
 
         # # #
 
+        self.at = self.pb.add_fluent("at", self.part_location_type, p=self.jig_type)
+        self.next_ = up.Fluent("next", up.IntType(), r=self.rack_type, s=self.side_type)
+        self.pb.add_fluent(self.next_, default_initial_value=0)
+        self.pos = self.pb.add_fluent("pos", up.IntType(), p=self.jig_type, s=self.side_type)
+
+        # # #
+
         self.hangar_type = up.UserType("Hangar", father=self.part_location_type)
         self.hangar_free = self.pb.add_fluent("free_hangar", up.BoolType(), h=self.hangar_type)
         for hangar in self.pb_def.hangars:
             hangar_obj = self.pb.add_object(hangar.name, self.hangar_type)
-            self.pb.set_initial_value(self.hangar_free(hangar_obj), True)
+            self.pb.set_initial_value(self.hangar_free(hangar_obj), hangar.jig is None)
             self.hangar_objects[hangar.name] = hangar_obj
             if hangar.jig is not None:
-                jig = self.pb_def.get_jig(hangar.jig)
                 jig_obj = self.jig_objects[hangar.jig]
                 self.pb.set_initial_value(self.at(jig_obj), hangar_obj)
 
@@ -393,7 +824,6 @@ class BelugaModelOptSched:
             self.pb.set_initial_value(self.trailer_side(trailer_obj), self.side_beluga)
             self.trailer_objects[trailer.name] = trailer_obj
             if trailer.jig is not None:
-                jig = self.pb_def.get_jig(trailer.jig)
                 jig_obj = self.jig_objects[trailer.jig]
                 self.pb.set_initial_value(self.at(jig_obj), trailer_obj)
         for trailer in self.pb_def.trailers_factory:
@@ -401,19 +831,11 @@ class BelugaModelOptSched:
             self.pb.set_initial_value(self.trailer_side(trailer_obj), self.side_production)
             self.trailer_objects[trailer.name] = trailer_obj
             if trailer.jig is not None:
-                jig = self.pb_def.get_jig(trailer.jig)
                 jig_obj = self.jig_objects[trailer.jig]
                 self.pb.set_initial_value(self.at(jig_obj), trailer_obj)
 
         # # #
 
-        self.at = self.pb.add_fluent("at", self.part_location_type, p=self.jig_type)
-        self.next_ = up.Fluent("next", up.IntType(), r=self.rack_type, s=self.side_type)
-        self.pb.add_fluent(self.next_, default_initial_value=0)
-        self.pos = self.pb.add_fluent("pos", up.IntType(), p=self.jig_type, s=self.side_type)
-
-        # # #
-
         for rack in self.pb_def.racks:
             rack_obj = self.pb.add_object(rack.name, self.rack_type)
             self.rack_objects[rack.name] = rack_obj
@@ -421,10 +843,7 @@ class BelugaModelOptSched:
             num_pieces = len(rack.jigs)
             occupied_space = 0
             for k, jig_name in enumerate(rack.jigs):
-                jig = self.pb_def.get_jig(jig_name)
-                pb_def_jig_type = self.pb_def.get_jig_type(jig.type)
-                jig_size_val = pb_def_jig_type.size_empty if jig.empty else pb_def_jig_type.size_loaded
-                occupied_space += jig_size_val
+                occupied_space += self.pb_def.index.jig_initial_size(jig_name)
                 jig_obj = self.jig_objects[jig_name]
 
                 self.pb.set_initial_value(self.pos(jig_obj, self.side_beluga), k)
@@ -443,6 +862,172 @@ class BelugaModelOptSched:
                 jig_obj = self.jig_objects[jig_name]
                 self.pb.set_initial_value(self.at(jig_obj), beluga_obj)
 
+    def _add_precedences(
+        self,
+        earlier: list[tuple[Activity, bool]],
+        a: Activity,
+    ):
+        """
+        Orders `a` after the (present) `earlier` activities, given along with whether they are certainly present.
+
+        With `chain_precedences`, the earlier activities are only walked back until the first one that is certainly present:
+        any activity before it is (if present) ordered before it too, so transitivity holds even across optional activities.
+        """
+        num_added = 0
+        for (earlier_a, certainly_present) in reversed(earlier):
+            self.pb.add_constraint(up.LT(earlier_a.end, a.start), scope=[earlier_a.present, a.present])
+            num_added += 1
+            if self.chain_precedences and certainly_present:
+                break
+        self.num_avoided_precedence_constraints += len(earlier) - num_added
+
+    def _restrict_domain(
+        self,
+        a: Activity,
+        param_name: str,
+        values: list[up.Object],
+        num_all_values: int,
+    ):
+        arg = self._arg(a, param_name)
+        if isinstance(arg, up.Object) or len(values) == num_all_values:
+            return
+        a.add_constraint(up.Or(up.Equals(arg, v) for v in values))
+        self.num_pruned_domain_values += num_all_values - len(values)
+
+    def _restrict_domains(self):
+        """
+        Narrows the domains of the open jig / rack / trailer parameters of activities, to the values that
+        a static analysis of the problem (see `analysis.py`) deems reachable, or physically possible.
+        """
+        domains = compute_domains(self.pb_def)
+
+        def _trailers(side: str) -> list[up.Object]:
+            return [self.trailer_objects[t] for t in domains.trailers[side]]
+
+        # whether the jig of a put-down / pick-up is known to have been delivered (i.e. to be empty) at that point
+        delivered: dict[str, bool] = {}
+        for (_, putdown_a) in self.all_unloads_w_putdowns.values():
+            delivered[putdown_a.name] = False
+        for (_, pickup_a) in self.all_delivers_w_pickups.values():
+            delivered[pickup_a.name] = False
+        for (_, putdown_a) in self.all_gets_w_putdowns.values():
+            delivered[putdown_a.name] = True
+
+        # racks fitting the (empty) jigs loaded on flights, for pick-ups of jigs only known by their type
+        racks_of_typed_pickup: dict[str, list[str]] = {}
+        for (jig_or_jig_type_name, _, _), (_, pickup_a) in self.all_loads_w_pickups.items():
+            if jig_or_jig_type_name in self.pb_def.index.jig_types:
+                jig_type = self.pb_def.index.jig_types[jig_or_jig_type_name]
+                racks_of_typed_pickup[pickup_a.name] = domains.racks_fitting(jig_type.size_empty)
+
+        for a in self.all_putdowns + self.all_pickups:
+            jig = self._arg(a, "j")
+            if isinstance(jig, up.Object):
+                racks = domains.racks_for_jig(jig.name, delivered.get(a.name, None))
+            elif a.name in racks_of_typed_pickup:
+                racks = racks_of_typed_pickup[a.name]
+            else:
+                racks = domains.racks_for_jig(None)
+                self._restrict_domain(a, "j", [self.jig_objects[j] for j in domains.jigs_rackable], len(self.jig_objects))
+            self._restrict_domain(a, "r", [self.rack_objects[r] for r in racks], len(self.rack_objects))
+
+            side = self._arg(a, "s")
+            if isinstance(side, up.Object):
+                self._restrict_domain(a, "t", _trailers(SIDE_BELUGA if side == self.side_beluga else SIDE_FACTORY), len(self.trailer_objects))
+
+        for (unload_a, _) in self.all_unloads_w_putdowns.values():
+            self._restrict_domain(unload_a, "t", _trailers(SIDE_BELUGA), len(self.trailer_objects))
+        for (load_a, _) in self.all_loads_w_pickups.values():
+            self._restrict_domain(load_a, "t", _trailers(SIDE_BELUGA), len(self.trailer_objects))
+        for (deliver_a, _) in self.all_delivers_w_pickups.values():
+            self._restrict_domain(deliver_a, "t", _trailers(SIDE_FACTORY), len(self.trailer_objects))
+        for (get_a, _) in self.all_gets_w_putdowns.values():
+            self._restrict_domain(get_a, "t", _trailers(SIDE_FACTORY), len(self.trailer_objects))
+
+        print("domain values pruned: {}".format(self.num_pruned_domain_values))
+
+    def _add_symmetry_breaking(self):
+        """
+        For each class of interchangeable objects (see `find_interchangeable_objects`) o_1, ..., o_n: used(o_k+1) => used(o_k).
+        Any plan can be turned into one satisfying these constraints by renaming the objects of each class.
+        """
+        classes = find_interchangeable_objects(self.pb_def)
+
+        def _add_used_order(used: list[up.Parameter]):
+            for k in range(len(used)-1):
+                self.pb.add_constraint(up.Implies(used[k+1], used[k]))
+
+        # (a trailer is used if a jig is put on it, which only unloads, pick-ups and retrievals from hangars do)
+        for trailers in classes["trailers"]:
+            _add_used_order([
+                self._reify_object_used("t", self.trailer_objects[t], ["unload_beluga", "pick_up_rack", "get_from_hangar"])
+                for t in trailers
+            ])
+        for hangars in classes["hangars"]:
+            _add_used_order([
+                self._reify_object_used("h", self.hangar_objects[h], ["deliver_to_hangar"])
+                for h in hangars
+            ])
+        for racks in classes["racks"]:
+            _add_used_order([up.Not(self._reify_prop_rack_always_empty(r, None)) for r in racks])
+
+        print("symmetry breaking: {}".format(classes))
+
+    def _reify_object_used(
+        self,
+        param_name: str,
+        obj: up.Object,
+        activity_name_prefixes: list[str],
+    ) -> up.Parameter:
+
+        reif_name = f"{obj.name}_used"
+
+        if self.pb.has_name(reif_name):
+            obj_used = self.pb.get_variable(reif_name)
+        else:
+            obj_used = self.pb.add_variable(reif_name, up.BoolType())
+
+            terms = []
+            for a in self.pb.activities:
+                if not any(a.name.startswith(prefix) for prefix in activity_name_prefixes):
+                    continue
+                arg = self._arg(a, param_name)
+                if isinstance(arg, up.Object):
+                    if arg == obj:
+                        terms += [a.present]
+                else:
+                    terms += [up.And(a.present, up.Equals(arg, obj))]
+
+            self.pb.add_constraint(up.Iff(obj_used, up.Or(terms)))
+
+        return obj_used
+
+    def _index_activities(self):
+        """
+        Activities indexed by the (static) parameters that properties refer to, shared by the `_reify_*` methods.
+        """
+        self.delivers_by_jig_and_pl = {}
+        for (jn, pln, _), (deliver_a, _) in self.all_delivers_w_pickups.items():
+            self.delivers_by_jig_and_pl.setdefault((jn, pln), deliver_a)
+
+        self.proceeds_by_flight = {}
+        for bn, proceed_a in self.all_proceeds_to_next_flight:
+            self.proceeds_by_flight.setdefault(bn, proceed_a)
+
+    def _putdowns_of_jig(self, jig_name: str) -> list[tuple[Activity, up.FNode]]:
+        """
+        Put-downs that may be applied to the given jig, each along with the condition for it to be the case
+        (i.e. true for the put-downs bound to that jig, and an equality on the jig parameter for swap put-downs).
+        """
+        res = []
+        for putdown in self.all_putdowns:
+            putdown_jig_name = self.putdowns_jig[putdown.name]
+            if putdown_jig_name is None:
+                res.append((putdown, up.Equals(self._arg(putdown, "j"), self.jig_objects[jig_name])))
+            elif putdown_jig_name == jig_name:
+                res.append((putdown, up.TRUE()))
+        return res
+
     def _load_to_trailer(self, a: Activity, jig, trailer, side):
         a.add_condition(up.StartTiming(), up.Equals(self.trailer_side(trailer), side))
         a.add_condition(up.StartTiming(), self.trailer_available(trailer))
@@ -478,174 +1063,245 @@ class BelugaModelOptSched:
         self._activities_uid_counter += 1
         return res
 
-    def _make_new_unload_activity(self) -> Activity:
+    def _add_args(
+        self,
+        a: Activity,
+        params: list[tuple[str, up.Type, up.Object | up.Parameter | None]],
+    ) -> dict[str, up.Object | up.Parameter]:
+        """
+        Only adds a parameter to the activity for each value that is not known at build time (i.e. given as `None`).
+        Known values (objects, or variables shared with other activities) are substituted as is in conditions and effects.
+        """
+        args = {}
+        for (param_name, param_type, known_value) in params:
+            if known_value is None:
+                args[param_name] = a.add_parameter(param_name, param_type)
+            else:
+                args[param_name] = known_value
+        self._activity_args[a.name] = args
+        return args
+
+    def _arg(self, a: Activity, param_name: str) -> up.Object | up.Parameter:
+        return self._activity_args[a.name][param_name]
+
+    def _arg_value(self, pl: Schedule, a: Activity, param_name: str) -> str:
+        arg = self._arg(a, param_name)
+        if isinstance(arg, up.Object):
+            return arg.name
+        return pl.assignment[arg].object().name
+
+    def _opposite_side(self, side: up.Object | None) -> up.Object | None:
+        if side is None:
+            return None
+        return self.side_production if side == self.side_beluga else self.side_beluga
+
+    def _make_new_unload_activity(
+        self,
+        j: up.Object | None = None,
+        b: up.Object | None = None,
+    ) -> Activity:
        
         unload_jig_from_beluga_to_trailer = self.pb.add_activity("unload_beluga"+self._new_activity_uid(), optional=True)
-        unload_jig_from_beluga_to_trailer.add_parameter("j", self.jig_type)
-        unload_jig_from_beluga_to_trailer.add_parameter("b", self.beluga_type)
-        unload_jig_from_beluga_to_trailer.add_parameter("t", self.trailer_type)
+        args = self._add_args(unload_jig_from_beluga_to_trailer, [
+            ("j", self.jig_type, j),
+            ("b", self.beluga_type, b),
+            ("t", self.trailer_type, None),
+        ])
 
         self._load_to_trailer(
             unload_jig_from_beluga_to_trailer,
-            unload_jig_from_beluga_to_trailer.j,
-            unload_jig_from_beluga_to_trailer.t,
+            args["j"],
+            args["t"],
             self.side_beluga,
         )
         unload_jig_from_beluga_to_trailer.add_condition(
             up.StartTiming(),
             up.Equals(
-                self.at(unload_jig_from_beluga_to_trailer.j),
-                unload_jig_from_beluga_to_trailer.b,
+                self.at(args["j"]),
+                args["b"],
             ),
         )
         return unload_jig_from_beluga_to_trailer
 
-    def _make_new_load_activity(self) -> Activity:
+    def _make_new_load_activity(
+        self,
+        j: up.Object | up.Parameter | None = None,
+        b: up.Object | None = None,
+    ) -> Activity:
 
         load_jig_from_trailer_to_beluga = self.pb.add_activity("load_beluga"+self._new_activity_uid(), optional=True)
-        load_jig_from_trailer_to_beluga.add_parameter("j", self.jig_type)
-        load_jig_from_trailer_to_beluga.add_parameter("b", self.beluga_type)
-        load_jig_from_trailer_to_beluga.add_parameter("t", self.trailer_type)
+        args = self._add_args(load_jig_from_trailer_to_beluga, [
+            ("j", self.jig_type, j),
+            ("b", self.beluga_type, b),
+            ("t", self.trailer_type, None),
+        ])
 
         self._unload_from_trailer(
             load_jig_from_trailer_to_beluga,
-            load_jig_from_trailer_to_beluga.j,
-            load_jig_from_trailer_to_beluga.t,
+            args["j"],
+            args["t"],
             self.side_beluga,
         )
         load_jig_from_trailer_to_beluga.add_effect(
             up.EndTiming(),
-            self.at(load_jig_from_trailer_to_beluga.j),
-            load_jig_from_trailer_to_beluga.b,
+            self.at(args["j"]),
+            args["b"],
         )
         load_jig_from_trailer_to_beluga.add_condition(
             up.StartTiming(),
-            self.jig_is_empty(load_jig_from_trailer_to_beluga.j),
+            self.jig_is_empty(args["j"]),
         )
         return load_jig_from_trailer_to_beluga
 
-    def _make_new_put_down_activity(self) -> Activity:
+    def _make_new_put_down_activity(
+        self,
+        j: up.Object | None = None,
+        s: up.Object | None = None,
+    ) -> Activity:
         putdown_jig_on_rack = self.pb.add_activity("put_down_rack"+self._new_activity_uid(), optional=True)
-        putdown_jig_on_rack.add_parameter("j", self.jig_type)
-        putdown_jig_on_rack.add_parameter("t", self.trailer_type)
-        putdown_jig_on_rack.add_parameter("r", self.rack_type)
-        putdown_jig_on_rack.add_parameter("s", self.side_type)
-        putdown_jig_on_rack.add_parameter("os", self.side_type)
-        putdown_jig_on_rack.add_parameter("rs", up.IntType(0, 1000))
-        putdown_jig_on_rack.add_parameter("d", up.IntType(0, 1000))
+        args = self._add_args(putdown_jig_on_rack, [
+            ("j", self.jig_type, j),
+            ("t", self.trailer_type, None),
+            ("r", self.rack_type, None),
+            ("s", self.side_type, s),
+            ("os", self.side_type, self._opposite_side(s)),
+            ("rs", up.IntType(0, 1000), None),
+            ("d", up.IntType(0, 1000), None),
+        ])
 
         self._unload_from_trailer(
             putdown_jig_on_rack,
-            putdown_jig_on_rack.j,
-            putdown_jig_on_rack.t,
-            putdown_jig_on_rack.s,
+            args["j"],
+            args["t"],
+            args["s"],
         )
         self._to_rack(
             putdown_jig_on_rack,
-            putdown_jig_on_rack.j,
-            putdown_jig_on_rack.r,
-            putdown_jig_on_rack.s,
-            putdown_jig_on_rack.os,
+            args["j"],
+            args["r"],
+            args["s"],
+            args["os"],
         )
         putdown_jig_on_rack.add_condition(
             up.StartTiming(),
-            up.Equals(self.rack_size(putdown_jig_on_rack.r), putdown_jig_on_rack.rs),
+            up.Equals(self.rack_size(args["r"]), args["rs"]),
         )
         return putdown_jig_on_rack
 
-    def _make_new_pick_up_activity(self) -> Activity:
+    def _make_new_pick_up_activity(
+        self,
+        j: up.Object | up.Parameter | None = None,
+        s: up.Object | None = None,
+    ) -> Activity:
         pickup_jig_from_rack = self.pb.add_activity("pick_up_rack"+self._new_activity_uid(), optional=True)
-        pickup_jig_from_rack.add_parameter("j", self.jig_type)
-        pickup_jig_from_rack.add_parameter("t", self.trailer_type)
-        pickup_jig_from_rack.add_parameter("r", self.rack_type)
-        pickup_jig_from_rack.add_parameter("s", self.side_type)
-        pickup_jig_from_rack.add_parameter("os", self.side_type)
+        args = self._add_args(pickup_jig_from_rack, [
+            ("j", self.jig_type, j),
+            ("t", self.trailer_type, None),
+            ("r", self.rack_type, None),
+            ("s", self.side_type, s),
+            ("os", self.side_type, self._opposite_side(s)),
+        ])
 
         self._from_rack(
             pickup_jig_from_rack,
-            pickup_jig_from_rack.j,
-            pickup_jig_from_rack.r,
-            pickup_jig_from_rack.s,
-            pickup_jig_from_rack.os,
+            args["j"],
+            args["r"],
+            args["s"],
+            args["os"],
         )
         self._load_to_trailer(
             pickup_jig_from_rack,
-            pickup_jig_from_rack.j,
-            pickup_jig_from_rack.t,
-            pickup_jig_from_rack.s,
+            args["j"],
+            args["t"],
+            args["s"],
         )
         return pickup_jig_from_rack
 
-    def _make_new_deliver_jig_to_hangar_activity(self) -> Activity:
+    def _make_new_deliver_jig_to_hangar_activity(
+        self,
+        j: up.Object | None = None,
+        pl: up.Object | None = None,
+    ) -> Activity:
         deliver_jig_to_hangar = self.pb.add_activity("deliver_to_hangar"+self._new_activity_uid(), optional=True)
-        deliver_jig_to_hangar.add_parameter("j", self.jig_type)
-        deliver_jig_to_hangar.add_parameter("h", self.hangar_type)
-        deliver_jig_to_hangar.add_parameter("t", self.trailer_type) 
-        deliver_jig_to_hangar.add_parameter("pl", self.production_line_type)
+        args = self._add_args(deliver_jig_to_hangar, [
+            ("j", self.jig_type, j),
+            ("h", self.hangar_type, None),
+            ("t", self.trailer_type, None),
+            ("pl", self.production_line_type, pl),
+        ])
 
         self._unload_from_trailer(
             deliver_jig_to_hangar,
-            deliver_jig_to_hangar.j,
-            deliver_jig_to_hangar.t,
+            args["j"],
+            args["t"],
             self.side_production,
         )
-        deliver_jig_to_hangar.add_condition(up.StartTiming(), self.hangar_free(deliver_jig_to_hangar.h))
-        deliver_jig_to_hangar.add_effect(up.EndTiming(), self.hangar_free(deliver_jig_to_hangar.h), False)
+        deliver_jig_to_hangar.add_condition(up.StartTiming(), self.hangar_free(args["h"]))
+        deliver_jig_to_hangar.add_effect(up.EndTiming(), self.hangar_free(args["h"]), False)
         deliver_jig_to_hangar.add_effect(
             up.EndTiming(),
-            self.at(deliver_jig_to_hangar.j),
-            deliver_jig_to_hangar.h,
+            self.at(args["j"]),
+            args["h"],
         )
         deliver_jig_to_hangar.add_effect(
             up.EndTiming(),
-            self.jig_size(deliver_jig_to_hangar.j),
-            self.jig_size_empty(deliver_jig_to_hangar.j),
+            self.jig_size(args["j"]),
+            self.jig_size_empty(args["j"]),
         )
         deliver_jig_to_hangar.add_effect(
             up.EndTiming(),
-            self.jig_is_empty(deliver_jig_to_hangar.j),
+            self.jig_is_empty(args["j"]),
             up.TRUE(),
         )
         return deliver_jig_to_hangar
 
-    def _make_new_get_jig_from_hangar_activity(self) -> Activity:
+    def _make_new_get_jig_from_hangar_activity(
+        self,
+        j: up.Object | None = None,
+        h: up.Object | None = None,
+    ) -> Activity:
         get_jig_from_hangar = self.pb.add_activity("get_from_hangar"+self._new_activity_uid(), optional=True)
-        get_jig_from_hangar.add_parameter("j", self.jig_type)
-        get_jig_from_hangar.add_parameter("h", self.hangar_type)
-        get_jig_from_hangar.add_parameter("t", self.trailer_type)
+        args = self._add_args(get_jig_from_hangar, [
+            ("j", self.jig_type, j),
+            ("h", self.hangar_type, h),
+            ("t", self.trailer_type, None),
+        ])
 
         self._load_to_trailer(
             get_jig_from_hangar,
-            get_jig_from_hangar.j,
-            get_jig_from_hangar.t,
+            args["j"],
+            args["t"],
             self.side_production
         )
-        get_jig_from_hangar.add_effect(up.EndTiming(), self.hangar_free(get_jig_from_hangar.h), True)
+        get_jig_from_hangar.add_effect(up.EndTiming(), self.hangar_free(args["h"]), True)
         get_jig_from_hangar.add_condition(
             up.StartTiming(),
-            up.Equals(self.at(get_jig_from_hangar.j), get_jig_from_hangar.h),
+            up.Equals(self.at(args["j"]), args["h"]),
         )
         return get_jig_from_hangar
 
-    def _make_new_proceed_to_next_flight_activity(self) -> Activity:
+    def _make_new_proceed_to_next_flight_activity(
+        self,
+        b: up.Object | None = None,
+    ) -> Activity:
         # proceed_to_next_flight = self.pb.add_activity("switch_to_next_beluga"+self._new_activity_uid(), optional=True)
         proceed_to_next_flight = self.pb.add_activity("switch_to_next_beluga"+self._new_activity_uid(), optional=False)
-        proceed_to_next_flight.add_parameter("b", self.beluga_type)
+        args = self._add_args(proceed_to_next_flight, [
+            ("b", self.beluga_type, b),
+        ])
         proceed_to_next_flight.add_condition(
             up.StartTiming(),
-            up.Equals(self.beluga_next(self.beluga_current()), proceed_to_next_flight.b)
+            up.Equals(self.beluga_next(self.beluga_current()), args["b"])
         )
-        proceed_to_next_flight.add_effect(up.EndTiming(), self.beluga_current(), proceed_to_next_flight.b)
+        proceed_to_next_flight.add_effect(up.EndTiming(), self.beluga_current(), args["b"])
         return proceed_to_next_flight
 
     def _make_new_swap_subactivities(self) -> tuple[Activity, Activity]:
         pickup = self._make_new_pick_up_activity()
         putdown = self._make_new_put_down_activity()
 
-        self.pb.add_constraint(up.Equals(pickup.j, putdown.j), scope=[pickup.present, putdown.present])
-        self.pb.add_constraint(up.Equals(pickup.t, putdown.t), scope=[pickup.present, putdown.present])
-        self.pb.add_constraint(up.Equals(pickup.s, putdown.s), scope=[pickup.present, putdown.present])
-        self.pb.add_constraint(up.Equals(pickup.os, putdown.os), scope=[pickup.present, putdown.present])
+        for param_name in ["j", "t", "s", "os"]:
+            self.pb.add_constraint(up.Equals(self._arg(pickup, param_name), self._arg(putdown, param_name)), scope=[pickup.present, putdown.present])
 
         self.pb.add_constraint(up.LT(pickup.end, putdown.start), scope=[pickup.present, putdown.present])
 
@@ -656,11 +1312,9 @@ class BelugaModelOptSched:
     def _add_proceeds(self):
 
         for flight in self.pb_def.flights[1:]:
-            proceed_a = self._make_new_proceed_to_next_flight_activity()
-            proceed_a.add_constraint(up.Equals(proceed_a.b, self.beluga_objects[flight.name]))
+            proceed_a = self._make_new_proceed_to_next_flight_activity(b=self.beluga_objects[flight.name])
             # self.pb.add_constraint(proceed_a.present)
-            for (_, earlier_proceed_a) in self.all_proceeds_to_next_flight:
-                self.pb.add_constraint(up.LT(earlier_proceed_a.end, proceed_a.start), scope=[earlier_proceed_a.present, proceed_a.present])
+            self._add_precedences([(earlier_proceed_a, True) for (_, earlier_proceed_a) in self.all_proceeds_to_next_flight], proceed_a)
             self.all_proceeds_to_next_flight.append((flight.name, proceed_a))
 
     def _add_flights_unloads_w_opt_putdowns(self):
@@ -673,13 +1327,9 @@ class BelugaModelOptSched:
 
             for i, jig_name in sorted(incoming_jigs.items()):
 
-                unload_a = self._make_new_unload_activity()
-                unload_a.add_constraint(up.Equals(unload_a.j, self.jig_objects[jig_name]))
-                unload_a.add_constraint(up.Equals(unload_a.b, self.beluga_objects[beluga_name]))
+                unload_a = self._make_new_unload_activity(j=self.jig_objects[jig_name], b=self.beluga_objects[beluga_name])
 
-                putdown_a = self._make_new_put_down_activity()
-                putdown_a.add_constraint(up.Equals(putdown_a.j, self.jig_objects[jig_name]))
-                putdown_a.add_constraint(up.Equals(putdown_a.s, self.side_beluga))
+                putdown_a = self._make_new_put_down_activity(j=self.jig_objects[jig_name], s=self.side_beluga)
 
 #                self.pb.add_constraint(up.Iff(unload_a.present, putdown_a.present))
                 self.pb.add_constraint(up.Implies(putdown_a.present, unload_a.present)) # "helper" constraint
@@ -701,14 +1351,16 @@ class BelugaModelOptSched:
                     (_, next_proceed) = self.all_proceeds_to_next_flight[flight_index]
                     self.pb.add_constraint(up.LT(unload_a.end, next_proceed.start), scope=[unload_a.present, next_proceed.present])
 
-                for earlier_unload_a in earlier_unloads:
-                    self.pb.add_constraint(up.LT(earlier_unload_a.end, unload_a.start), scope=[unload_a.present, earlier_unload_a.present])
+                self._add_precedences(earlier_unloads, unload_a)
+#                for earlier_unload_a in earlier_unloads:
 #                    self.pb.add_constraint(up.And(earlier_unload_a.present, up.LT(earlier_unload_a.end, unload_a.start)), scope=[unload_a.present])
 
                 self.all_unloads_w_putdowns[(jig_name, beluga_name, i)] = (unload_a, putdown_a)
                 self.all_putdowns.append(putdown_a)
+                self.putdowns_jig[putdown_a.name] = jig_name
 
-                earlier_unloads.append(unload_a)
+                # (unloads not referred to by any property are always present)
+                earlier_unloads.append((unload_a, (jig_name, beluga_name, i) not in self.pb_def.index.props_unload_beluga))
 
     def _add_flights_loads_w_pickups(self):
 
@@ -720,22 +1372,18 @@ class BelugaModelOptSched:
 
             for i, jig_or_jig_type_name in sorted(outgoing_jigs.items()):
 
-                pickup_a = self._make_new_pick_up_activity()
-
                 if jig_or_jig_type_name.startswith("jig"):
                     concrete_jig = jig_or_jig_type_name
                     aux_jig_var_or_obj = self.jig_objects[concrete_jig]
                 else:
                     concrete_jig = None
                     assert jig_or_jig_type_name.startswith("type")
-                    aux_jig_var_or_obj = self.pb.add_variable(f"_aux_jig_{pickup_a.name}", self.jig_subtypes[jig_or_jig_type_name])
+                    aux_jig_var_or_obj = self.pb.add_variable(f"_aux_jig_{jig_or_jig_type_name}_{beluga_name}_{i}", self.jig_subtypes[jig_or_jig_type_name])
 
-                pickup_a.add_constraint(up.Equals(pickup_a.j, aux_jig_var_or_obj))
-                pickup_a.add_constraint(up.Equals(pickup_a.s, self.side_beluga))
+                # (the jig, be it known or not, is shared by the pick-up and the load)
+                pickup_a = self._make_new_pick_up_activity(j=aux_jig_var_or_obj, s=self.side_beluga)
 
-                load_a = self._make_new_load_activity()
-                load_a.add_constraint(up.Equals(load_a.j, aux_jig_var_or_obj))
-                load_a.add_constraint(up.Equals(load_a.b, self.beluga_objects[beluga_name]))
+                load_a = self._make_new_load_activity(j=aux_jig_var_or_obj, b=self.beluga_objects[beluga_name])
 
                 self.pb.add_constraint(up.Iff(load_a.present, pickup_a.present))
 #                self.pb.add_constraint(up.Implies(load_a.present, pickup_a.present))
@@ -757,14 +1405,14 @@ class BelugaModelOptSched:
                     (_, next_proceed) = self.all_proceeds_to_next_flight[flight_index]
                     self.pb.add_constraint(up.LT(load_a.end, next_proceed.start), scope=[load_a.present, next_proceed.present])
 
-                for earlier_load_a in earlier_loads:
-                    self.pb.add_constraint(up.LT(earlier_load_a.end, load_a.start), scope=[load_a.present, earlier_load_a.present])
+                self._add_precedences(earlier_loads, load_a)
+#                for earlier_load_a in earlier_loads:
 #                    self.pb.add_constraint(up.And(earlier_load_a.present, up.LT(earlier_load_a.end, load_a.start)), scope=[load_a.present])
 
                 self.all_loads_w_pickups[(jig_or_jig_type_name, beluga_name, i)] = (load_a, pickup_a)
                 self.all_pickups.append(pickup_a)
 
-                earlier_loads.append(load_a)
+                earlier_loads.append((load_a, (jig_or_jig_type_name, beluga_name, i) not in self.pb_def.index.props_load_beluga))
 
     def _add_pls_deliveries_w_pickups_and_retrievals_w_opt_putdowns(self):
 
@@ -775,13 +1423,9 @@ class BelugaModelOptSched:
 
                 # pickup + deliver
 
-                pickup_a = self._make_new_pick_up_activity()
-                pickup_a.add_constraint(up.Equals(pickup_a.j, self.jig_objects[jig_name]))
-                pickup_a.add_constraint(up.Equals(pickup_a.s, self.side_production))
+                pickup_a = self._make_new_pick_up_activity(j=self.jig_objects[jig_name], s=self.side_production)
 
-                deliver_a = self._make_new_deliver_jig_to_hangar_activity()
-                deliver_a.add_constraint(up.Equals(deliver_a.j, self.jig_objects[jig_name]))
-                deliver_a.add_constraint(up.Equals(deliver_a.pl, self.production_line_objects[production_line.name]))
+                deliver_a = self._make_new_deliver_jig_to_hangar_activity(j=self.jig_objects[jig_name], pl=self.production_line_objects[production_line.name])
 
                 # self.pb.add_constraint(up.Implies(deliver_a.present, pickup_a.present))
                 # ^^ REMOVED ! Because the jig could already be initially on a trailer on the factory side !
@@ -790,26 +1434,23 @@ class BelugaModelOptSched:
 #                self.pb.add_constraint(up.And(pickup_a.present, up.LT(pickup_a.end, deliver_a.start)), scope=[deliver_a.present])
                 self.pb.add_constraint(up.LT(pickup_a.end, deliver_a.start), scope=[deliver_a.present, pickup_a.present])
 
-                for earlier_deliver_a in earlier_delivers:
-                    self.pb.add_constraint(up.LT(earlier_deliver_a.end, deliver_a.start), scope=[earlier_deliver_a.present, deliver_a.present])
+                self._add_precedences(earlier_delivers, deliver_a)
+#                for earlier_deliver_a in earlier_delivers:
 #                    self.pb.add_constraint(up.And(earlier_deliver_a.present, up.LT(earlier_deliver_a.end, deliver_a.start)), scope=[deliver_a.present])
 
                 self.all_delivers_w_pickups[(jig_name, production_line.name, i)] = (deliver_a, pickup_a)
                 self.all_pickups.append(pickup_a)
 
-                earlier_delivers.append(deliver_a)
+                earlier_delivers.append((deliver_a, (jig_name, production_line.name, i) not in self.pb_def.index.props_deliver_to_production_line))
 
                 # get + putdown
 
-                get_a = self._make_new_get_jig_from_hangar_activity()
-                get_a.add_constraint(up.Equals(get_a.j, self.jig_objects[jig_name]))
-                self.pb.add_constraint(up.Equals(get_a.h, deliver_a.h), scope=[get_a.present, deliver_a.present])
+                get_a = self._make_new_get_jig_from_hangar_activity(j=self.jig_objects[jig_name])
+                self.pb.add_constraint(up.Equals(self._arg(get_a, "h"), self._arg(deliver_a, "h")), scope=[get_a.present, deliver_a.present])
 
                 self.pb.add_constraint(up.LT(deliver_a.end, get_a.start), scope=[deliver_a.present, get_a.present])
 
-                putdown_a = self._make_new_put_down_activity()
-                putdown_a.add_constraint(up.Equals(putdown_a.j, self.jig_objects[jig_name]))
-                putdown_a.add_constraint(up.Equals(putdown_a.s, self.side_production))
+                putdown_a = self._make_new_put_down_activity(j=self.jig_objects[jig_name], s=self.side_production)
 
                 self.pb.add_constraint(up.LT(get_a.end, putdown_a.start), scope=[get_a.present, putdown_a.present])
 
@@ -817,6 +1458,7 @@ class BelugaModelOptSched:
 
                 self.all_gets_w_putdowns[jig_name] = (get_a, putdown_a)
                 self.all_putdowns.append(putdown_a)
+                self.putdowns_jig[putdown_a.name] = jig_name
 
     def _add_swaps(self):
         """Adding a limited number of allowed swaps to the task network. Uniquely identifiable because of their ids' ordering"""
@@ -838,6 +1480,7 @@ class BelugaModelOptSched:
 
             self.all_swap_pickups_n_putdowns[i] = (pickup_a, putdown_a)
             self.all_putdowns.append(putdown_a)
+            self.putdowns_jig[putdown_a.name] = None
 
     def _add_trailers_initial_jigs_opt_putdowns(self):
         # TODO: force these to be before all actions on these jigs (for performance)
@@ -845,20 +1488,18 @@ class BelugaModelOptSched:
         for trailer_b in self.pb_def.trailers_beluga:
             if trailer_b.jig is None:
                 continue
-            putdown_a = self._make_new_put_down_activity()
-            putdown_a.add_constraint(up.Equals(putdown_a.j, self.jig_objects[trailer_b.jig]))
-            putdown_a.add_constraint(up.Equals(putdown_a.s, self.side_beluga))
+            putdown_a = self._make_new_put_down_activity(j=self.jig_objects[trailer_b.jig], s=self.side_beluga)
 
             self.all_putdowns.append(putdown_a)
+            self.putdowns_jig[putdown_a.name] = trailer_b.jig
 
         for trailer_f in self.pb_def.trailers_factory:
             if trailer_f.jig is None:
                 continue
-            putdown_a = self._make_new_put_down_activity()
-            putdown_a.add_constraint(up.Equals(putdown_a.j, self.jig_objects[trailer_f.jig]))
-            putdown_a.add_constraint(up.Equals(putdown_a.s, self.side_production))
+            putdown_a = self._make_new_put_down_activity(j=self.jig_objects[trailer_f.jig], s=self.side_production)
 
             self.all_putdowns.append(putdown_a)
+            self.putdowns_jig[putdown_a.name] = trailer_f.jig
 
     def _add_hangars_initial_jigs_retrievals_w_opt_putdowns(self):
         # TODO: force these to be before all actions on these jigs (for performance)
@@ -867,25 +1508,21 @@ class BelugaModelOptSched:
             if hangar.jig is None:
                 continue
 
-            get_a = self._make_new_get_jig_from_hangar_activity()
-            get_a.add_constraint(up.Equals(get_a.j, self.jig_objects[hangar.jig]))
-            get_a.add_constraint(up.Equals(get_a.h, self.hangar_objects[hangar.name]))
+            get_a = self._make_new_get_jig_from_hangar_activity(j=self.jig_objects[hangar.jig], h=self.hangar_objects[hangar.name])
 
-            putdown_a = self._make_new_put_down_activity()
-            putdown_a.add_constraint(up.Equals(putdown_a.j, self.jig_objects[hangar.jig]))
-            putdown_a.add_constraint(up.Equals(putdown_a.s, self.side_production))
+            putdown_a = self._make_new_put_down_activity(j=self.jig_objects[hangar.jig], s=self.side_production)
 
             self.pb.add_constraint(up.LT(get_a.end, putdown_a.start), scope=[get_a.present, putdown_a.present])
 
             self.pb.add_constraint(up.Implies(putdown_a.present, get_a.present))
 
             self.all_putdowns.append(putdown_a)
+            self.putdowns_jig[putdown_a.name] = hangar.jig
 
     def _add_opt_pickup_for_each_jig_last_non_swap(self):
 
         for _, jig_obj in self.jig_objects.items():
-            pickup_a = self._make_new_pick_up_activity()
-            pickup_a.add_constraint(up.Equals(pickup_a.j, jig_obj))
+            pickup_a = self._make_new_pick_up_activity(j=jig_obj)
 
             self.all_pickups.append(pickup_a)
 
@@ -904,10 +1541,7 @@ class BelugaModelOptSched:
 
             terms = []
 
-            rack_initially_empty = up.Bool(
-                self.pb.explicit_initial_values[self.rack_free_space(self.rack_objects[rack_name])]
-                == self.pb.explicit_initial_values[self.rack_size(self.rack_objects[rack_name])]
-            )
+            rack_initially_empty = up.Bool(len(self.pb_def.index.racks[rack_name].jigs) == 0)
             terms += [rack_initially_empty]
             #terms += [up.Implies(putdown.present, up.Not(up.Equals(putdown.get_parameter("r"), self.rack_objects[rack_name])))
             #          for (_, putdown) in self.all_unloads_w_putdowns.values()]
@@ -915,7 +1549,7 @@ class BelugaModelOptSched:
             #          for (_, putdown) in self.all_gets_w_putdowns.values()]
             #terms += [up.Implies(putdown.present, up.Not(up.Equals(putdown.get_parameter("r"), self.rack_objects[rack_name])))
             #          for (_, putdown) in self.all_swap_pickups_n_putdowns.values()]
-            terms += [up.Implies(putdown.present, up.Not(up.Equals(putdown.get_parameter("r"), self.rack_objects[rack_name])))
+            terms += [up.Implies(putdown.present, up.Not(up.Equals(self._arg(putdown, "r"), self.rack_objects[rack_name])))
                       for putdown in self.all_putdowns]
 
             self.pb.add_constraint(up.Iff(r_always_empty, up.And(terms)))
@@ -943,15 +1577,8 @@ class BelugaModelOptSched:
 
             for _r in self.pb_def.racks:
                 rack_name = _r.name
-
-                found_among_props_rack_always_empty = False
-                for (pid, rn) in self.pb_def.props_rack_always_empty:
-                    if rn == rack_name:
-                        terms += [self._reify_prop_rack_always_empty(rack_name, pid)]
-                        found_among_props_rack_always_empty = True
-                        break
-                if not found_among_props_rack_always_empty:
-                    terms += [self._reify_prop_rack_always_empty(rack_name, None)]
+                pid = self.pb_def.index.props_rack_always_empty.get(rack_name, None)
+                terms += [self._reify_prop_rack_always_empty(rack_name, pid)]
 
             self.pb.add_constraint(up.Iff(at_least_one_rack_always_empty, up.Or(terms)))
 
@@ -973,15 +1600,10 @@ class BelugaModelOptSched:
 
             terms = []
 
-            _temp = self.pb.explicit_initial_values.get(self.at(self.jig_objects[jig_name]), None)
-            if _temp is not None and _temp.object() in self.rack_objects.values(): # (if initially at a rack, and not a beluga for example)
-                rack_jig_is_initially_at = _temp.object()
-            else:
-                rack_jig_is_initially_at = None
+            rack_jig_is_initially_at = self.pb_def.index.jig_initial_rack(jig_name) # (if initially at a rack, and not a beluga for example)
 
             if rack_jig_is_initially_at is not None:
-                assert self.rack_size(rack_jig_is_initially_at) in self.pb.explicit_initial_values
-                terms += [up.LE(self.pb.explicit_initial_values[self.rack_size(rack_jig_is_initially_at)], max_allowed_rack_size)]
+                terms += [up.Bool(self.pb_def.index.racks[rack_jig_is_initially_at].size <= max_allowed_rack_size)]
 
             #terms += [up.Implies(putdown.present, up.LE(putdown.get_parameter("rs"), max_allowed_rack_size))
             #          for (_, putdown) in self.all_unloads_w_putdowns.values()]
@@ -989,7 +1611,7 @@ class BelugaModelOptSched:
             #          for (_, putdown) in self.all_gets_w_putdowns.values()]
             #terms += [up.Implies(putdown.present, up.LE(putdown.get_parameter("rs"), max_allowed_rack_size))
             #          for (_, putdown) in self.all_swap_pickups_n_putdowns.values()]
-            terms += [up.Implies(putdown.present, up.LE(putdown.get_parameter("rs"), max_allowed_rack_size))
+            terms += [up.Implies(putdown.present, up.LE(self._arg(putdown, "rs"), max_allowed_rack_size))
                       for putdown in self.all_putdowns]
 
             self.pb.add_constraint(up.Iff(jig_always_placed_on_rack_shorter_or_same_size_as, up.And(terms)))
@@ -1029,14 +1651,10 @@ class BelugaModelOptSched:
 
             terms = []
 
-            _temp = self.pb.explicit_initial_values.get(self.at(self.jig_objects[jig_name]), None)
-            if _temp is not None and _temp.object() in self.rack_objects.values(): # (if initially at a rack, and not a beluga for example)
-                rack_jig_is_initially_at = _temp.object()
-            else:
-                rack_jig_is_initially_at = None
+            rack_jig_is_initially_at = self.pb_def.index.jig_initial_rack(jig_name) # (if initially at a rack, and not a beluga for example)
 
             if rack_jig_is_initially_at is not None:
-                terms += [up.Not(up.Equals(rack_jig_is_initially_at, self.rack_objects[rack_name]))]
+                terms += [up.Bool(rack_jig_is_initially_at != rack_name)]
 
             #terms += [up.Implies(putdown.present,
             #                     up.Implies(up.Equals(putdown.get_parameter("j"), self.jig_objects[jig_name]),
@@ -1052,9 +1670,9 @@ class BelugaModelOptSched:
             #          for (_, putdown) in self.all_swap_pickups_n_putdowns.values()]
             
             terms += [up.Implies(putdown.present,
-                                 up.Implies(up.Equals(putdown.get_parameter("j"), self.jig_objects[jig_name]),
-                                            up.Not(up.Equals(putdown.get_parameter("r"), self.rack_objects[rack_name]))))
-                      for putdown in self.all_putdowns]
+                                 up.Implies(is_jig,
+                                            up.Not(up.Equals(self._arg(putdown, "r"), self.rack_objects[rack_name]))))
+                      for (putdown, is_jig) in self._putdowns_of_jig(jig_name)]
 
             self.pb.add_constraint(up.Iff(jig_never_on_rack, up.And(terms)))
 
@@ -1082,14 +1700,8 @@ class BelugaModelOptSched:
                 if rack_name == _r.name:
                     continue
 
-                found_among_props_jig_never_on_rack = False
-                for (pid, (jn, rn)) in self.pb_def.props_jig_never_on_rack:
-                    if jn == jig_name and rn == _r.name:
-                        terms += [self._reify_prop_jig_never_on_rack(jig_name, _r.name, pid)]
-                        found_among_props_jig_never_on_rack = True
-                        break
-                if not found_among_props_jig_never_on_rack:
-                    terms += [self._reify_prop_jig_never_on_rack(jig_name, _r.name, None)]
+                pid = self.pb_def.index.props_jig_never_on_rack.get((jig_name, _r.name), None)
+                terms += [self._reify_prop_jig_never_on_rack(jig_name, _r.name, pid)]
 
             # "jig only if ever on rack" encoded as "jig never on any other racks"
             self.pb.add_constraint(up.Iff(jig_only_if_ever_on_rack, up.And(terms)))
@@ -1112,13 +1724,8 @@ class BelugaModelOptSched:
         else:
             j1_delivered_to_pl1_before_j2_delivered_to_pl2 = self.pb.add_variable(reif_name, up.BoolType())
 
-            deliver1_a = None
-            deliver2_a = None
-            for (jn, pln, _), (deliver_a, _) in self.all_delivers_w_pickups.items():
-                if jn == jig1_name and pln == pl1_name:
-                    deliver1_a = deliver_a
-                if jn == jig2_name and pln == pl2_name:
-                    deliver2_a = deliver_a
+            deliver1_a = self.delivers_by_jig_and_pl.get((jig1_name, pl1_name), None)
+            deliver2_a = self.delivers_by_jig_and_pl.get((jig2_name, pl2_name), None)
 
             self.pb.add_constraint(
                 up.Iff(
@@ -1149,24 +1756,37 @@ class BelugaModelOptSched:
         else:
             jig1_putdown_on_rack1_before_jig2_putdown_on_rack2 = self.pb.add_variable(reif_name, up.BoolType())
 
-            all_putdowns = []
-            #all_putdowns += [putdown_a for _, putdown_a in self.all_unloads_w_putdowns.values()]
-            #all_putdowns += [putdown_a for _, putdown_a in self.all_gets_w_putdowns.values()]
-            #all_putdowns += [putdown_a for _, putdown_a in self.all_swap_pickups_n_putdowns.values()]
-            all_putdowns = self.all_putdowns
+            # Rather than a disjunction over all pairs of put-downs (quadratic in their number), the time of
+            # the first put-down of jig1 on rack1 is captured by an auxiliary variable, which the put-downs
+            # of jig2 on rack2 are then compared to. Only the put-downs that may be applied to jig1 / jig2 are considered.
+
+            def _putdown_on_rack(putdown, is_jig, rack_name):
+                return up.And(putdown.present, is_jig, up.Equals(self._arg(putdown, "r"), self.rack_objects[rack_name]))
+
+            jig1_putdowns_on_rack1 = [(putdown1_a, _putdown_on_rack(putdown1_a, is_jig1, rack1_name))
+                                      for (putdown1_a, is_jig1) in self._putdowns_of_jig(jig1_name)]
+            jig2_putdowns_on_rack2 = [(putdown2_a, _putdown_on_rack(putdown2_a, is_jig2, rack2_name))
+                                      for (putdown2_a, is_jig2) in self._putdowns_of_jig(jig2_name)]
+
+            jig1_ever_on_rack1 = self.pb.add_variable(reif_name+"_aux_ever", up.BoolType())
+            jig1_first_on_rack1 = self.pb.add_variable(reif_name+"_aux_first_end", up.IntType())
+
+            self.pb.add_constraint(up.Iff(jig1_ever_on_rack1, up.Or(cond for (_, cond) in jig1_putdowns_on_rack1)))
+            for (putdown1_a, cond) in jig1_putdowns_on_rack1:
+                self.pb.add_constraint(up.Implies(cond, up.LE(jig1_first_on_rack1, putdown1_a.end)))
+            self.pb.add_constraint(
+                up.Implies(
+                    jig1_ever_on_rack1,
+                    up.Or(up.And(cond, up.LE(putdown1_a.end, jig1_first_on_rack1)) for (putdown1_a, cond) in jig1_putdowns_on_rack1),
+                )
+            )
 
             self.pb.add_constraint(
                 up.Iff(
                     jig1_putdown_on_rack1_before_jig2_putdown_on_rack2,
-                    up.Or(
-                        up.And(
-                            up.Equals(putdown1_a.get_parameter("j"), self.rack_objects[jig1_name]),
-                            up.Equals(putdown1_a.get_parameter("r"), self.rack_objects[rack1_name]),
-                            up.Equals(putdown2_a.get_parameter("j"), self.rack_objects[jig2_name]),
-                            up.Equals(putdown2_a.get_parameter("r"), self.rack_objects[rack2_name]),
-                            up.LT(putdown1_a.end, putdown2_a.start),
-                        )
-                        for putdown1_a in all_putdowns for putdown2_a in all_putdowns
+                    up.And(
+                        jig1_ever_on_rack1,
+                        up.Or(up.And(cond, up.LT(jig1_first_on_rack1, putdown2_a.start)) for (putdown2_a, cond) in jig2_putdowns_on_rack2),
                     )
                 )
             )
@@ -1188,16 +1808,8 @@ class BelugaModelOptSched:
         else:
             jig_delivered_to_pl_before_flight = self.pb.add_variable(reif_name, up.BoolType())
 
-            deliver_a = None
-            for (jn, pln, _), (_deliver_a, _) in self.all_delivers_w_pickups.items():
-                if jn == jig_name and pln == pl_name:
-                    deliver_a = _deliver_a
-                    break
-            proceed_a = None # FIXME TODO !!! what if the 1st flight is selected ? nothing can be before it and there is no corresponding "proceed" action... 
-            for bn, _proceed_a in self.all_proceeds_to_next_flight:
-                if bn == beluga_name:
-                    proceed_a = _proceed_a
-                    break
+            deliver_a = self.delivers_by_jig_and_pl.get((jig_name, pl_name), None)
+            proceed_a = self.proceeds_by_flight.get(beluga_name, None) # FIXME TODO !!! what if the 1st flight is selected ? nothing can be before it and there is no corresponding "proceed" action... 
 
             self.pb.add_constraint(
                 up.Iff(
@@ -0,0 +1,143 @@
+import os
+import json
+import shutil
+import filecmp
+import hashlib
+
+from parser import *
+from model import *
+
+# Content-addressed on-disk cache of built models.
+#
+# Entries are keyed by a hash of the parsed problem definition (which includes `props_ids_hard_list`),
+# of the number of available swaps, of the model building options and of the source of the model (see `MODEL_SOURCE_DIGEST`). Each entry is a directory holding the serialized problem
+# (`problem.upp`) and the metadata needed to restore the model without rebuilding it (`meta.json`).
+# The total size of the cache is bounded: least recently used entries are evicted first.
+
+# (bumped when the layout of entries changes: changes to the model itself are taken into account by `MODEL_SOURCE_DIGEST`)
+MODEL_CACHE_FORMAT_VERSION = 4
+
+def model_cache_key(pb_def: BelugaProblemDef, num_available_swaps: int, chain_precedences: bool, symmetry_breaking: bool) -> str:
+    k = "{}:{}:{}:{}:{}:{}".format(MODEL_CACHE_FORMAT_VERSION, MODEL_SOURCE_DIGEST, problem_def_digest(pb_def), num_available_swaps, int(chain_precedences), int(symmetry_breaking))
+    return hashlib.sha256(k.encode('utf-8')).hexdigest()
+
+class BelugaModelCache:
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_bytes: int,
+        chain_precedences: bool = False,
+        symmetry_breaking: bool = False,
+    ):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.chain_precedences = chain_precedences
+        self.symmetry_breaking = symmetry_breaking
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _upp_path(self, key: str) -> str:
+        return os.path.join(self._entry_dir(key), "problem.upp")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self._entry_dir(key), "meta.json")
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._upp_path(key)) and os.path.exists(self._meta_path(key))
+
+    def _touch(self, key: str):
+        # (the modification time of the metadata file is used as the "last used" time for eviction)
+        os.utime(self._meta_path(key))
+
+    def get_metadata(self, key: str) -> dict | None:
+        if not self.has(key):
+            return None
+        with open(self._meta_path(key)) as f:
+            metadata = json.load(f)
+        self._touch(key)
+        return metadata
+
+    def put(self, key: str, beluga_model: BelugaModelOptSched):
+        tmp_dir = self._entry_dir(key)+".tmp{}".format(os.getpid())
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        serialize_problem(beluga_model.pb, os.path.join(tmp_dir, "problem.upp"))
+        with open(os.path.join(tmp_dir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(beluga_model.serialized_metadata(), f, ensure_ascii=False)
+
+        # (entries are written aside and then moved in place, so that a concurrent run never sees a partial entry)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        os.replace(tmp_dir, self._entry_dir(key))
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for key in os.listdir(self.cache_dir):
+            if not self.has(key):
+                continue
+            size = os.path.getsize(self._upp_path(key)) + os.path.getsize(self._meta_path(key))
+            entries.append((os.path.getmtime(self._meta_path(key)), size, key))
+            total_size += size
+
+        for (_, size, key) in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total_size -= size
+
+    def get_or_build_model(
+        self,
+        pb_def: BelugaProblemDef,
+        name: str,
+        num_available_swaps: int,
+    ) -> tuple[str, BelugaModelOptSched]:
+
+        key = model_cache_key(pb_def, num_available_swaps, self.chain_precedences, self.symmetry_breaking)
+
+        metadata = self.get_metadata(key)
+        if metadata is not None:
+            try:
+                return (key, BelugaModelOptSched.from_serialized(pb_def, deserialize_problem(self._upp_path(key)), metadata))
+            except Exception as e:
+                print("could not restore cached model {} ({}), rebuilding it".format(key, repr(e)))
+
+        beluga_model = BelugaModelOptSched(pb_def, name, num_available_swaps, None, self.chain_precedences, self.symmetry_breaking)
+        self.put(key, beluga_model)
+        return (key, beluga_model)
+
+    def get_or_build_upp(
+        self,
+        pb_def: BelugaProblemDef,
+        name: str,
+        num_available_swaps: int,
+    ) -> str:
+        """
+        Returns the key of the cache entry holding the serialized problem, building the model only on a cache miss.
+        """
+        key = model_cache_key(pb_def, num_available_swaps, self.chain_precedences, self.symmetry_breaking)
+
+        if self.get_metadata(key) is None:
+            self.put(key, BelugaModelOptSched(pb_def, name, num_available_swaps, None, self.chain_precedences, self.symmetry_breaking))
+        return key
+
+    def write_upp(self, key: str, filename: str):
+        """
+        Copies the serialized problem of a cache entry to `filename`, unless it already holds the exact same content.
+        """
+        if os.path.exists(filename) and filecmp.cmp(self._upp_path(key), filename, shallow=False):
+            return
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        shutil.copyfile(self._upp_path(key), filename)
+
+def default_model_cache(output_folder: str) -> BelugaModelCache:
+    return BelugaModelCache(
+        os.environ.get('MODEL_CACHE_DIR', os.path.join(output_folder, "cache/models")),
+        int(os.environ.get('MODEL_CACHE_MAX_SIZE_MB', 1024)) * 1024 * 1024,
+        os.environ.get('CHAIN_PRECEDENCES', '0') == '1',
+        os.environ.get('SYMMETRY_BREAKING', '0') == '1',
+    )
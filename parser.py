@@ -1,7 +1,8 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 from types import SimpleNamespace
 
 import json
+import hashlib
 
 # # # 
 
@@ -77,11 +78,174 @@ class BelugaProblemDef:
 
     props_ids_hard_list: list[PropId] = field(default_factory=lambda:[])
 
+    def __post_init__(self):
+        self.reindex()
+
+    def reindex(self):
+        """
+        (Re)builds the index of the problem definition. Only needs to be called explicitly
+        if the problem definition is modified after its construction.
+        """
+        self.index = BelugaProblemIndex.build(self)
+
     def get_jig_type(self, name: str) -> JigType:
-        return next(x for x in self.jig_types if x.name == name)
+        return self.index.jig_types[name]
 
     def get_jig(self, name: str) -> Jig:
-        return next(x for x in self.jigs if x.name == name)
+        return self.index.jigs[name]
+
+    def properties_definitions(self) -> dict[PropId, dict]:
+        """
+        The properties, as in the "properties" JSON file (i.e. `{prop_id: {"name": ..., "parameters": [...]}}`).
+        """
+        defs: dict[PropId, dict] = {}
+        for (prop_id, params) in self.props_unload_beluga:
+            defs[prop_id] = { "name": "unload_beluga", "parameters": list(params) }
+        for (prop_id, params) in self.props_load_beluga:
+            defs[prop_id] = { "name": "load_beluga", "parameters": list(params) }
+        for (prop_id, params) in self.props_deliver_to_production_line:
+            defs[prop_id] = { "name": "deliver_to_production_line", "parameters": list(params) }
+        for (prop_id, rack_name) in self.props_rack_always_empty:
+            defs[prop_id] = { "name": "rack_always_empty", "parameters": [rack_name] }
+        if self.prop_at_least_one_rack_always_empty is not None:
+            defs[self.prop_at_least_one_rack_always_empty] = { "name": "at_least_one_rack_always_empty", "parameters": [] }
+        for (prop_id, params) in self.props_jig_always_placed_on_rack_size_leq:
+            defs[prop_id] = { "name": "jig_always_placed_on_rack_size_leq", "parameters": list(params) }
+        for (prop_id, num) in self.props_num_swaps_used_leq:
+            defs[prop_id] = { "name": "num_swaps_used_leq", "parameters": [num] }
+        for (prop_id, params) in self.props_jig_never_on_rack:
+            defs[prop_id] = { "name": "jig_never_on_rack", "parameters": list(params) }
+        for (prop_id, params) in self.props_jig_only_if_ever_on_rack:
+            defs[prop_id] = { "name": "jig_only_if_ever_on_rack", "parameters": list(params) }
+        for (prop_id, params) in self.props_jig_to_production_line_order:
+            defs[prop_id] = { "name": "jig_to_production_line_order", "parameters": list(params) }
+        for (prop_id, params) in self.props_jig_to_rack_order:
+            defs[prop_id] = { "name": "jig_to_rack_order", "parameters": list(params) }
+        for (prop_id, params) in self.props_jig_to_production_line_before_flight:
+            defs[prop_id] = { "name": "jig_to_production_line_before_flight", "parameters": list(params) }
+        return defs
+
+@dataclass
+class BelugaProblemIndex:
+    """
+    Name -> object maps and initial locations / positions of jigs, built once from a `BelugaProblemDef`.
+    """
+    jigs: dict[str, Jig]
+    jig_types: dict[str, JigType]
+    racks: dict[str, Rack]
+    trailers: dict[str, Trailer]
+    hangars: dict[str, Hangar]
+    production_lines: dict[str, ProductionLine]
+    flights: dict[str, Flight]
+
+    flights_order: dict[str, int]                       # flight -> index of the flight (in the order of flights)
+    trailers_side: dict[str, str]                       # trailer -> "beluga" | "factory"
+
+    jig_initial_location: dict[str, tuple[str, str]]    # jig -> ("rack" | "trailer" | "hangar" | "beluga", name)
+    jig_initial_rack_position: dict[str, int]           # jig -> position in its initial rack (0 being on the beluga side)
+    jig_incoming: dict[str, tuple[str, int]]            # jig -> (flight, index in the flight's incoming jigs)
+    jig_outgoing: dict[str, tuple[str, int]]            # jig (concrete only) -> (flight, index in the flight's outgoing jigs)
+    jig_scheduled: dict[str, tuple[str, int]]           # jig -> (production line, index in the production line's schedule)
+
+    # properties, indexed by their parameters (if several properties have the same parameters, the first one is kept)
+    props_unload_beluga: dict[tuple[str, str, int], PropId]
+    props_load_beluga: dict[tuple[str, str, int], PropId]
+    props_deliver_to_production_line: dict[tuple[str, str, int], PropId]
+    props_rack_always_empty: dict[str, PropId]
+    props_jig_never_on_rack: dict[tuple[str, str], PropId]
+    props_jig_only_if_ever_on_rack: dict[tuple[str, str], PropId]
+
+    def jig_initial_size(self, jig_name: str) -> int:
+        jig = self.jigs[jig_name]
+        jig_type = self.jig_types[jig.type]
+        return jig_type.size_empty if jig.empty else jig_type.size_loaded
+
+    def jig_initial_rack(self, jig_name: str) -> str | None:
+        (kind, name) = self.jig_initial_location.get(jig_name, ("", ""))
+        return name if kind == "rack" else None
+
+    # (unload / load / deliver properties insert their jig in the flight's / production line's slots when parsed:
+    # the slots below are the base (i.e. mandatory) ones, and the ones of the properties in `prop_ids`, if given)
+
+    def flight_incoming(self, flight_name: str, prop_ids: set[PropId] = frozenset()) -> dict[int, str]:
+        return _slots(self.flights[flight_name].incoming, flight_name, self.props_unload_beluga, prop_ids)
+
+    def flight_outgoing(self, flight_name: str, prop_ids: set[PropId] = frozenset()) -> dict[int, str]:
+        return _slots(self.flights[flight_name].outgoing, flight_name, self.props_load_beluga, prop_ids)
+
+    def pl_schedule(self, pl_name: str, prop_ids: set[PropId] = frozenset()) -> dict[int, str]:
+        return _slots(self.production_lines[pl_name].schedule, pl_name, self.props_deliver_to_production_line, prop_ids)
+
+    @staticmethod
+    def build(pb_def: 'BelugaProblemDef') -> 'BelugaProblemIndex':
+
+        jig_initial_location: dict[str, tuple[str, str]] = {}
+        jig_initial_rack_position: dict[str, int] = {}
+        for r in pb_def.racks:
+            for k, jig_name in enumerate(r.jigs):
+                jig_initial_location[jig_name] = ("rack", r.name)
+                jig_initial_rack_position[jig_name] = k
+        for t in pb_def.trailers_beluga + pb_def.trailers_factory:
+            if t.jig is not None:
+                jig_initial_location[t.jig] = ("trailer", t.name)
+        for h in pb_def.hangars:
+            if h.jig is not None:
+                jig_initial_location[h.jig] = ("hangar", h.name)
+        for fl in pb_def.flights:
+            for jig_name in fl.incoming.values():
+                jig_initial_location[jig_name] = ("beluga", fl.name)
+
+        jigs = { j.name: j for j in pb_def.jigs }
+
+        def _index_props(props: list) -> dict:
+            d = {}
+            for (prop_id, params) in props:
+                d.setdefault(params, prop_id)
+            return d
+
+        return BelugaProblemIndex(
+            jigs=jigs,
+            jig_types={ jt.name: jt for jt in pb_def.jig_types },
+            racks={ r.name: r for r in pb_def.racks },
+            trailers={ t.name: t for t in pb_def.trailers_beluga + pb_def.trailers_factory },
+            hangars={ h.name: h for h in pb_def.hangars },
+            production_lines={ pl.name: pl for pl in pb_def.production_lines },
+            flights={ fl.name: fl for fl in pb_def.flights },
+            flights_order={ fl.name: i for i, fl in enumerate(pb_def.flights) },
+            trailers_side={
+                **{ t.name: "beluga" for t in pb_def.trailers_beluga },
+                **{ t.name: "factory" for t in pb_def.trailers_factory },
+            },
+            jig_initial_location=jig_initial_location,
+            jig_initial_rack_position=jig_initial_rack_position,
+            jig_incoming={ j: (fl.name, i) for fl in pb_def.flights for i, j in fl.incoming.items() },
+            jig_outgoing={ j: (fl.name, i) for fl in pb_def.flights for i, j in fl.outgoing.items() if j in jigs },
+            jig_scheduled={ j: (pl.name, i) for pl in pb_def.production_lines for i, j in pl.schedule.items() },
+            props_unload_beluga=_index_props(pb_def.props_unload_beluga),
+            props_load_beluga=_index_props(pb_def.props_load_beluga),
+            props_deliver_to_production_line=_index_props(pb_def.props_deliver_to_production_line),
+            props_rack_always_empty=_index_props(pb_def.props_rack_always_empty),
+            props_jig_never_on_rack=_index_props(pb_def.props_jig_never_on_rack),
+            props_jig_only_if_ever_on_rack=_index_props(pb_def.props_jig_only_if_ever_on_rack),
+        )
+
+def _slots(
+    slots: dict[int, str],
+    name: str,
+    props: dict[tuple[str, str, int], PropId],
+    prop_ids: set[PropId],
+) -> dict[int, str]:
+    res = {}
+    for i, j in slots.items():
+        prop_id = props.get((j, name, i), None)
+        if prop_id is None or prop_id in prop_ids:
+            res[i] = j
+    return res
+
+def problem_def_digest(pb_def: BelugaProblemDef) -> str:
+    """Content hash of a parsed problem (base + properties), stable across runs and processes."""
+    d = json.dumps(asdict(pb_def), sort_keys=True, default=str)
+    return hashlib.sha256(d.encode('utf-8')).hexdigest()
 
 @dataclass 
 class BelugaPlanAction:
@@ -104,6 +268,52 @@ def parse_plan(filename: str) -> BelugaPlanDef | None:
     plan_def = _parse_plan(d)
     return plan_def
 
+def plan_def_from_json(plan_as_json: list[dict[str, str]]) -> BelugaPlanDef:
+    return _parse_plan([SimpleNamespace(**a) for a in plan_as_json])
+
+def plan_def_to_json(plan_def: BelugaPlanDef) -> list[dict[str, str]]:
+    return [{ "name": a.name, **a.params } for a in plan_def]
+
+def iter_plan_actions(f, chunk_size: int = 1 << 16):
+    """
+    Actions of a plan, read incrementally from a (text) file holding either a JSON array of actions
+    or one action per line (NDJSON). Only the action being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    in_array = None
+
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = len(buf) == 0
+            continue
+
+        if in_array is None:
+            in_array = buf[pos] == '['
+            pos += 1 if in_array else 0
+            continue
+        if in_array and buf[pos] == ']':
+            break
+
+        # (an action may be cut by the end of a chunk: more is read until it decodes)
+        while True:
+            try:
+                (a, pos) = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = len(more) == 0
+                buf, pos = buf[pos:] + more, 0
+
+        yield BelugaPlanAction(a['name'], { k:v for (k,v) in a.items() if k != 'name' })
+
 def _parse_plan(d_plan) -> BelugaPlanDef:
     plan_def = BelugaPlanDef()
     for a in d_plan:
@@ -135,6 +345,14 @@ def _parse_problem_base(d) -> BelugaProblemDef:
 
 # # # 
 
+def parse_properties_definitions(filename: str) -> dict[PropId, dict]:
+    """
+    The properties of a "properties" JSON file, as in `BelugaProblemDef.properties_definitions` (in the file's order).
+    """
+    with open(filename) as f:
+        d = json.load(f)
+    return { PropId(entry["_id"]): entry["definition"] for entry in d }
+
 def parse_problem_and_properties(problem_base_filename: str, problem_properties_filename: str):
     production_lines: list[ProductionLine] = []
     flights: list[Flight] = []
@@ -0,0 +1,159 @@
+import time
+import multiprocessing as mp
+import queue
+
+from parser import *
+from model import *
+
+# Parallel portfolio over the number of swaps to use.
+#
+# Instead of solving for n = 0, 1, 2, ... swaps one after the other (as in the `solve` subcommand),
+# several swap counts are solved at once in separate processes. As soon as the smallest feasible
+# number of swaps is settled (i.e. a plan was found for n and all smaller counts were proven infeasible),
+# the remaining workers are terminated.
+#
+# Workers solve without a timeout (the global deadline, if any, is enforced by terminating them), so that not finding
+# a plan proves infeasibility. Workers that fail, or die without reporting (e.g. killed), leave their count unknown.
+
+STATUS_PLAN = "plan"
+STATUS_INFEASIBLE = "infeasible"
+STATUS_UNKNOWN = "unknown"
+STATUS_ERROR = "error"
+
+# (seconds between checks that the running workers are still alive)
+WORKERS_POLL_INTERVAL = 1.0
+
+def _solve_for_num_swaps(
+    pb_def: BelugaProblemDef,
+    name: str,
+    num_available_swaps: int,
+    num_swaps_to_use: int,
+    results: mp.Queue,
+    chain_precedences: bool,
+    symmetry_breaking: bool,
+):
+    try:
+        beluga_model = BelugaModelOptSched(pb_def, name, num_available_swaps, None, chain_precedences, symmetry_breaking)
+        (_, plan_as_json) = beluga_model.solve_with_properties(
+            list(beluga_model.properties.keys()),
+            num_swaps_to_use,
+            None,
+        )
+    except Exception as e:
+        print("solving with {} swaps failed: {}".format(num_swaps_to_use, repr(e)))
+        results.put((num_swaps_to_use, STATUS_ERROR, None))
+        return
+    # (without a timeout, not finding a plan means the query is infeasible)
+    results.put((num_swaps_to_use, STATUS_PLAN if plan_as_json is not None else STATUS_INFEASIBLE, plan_as_json))
+
+def solve_portfolio_over_swaps(
+    pb_def: BelugaProblemDef,
+    name: str,
+    num_available_swaps: int,
+    num_workers: int,
+    deadline: float | None,
+    chain_precedences: bool = False,
+    symmetry_breaking: bool = False,
+    min_num_swaps: int = 0,
+) -> tuple[int | None, list[dict[str, str]] | None, bool]:
+    """
+    Returns the smallest number of swaps for which a plan was found (and that plan), or `(None, None)`,
+    along with whether all smaller numbers of swaps were proven infeasible (i.e. the number of swaps is minimal).
+
+    `min_num_swaps` is a number of swaps known to be needed (see `swaps_bounds`): smaller ones are not solved for.
+
+    `deadline` is a global time budget (in seconds). If it is reached, the smallest number of swaps
+    for which a plan was found so far is returned, even if smaller ones were not all proven infeasible yet.
+    """
+
+    start_time = time.time()
+    results = mp.Queue()
+
+    workers: dict[int, mp.Process] = {}
+    statuses: dict[int, str] = {}
+    plans: dict[int, list[dict[str, str]]] = {}
+
+    # (known to be infeasible)
+    for n in range(min(min_num_swaps, num_available_swaps+1)):
+        statuses[n] = STATUS_INFEASIBLE
+
+    next_n = min_num_swaps
+
+    def _remaining_time() -> float | None:
+        return None if deadline is None else max(0.0, deadline - (time.time() - start_time))
+
+    def _best_feasible() -> int | None:
+        return min(plans, default=None)
+
+    def _proven_minimal(best: int) -> bool:
+        return all(statuses.get(n, None) == STATUS_INFEASIBLE for n in range(best))
+
+    def _settled() -> bool:
+        best = _best_feasible()
+        if best is not None:
+            return _proven_minimal(best)
+        return all(statuses.get(n, None) == STATUS_INFEASIBLE for n in range(num_available_swaps+1))
+
+    def _on_result(n: int, status: str, plan_as_json: list[dict[str, str]] | None):
+        print('swaps allowed: {} -> {}'.format(n, status))
+        statuses[n] = status
+        if status == STATUS_PLAN:
+            plans[n] = plan_as_json
+        w = workers.pop(n, None)
+        if w is not None:
+            w.join()
+
+    try:
+        while True:
+            best = _best_feasible()
+            while (
+                len(workers) < num_workers
+                and next_n <= num_available_swaps
+                and (best is None or next_n < best)
+            ):
+                w = mp.Process(
+                    target=_solve_for_num_swaps,
+                    args=(pb_def, name, num_available_swaps, next_n, results, chain_precedences, symmetry_breaking),
+                    daemon=True,
+                )
+                w.start()
+                workers[next_n] = w
+                next_n += 1
+
+            if _settled() or len(workers) == 0:
+                break
+
+            remaining_time = _remaining_time()
+            if remaining_time is not None and remaining_time <= 0:
+                break
+
+            try:
+                _on_result(*results.get(timeout=WORKERS_POLL_INTERVAL if remaining_time is None else min(WORKERS_POLL_INTERVAL, remaining_time)))
+            except queue.Empty:
+                dead = [n for n, w in workers.items() if not w.is_alive()]
+                # (results they may have posted just before exiting are taken into account first)
+                try:
+                    while True:
+                        _on_result(*results.get_nowait())
+                except queue.Empty:
+                    pass
+                for n in dead:
+                    if n in workers:
+                        print("worker for {} swaps died (exit code {})".format(n, workers[n].exitcode))
+                        _on_result(n, STATUS_UNKNOWN, None)
+
+            # no need to keep solving for larger numbers of swaps than a feasible one
+            best = _best_feasible()
+            for m in [m for m in workers if best is not None and m > best]:
+                workers.pop(m).terminate()
+
+    finally:
+        for w in workers.values():
+            w.terminate()
+        for w in workers.values():
+            w.join()
+
+    best = _best_feasible()
+    if best is None:
+        return (None, None, False)
+    return (best, plans[best], _proven_minimal(best))
@@ -0,0 +1,218 @@
+from parser import *
+from checker import *
+from model import *
+
+# Local repair of an existing plan, when the set of properties (or, slightly, the problem) changed.
+#
+# The properties that the plan no longer satisfies (see `check_plan_properties`), and the flights / production
+# line positions where the plan no longer matches the problem, give a window of flights. The activities of the plan
+# outside that window are frozen (see `make_hints`), and only the ones inside it are solved for.
+# If no plan is found that way, the problem is solved from scratch.
+
+def plan_actions_flights(plan_def: BelugaPlanDef) -> list[int]:
+    """
+    Index of the flight during which each action of the plan happens.
+    """
+    res = []
+    flight_index = 0
+    for act in plan_def:
+        if act.name == "switch_to_next_beluga":
+            flight_index += 1
+        res.append(flight_index)
+    return res
+
+def _broken_property_flights(
+    pb_def: BelugaProblemDef,
+    plan_def: BelugaPlanDef,
+    actions_flights: list[int],
+    prop_name: str,
+    prop_params: list,
+) -> set[int] | None:
+    """
+    Flights involved in a property the plan does not satisfy (or `None`, if the property is not local to any flights).
+    """
+    def _flights_of(pred) -> set[int]:
+        return { actions_flights[k] for k, act in enumerate(plan_def) if pred(act) }
+
+    def _is_rack_action(act: BelugaPlanAction) -> bool:
+        return act.name in ["put_down_rack", "pick_up_rack"]
+
+    def _is_deliver_of(act: BelugaPlanAction, j: str, pl: str) -> bool:
+        return act.name == "deliver_to_hangar" and act.params['j'] == j and act.params['pl'] == pl
+
+    if prop_name in ["unload_beluga", "load_beluga"]:
+        res = { pb_def.index.flights_order[prop_params[1]] }
+
+    elif prop_name == "deliver_to_production_line":
+        j, pl, i = prop_params[0], prop_params[1], int(prop_params[2])
+        pl_delivers_flights = [actions_flights[k] for k, act in enumerate(plan_def) if act.name == "deliver_to_hangar" and act.params['pl'] == pl]
+        res = _flights_of(lambda act: act.name == "deliver_to_hangar" and act.params['j'] == j)
+        res |= set(pl_delivers_flights[max(0, i-1):i+1])
+
+    elif prop_name == "jig_to_production_line_before_flight":
+        j, pl, b = prop_params[0], prop_params[1], prop_params[2]
+        res = _flights_of(lambda act: _is_deliver_of(act, j, pl)) | { pb_def.index.flights_order[b] }
+
+    elif prop_name == "jig_to_production_line_order":
+        j1, pl1, j2, pl2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
+        res = _flights_of(lambda act: _is_deliver_of(act, j1, pl1) or _is_deliver_of(act, j2, pl2))
+
+    elif prop_name == "rack_always_empty":
+        r = prop_params[0]
+        res = _flights_of(lambda act: _is_rack_action(act) and act.params['r'] == r)
+
+    elif prop_name in ["jig_never_on_rack", "jig_only_if_ever_on_rack", "jig_always_placed_on_rack_size_leq"]:
+        j = prop_params[0]
+        res = _flights_of(lambda act: _is_rack_action(act) and act.params['j'] == j)
+
+    elif prop_name == "jig_to_rack_order":
+        j1, j2 = prop_params[0], prop_params[2]
+        res = _flights_of(lambda act: _is_rack_action(act) and act.params['j'] in [j1, j2])
+
+    else:
+        # (at_least_one_rack_always_empty, num_swaps_used_leq)
+        return None
+
+    return res if len(res) > 0 else None
+
+def _matches_slots(
+    used: list[str],
+    slots: list[tuple[str, bool]],
+    matches,
+) -> bool:
+    """
+    Whether the jigs used (in order) can be matched to (in order) slots `(jig or jig type, required)`,
+    all the required ones being used (the other ones being optional, like the activities of the model).
+    """
+    # (numbers of jigs used that can be matched to the slots seen so far)
+    num_matched = {0}
+    for (x, required) in slots:
+        num_matched = (
+            { i+1 for i in num_matched if i < len(used) and matches(used[i], x) }
+            | (num_matched if not required else set())
+        )
+    return len(used) in num_matched
+
+def _mismatching_flights(
+    pb_def: BelugaProblemDef,
+    plan_def: BelugaPlanDef,
+    actions_flights: list[int],
+    prop_ids: list[PropId],
+) -> set[int]:
+    """
+    Flights whose unloads / loads, or during which deliveries, no longer match the problem: that is, its base slots,
+    and those of the unload / load / deliver properties in `prop_ids` (the slots of the other ones may or may not be used).
+    """
+    index = pb_def.index
+    selected = set(prop_ids)
+    res = set()
+
+    unloads: dict[str, list[str]] = {}
+    loads: dict[str, list[str]] = {}
+    delivers: dict[str, list[tuple[str, int]]] = {}
+    for k, act in enumerate(plan_def):
+        if act.name == "unload_beluga":
+            unloads.setdefault(act.params['b'], []).append(act.params['j'])
+        elif act.name == "load_beluga":
+            loads.setdefault(act.params['b'], []).append(act.params['j'])
+        elif act.name == "deliver_to_hangar":
+            delivers.setdefault(act.params['pl'], []).append((act.params['j'], actions_flights[k]))
+
+    def _slots(slots: dict[int, str], required_slots: dict[int, str]) -> list[tuple[str, bool]]:
+        return [(x, i in required_slots) for i, x in sorted(slots.items())]
+
+    for flight_index, fl in enumerate(pb_def.flights):
+        incoming = _slots(fl.incoming, index.flight_incoming(fl.name, selected))
+        if not _matches_slots(unloads.get(fl.name, []), incoming, lambda j, x: j == x):
+            res.add(flight_index)
+        outgoing = _slots(fl.outgoing, index.flight_outgoing(fl.name, selected))
+        if not _matches_slots(loads.get(fl.name, []), outgoing, lambda j, x: j in index.jigs and x in [j, index.jigs[j].type]):
+            res.add(flight_index)
+
+    for pl in pb_def.production_lines:
+        delivered = delivers.get(pl.name, [])
+        # (a jig is delivered at most once to a production line: the first delivery that cannot be matched is where they differ)
+        i = 0
+        missing = False
+        for (j, required) in _slots(pl.schedule, index.pl_schedule(pl.name, selected)):
+            if i < len(delivered) and delivered[i][0] == j:
+                i += 1
+            elif required:
+                missing = True
+                break
+        if missing or i < len(delivered):
+            res.add(delivered[i][1] if i < len(delivered) else (delivered[-1][1] if len(delivered) > 0 else 0))
+
+    return res
+
+def affected_window(
+    pb_def: BelugaProblemDef,
+    plan_def: BelugaPlanDef,
+    prop_ids: list[PropId],
+    window_margin: int = 1,
+) -> tuple[list[PropId], tuple[int, int] | None]:
+    """
+    Returns the properties (among `prop_ids`) the plan does not satisfy, and the (inclusive) range of flights
+    to re-solve, or `None` if the plan has to be solved for from scratch, or if nothing needs to be re-solved
+    (i.e. no property is broken and the plan matches the problem).
+    """
+    properties = pb_def.properties_definitions()
+    actions_flights = plan_actions_flights(plan_def)
+
+    satisfied_prop_ids = set(check_plan_properties_for_problem(pb_def, plan_def, properties))
+    broken_prop_ids = [prop_id for prop_id in prop_ids if prop_id not in satisfied_prop_ids]
+
+    flights = _mismatching_flights(pb_def, plan_def, actions_flights, prop_ids)
+    for prop_id in broken_prop_ids:
+        prop_flights = _broken_property_flights(pb_def, plan_def, actions_flights, properties[prop_id]["name"], properties[prop_id]["parameters"])
+        if prop_flights is None:
+            return (broken_prop_ids, None)
+        flights |= prop_flights
+
+    if len(flights) == 0:
+        return (broken_prop_ids, None)
+
+    return (broken_prop_ids, (max(0, min(flights)-window_margin), min(len(pb_def.flights)-1, max(flights)+window_margin)))
+
+def repair_plan(
+    beluga_model: BelugaModelOptSched,
+    plan_def: BelugaPlanDef,
+    prop_ids: list[PropId],
+    num_swaps_to_use: int | None = None,
+    timeout: float | None = None,
+    window_timeout: float | None = None,
+    window_margin: int = 1,
+    planner=None,
+) -> list[dict[str, str]] | None:
+    """
+    Returns the plan as is if it still satisfies `prop_ids` (and matches the problem), a repaired plan,
+    or a plan solved for from scratch if the affected window could not be repaired (within `window_timeout`).
+    """
+    (broken_prop_ids, window) = affected_window(beluga_model.pb_def, plan_def, prop_ids, window_margin)
+    print("broken properties: {} window of flights to repair: {}".format(broken_prop_ids, window))
+
+    # (a window of `None` is only ever due to a broken property, when the plan does match the problem)
+    if window is None and len(broken_prop_ids) == 0:
+        return plan_def_to_json(plan_def)
+
+    hints = None
+    if window is not None and not (window[0] == 0 and window[1] == len(beluga_model.pb_def.flights)-1):
+        (first_flight, last_flight) = window
+        # (what racks hold after the window depends on what happens in it: rack accesses after it are left free too)
+        free_actions = {
+            k for k, (act, flight_index) in enumerate(zip(plan_def, plan_actions_flights(plan_def)))
+            if first_flight <= flight_index <= last_flight
+            or (flight_index > last_flight and act.name in ["put_down_rack", "pick_up_rack"])
+        }
+        hints = beluga_model.make_hints(plan_def, free_actions)
+        print("actions frozen: {} / {}".format(len(plan_def) - len(free_actions), len(plan_def)))
+
+    (_, plan_as_json) = beluga_model.solve_with_properties(
+        prop_ids,
+        num_swaps_to_use,
+        timeout,
+        planner,
+        hints=hints,
+        hints_timeout=window_timeout,
+    )
+    return plan_as_json
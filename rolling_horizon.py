@@ -0,0 +1,124 @@
+from parser import *
+from checker import *
+from analysis import *
+from simulator import *
+from model import *
+
+# Rolling-horizon decomposition over flights.
+#
+# Instead of one model for all flights, flights are solved for in (overlapping) windows of `window_size` flights.
+# Only the actions up to the switch to the first flight of the overlap are kept, and the state they lead to
+# (see `simulator.py`) is the initial state of the next window. The kept actions of all windows make up the plan.
+#
+# Properties are only kept for windows if they are invariants over all actions (i.e. hold for the whole plan
+# if they hold for each window): `rack_always_empty`, `jig_never_on_rack`, `jig_always_placed_on_rack_size_leq`.
+# The other ones are not taken into account (but can be checked on the resulting plan): in particular, windows only have
+# the base slots of flights and production lines, so that the stitched plan makes none of the optional unloads / loads /
+# deliveries of unload / load / deliver properties.
+
+def window_invariant_prop_ids(pb_def: BelugaProblemDef) -> list[PropId]:
+    """
+    The properties that are taken into account for each window (see above).
+    """
+    return [
+        prop_id
+        for props in [pb_def.props_rack_always_empty, pb_def.props_jig_never_on_rack, pb_def.props_jig_always_placed_on_rack_size_leq]
+        for (prop_id, _) in props
+    ]
+
+def _add_window_properties(
+    pb_def: BelugaProblemDef,
+    window_pb_def: BelugaProblemDef,
+):
+    jigs = set(j.name for j in window_pb_def.jigs)
+    window_pb_def.props_rack_always_empty = list(pb_def.props_rack_always_empty)
+    window_pb_def.props_jig_never_on_rack = [(prop_id, (j, r)) for (prop_id, (j, r)) in pb_def.props_jig_never_on_rack if j in jigs]
+    window_pb_def.props_jig_always_placed_on_rack_size_leq = [(prop_id, (j, rs)) for (prop_id, (j, rs)) in pb_def.props_jig_always_placed_on_rack_size_leq if j in jigs]
+    window_pb_def.reindex()
+
+def _solve_window(
+    window_pb_def: BelugaProblemDef,
+    name: str,
+    num_available_swaps: int,
+    timeout: float | None,
+    chain_precedences: bool,
+    symmetry_breaking: bool,
+) -> list[dict[str, str]] | None:
+
+    if find_conflicting_properties(window_pb_def) is not None:
+        return None
+
+    beluga_model = BelugaModelOptSched(window_pb_def, name, num_available_swaps, None, chain_precedences, symmetry_breaking)
+
+    (swaps_lower_bound, _) = swaps_bounds(window_pb_def)
+    for n in range(swaps_lower_bound, num_available_swaps+1):
+        (_, plan_as_json) = beluga_model.solve_with_properties(
+            list(beluga_model.properties.keys()),
+            n,
+            timeout,
+        )
+        if plan_as_json is not None:
+            return plan_as_json
+    return None
+
+def solve_rolling_horizon(
+    pb_def: BelugaProblemDef,
+    name: str,
+    num_available_swaps: int,
+    window_size: int,
+    window_overlap: int,
+    timeout: float | None = None,
+    chain_precedences: bool = False,
+    symmetry_breaking: bool = False,
+) -> list[dict[str, str]] | None:
+    """
+    Returns the stitched plan, or `None` if no plan was found for some window (within `timeout`, for each number of swaps).
+
+    `num_available_swaps` is a budget for the whole plan: each window may only use the swaps not used yet.
+    """
+    assert window_size >= 2 or window_size >= len(pb_def.flights)
+
+    # (at least one flight is kept per window, and a window's last flight never is, unless it is the last window)
+    num_kept_flights = max(1, min(window_size-1, window_size-window_overlap))
+
+    state = BelugaState.initial(pb_def)
+    plan_def = BelugaPlanDef()
+
+    while True:
+        is_last_window = state.flight_index + window_size >= len(pb_def.flights)
+
+        window_pb_def = state.to_problem_def(pb_def, window_size)
+        _add_window_properties(pb_def, window_pb_def)
+        print('window: flights {} to {}'.format(state.flight_index, state.flight_index+len(window_pb_def.flights)-1))
+
+        num_remaining_swaps = num_available_swaps - count_swaps_in_plan(plan_def)
+        if num_remaining_swaps < 0:
+            return None
+
+        window_plan_as_json = _solve_window(window_pb_def, name+"_"+str(state.flight_index), num_remaining_swaps, timeout, chain_precedences, symmetry_breaking)
+        if window_plan_as_json is None:
+            return None
+
+        num_switches = 0
+        for act in plan_def_from_json(window_plan_as_json):
+            plan_def.append(act)
+            state.apply(act)
+            if act.name == "switch_to_next_beluga":
+                num_switches += 1
+                if not is_last_window and num_switches == num_kept_flights:
+                    break
+
+        if is_last_window:
+            break
+
+    # (windows are only solved for from the states the simulator computes: make sure the stitched plan is valid as a whole)
+    invalid = BelugaPlanSimulator(pb_def).validate(plan_def, complete=True)
+    if invalid is not None:
+        (i, reason) = invalid
+        print("invalid stitched plan, at action {}: {}".format(i, reason))
+        return None
+    if count_swaps_in_plan(plan_def) > num_available_swaps:
+        print("stitched plan uses more than {} swaps".format(num_available_swaps))
+        return None
+
+    return plan_def_to_json(plan_def)
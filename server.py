@@ -0,0 +1,203 @@
+import sys
+import os
+import json
+import socketserver
+
+from parser import *
+from model import *
+from model_cache import *
+from solution_cache import *
+
+# Long-lived solve server, speaking (line-delimited) JSON-RPC 2.0 over stdin/stdout or a local (unix) socket.
+#
+# Supported methods:
+#
+# - "load_problem" {base, props}
+#       -> {problem_hash, properties}
+# - "solve_with_properties" {problem_hash | (base, props), prop_ids?, num_swaps?, timeout?}
+#       -> {problem_hash, plan, conflict}   (plan is null if no plan was found, and conflict is
+#                                            {prop_ids, reason} if the properties are obviously infeasible)
+# - "list_problems" {}
+#       -> [problem_hash, ...]
+# - "shutdown" {}
+#
+# Built models are cached by problem hash (see `problem_def_digest`), in memory and optionally
+# on disk (see `model_cache.py`), and a single Aries engine is kept open for the whole lifetime of the server.
+# Solve results are kept in a solution cache (see `solution_cache.py`), shared by all problems.
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_SERVER_ERROR = -32000
+
+class BelugaSolveServerError(Exception):
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class BelugaSolveServer:
+
+    def __init__(
+        self,
+        num_available_swaps: int,
+        model_cache: BelugaModelCache | None = None,
+    ):
+        self.num_available_swaps = num_available_swaps
+        self.model_cache = model_cache
+        self.models: dict[str, BelugaModelOptSched] = {}
+        self.solution_cache = BelugaSolutionCache()
+        self.planner = None
+        self.running = False
+
+    def __enter__(self):
+        self.planner = up.OneshotPlanner(name="aries")
+        self.planner.__enter__()
+        self.running = True
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        if self.planner is not None:
+            self.planner.__exit__(*args)
+            self.planner = None
+
+    def load_problem(self, base_filename: str, props_filename: str) -> str:
+        pb_def = parse_problem_and_properties(base_filename, props_filename)
+        problem_hash = problem_def_digest(pb_def)+"_"+str(self.num_available_swaps)
+
+        if problem_hash not in self.models:
+            if self.model_cache is not None:
+                (_, self.models[problem_hash]) = self.model_cache.get_or_build_model(pb_def, base_filename+"_"+props_filename, self.num_available_swaps)
+            else:
+                self.models[problem_hash] = BelugaModelOptSched(pb_def, base_filename+"_"+props_filename, self.num_available_swaps, None)
+            self.models[problem_hash].solution_cache = self.solution_cache
+        return problem_hash
+
+    def _get_model(self, params: dict) -> tuple[str, BelugaModelOptSched]:
+        if "problem_hash" in params:
+            problem_hash = params["problem_hash"]
+        elif "base" in params and "props" in params:
+            problem_hash = self.load_problem(params["base"], params["props"])
+        else:
+            raise BelugaSolveServerError(JSONRPC_INVALID_PARAMS, "expected either 'problem_hash' or 'base' and 'props'")
+
+        if problem_hash not in self.models:
+            raise BelugaSolveServerError(JSONRPC_INVALID_PARAMS, "unknown problem hash {}".format(problem_hash))
+        return (problem_hash, self.models[problem_hash])
+
+    def handle(self, request: dict) -> dict | None:
+        req_id = request.get("id", None) if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method", None), str):
+                raise BelugaSolveServerError(JSONRPC_INVALID_REQUEST, "invalid request")
+            result = self._dispatch(request["method"], request.get("params", {}))
+            response = { "jsonrpc": "2.0", "id": req_id, "result": result }
+        except BelugaSolveServerError as e:
+            response = { "jsonrpc": "2.0", "id": req_id, "error": { "code": e.code, "message": e.message } }
+        except Exception as e:
+            response = { "jsonrpc": "2.0", "id": req_id, "error": { "code": JSONRPC_SERVER_ERROR, "message": repr(e) } }
+
+        is_notification = isinstance(request, dict) and "id" not in request
+        if is_notification:
+            return None
+        return response
+
+    def _dispatch(self, method: str, params: dict):
+
+        if method == "load_problem":
+            problem_hash = self.load_problem(params["base"], params["props"])
+            return {
+                "problem_hash": problem_hash,
+                "properties": list(self.models[problem_hash].properties.keys()),
+            }
+
+        elif method == "solve_with_properties":
+            (problem_hash, beluga_model) = self._get_model(params)
+            prop_ids = [PropId(p) for p in params.get("prop_ids", beluga_model.properties.keys())]
+            unknown_prop_ids = [p for p in prop_ids if p not in beluga_model.properties]
+            if len(unknown_prop_ids) > 0:
+                raise BelugaSolveServerError(JSONRPC_INVALID_PARAMS, "unknown properties {}".format(unknown_prop_ids))
+
+            conflict = find_conflicting_properties(beluga_model.pb_def, prop_ids)
+            if conflict is not None:
+                return {
+                    "problem_hash": problem_hash,
+                    "plan": None,
+                    "conflict": { "prop_ids": conflict[0], "reason": conflict[1] },
+                }
+
+            (_, plan_as_json) = beluga_model.solve_with_properties(
+                prop_ids,
+                params.get("num_swaps", None),
+                params.get("timeout", None),
+                self.planner,
+            )
+            return {
+                "problem_hash": problem_hash,
+                "plan": plan_as_json,
+                "conflict": None,
+            }
+
+        elif method == "list_problems":
+            return list(self.models.keys())
+
+        elif method == "shutdown":
+            self.running = False
+            return None
+
+        else:
+            raise BelugaSolveServerError(JSONRPC_METHOD_NOT_FOUND, "unknown method {}".format(method))
+
+    def handle_line(self, line: str) -> str | None:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return json.dumps({ "jsonrpc": "2.0", "id": None, "error": { "code": JSONRPC_PARSE_ERROR, "message": str(e) } })
+        response = self.handle(request)
+        return json.dumps(response) if response is not None else None
+
+    def serve_stdio(self):
+        # Responses are the only thing written to the actual stdout. Everything else
+        # (engine output, prints from the model, ...) goes to stderr.
+        out = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            for line in sys.stdin:
+                if line.strip() == "":
+                    continue
+                response = self.handle_line(line)
+                if response is not None:
+                    out.write(response+"\n")
+                    out.flush()
+                if not self.running:
+                    break
+        finally:
+            sys.stdout = out
+
+    def serve_socket(self, socket_path: str):
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    line = line.decode('utf-8')
+                    if line.strip() == "":
+                        continue
+                    response = server.handle_line(line)
+                    if response is not None:
+                        self.wfile.write((response+"\n").encode('utf-8'))
+                        self.wfile.flush()
+                    if not server.running:
+                        break
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        # Connections are handled one at a time: the models and the engine are not meant to be shared across threads.
+        with socketserver.UnixStreamServer(socket_path, _Handler) as sock_server:
+            while self.running:
+                sock_server.handle_request()
+        os.remove(socket_path)
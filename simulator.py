@@ -0,0 +1,411 @@
+from array import array
+
+from parser import *
+
+# Replay of plans over the state of a Beluga problem (independent of model / planner).
+#
+# The state after (part of) a plan can be turned back into a problem definition, whose initial
+# state is that state (see `BelugaState.to_problem_def`), e.g. to solve the rest of the problem separately.
+
+SIDE_BELUGA_NAME = "bside"
+SIDE_FACTORY_NAME = "fside"
+
+@dataclass
+class BelugaState:
+    racks: dict[str, list[str]]                 # rack -> jigs on it (the first one being on the beluga side)
+    trailers: dict[str, str | None]
+    hangars: dict[str, str | None]
+    jig_empty: dict[str, bool]
+    jig_location: dict[str, tuple[str, str]]    # jig -> ("rack" | "trailer" | "hangar" | "beluga", name)
+    jigs_gone: set[str]                         # jigs loaded on a flight
+    flight_index: int                           # index of the current flight
+    num_delivered: dict[str, int]               # production line -> number of jigs delivered to it
+
+    @staticmethod
+    def initial(pb_def: BelugaProblemDef) -> 'BelugaState':
+        return BelugaState(
+            racks={ r.name: list(r.jigs) for r in pb_def.racks },
+            trailers={ t.name: t.jig for t in pb_def.trailers_beluga + pb_def.trailers_factory },
+            hangars={ h.name: h.jig for h in pb_def.hangars },
+            jig_empty={ j.name: j.empty for j in pb_def.jigs },
+            jig_location=dict(pb_def.index.jig_initial_location),
+            jigs_gone=set(),
+            flight_index=0,
+            num_delivered={ pl.name: 0 for pl in pb_def.production_lines },
+        )
+
+    def apply(self, act: BelugaPlanAction):
+        j = act.params.get('j', None)
+
+        if act.name == "unload_beluga":
+            self.trailers[act.params['t']] = j
+            self.jig_location[j] = ("trailer", act.params['t'])
+
+        elif act.name == "load_beluga":
+            self.trailers[act.params['t']] = None
+            self.jig_location[j] = ("beluga", act.params['b'])
+            self.jigs_gone.add(j)
+
+        elif act.name == "put_down_rack":
+            self.trailers[act.params['t']] = None
+            if act.params['s'] == SIDE_BELUGA_NAME:
+                self.racks[act.params['r']].insert(0, j)
+            else:
+                self.racks[act.params['r']].append(j)
+            self.jig_location[j] = ("rack", act.params['r'])
+
+        elif act.name == "pick_up_rack":
+            self.racks[act.params['r']].remove(j)
+            self.trailers[act.params['t']] = j
+            self.jig_location[j] = ("trailer", act.params['t'])
+
+        elif act.name == "deliver_to_hangar":
+            self.trailers[act.params['t']] = None
+            self.hangars[act.params['h']] = j
+            self.jig_empty[j] = True
+            self.jig_location[j] = ("hangar", act.params['h'])
+            self.num_delivered[act.params['pl']] += 1
+
+        elif act.name == "get_from_hangar":
+            self.hangars[act.params['h']] = None
+            self.trailers[act.params['t']] = j
+            self.jig_location[j] = ("trailer", act.params['t'])
+
+        elif act.name == "switch_to_next_beluga":
+            self.flight_index += 1
+
+        else:
+            assert False, "unknown action name {}".format(act.name)
+
+    def to_problem_def(
+        self,
+        pb_def: BelugaProblemDef,
+        num_flights: int,
+    ) -> BelugaProblemDef:
+        """
+        Problem starting from this state, with (at most) the next `num_flights` flights (starting with the current one).
+
+        Only the jigs that are in the system or arrive on these flights are kept, and only the part of each production line's
+        (remaining) schedule that is made of them. Properties are not kept (see `rolling_horizon.py`), and neither are the
+        slots that unload / load / deliver properties inserted in flights / production lines: they would be mandatory.
+        """
+        index = pb_def.index
+        flights = pb_def.flights[self.flight_index:self.flight_index+num_flights]
+        incoming = set(j for fl in flights for j in index.flight_incoming(fl.name).values())
+
+        def _in_system(j: str) -> bool:
+            (kind, _) = self.jig_location.get(j, ("", ""))
+            return j not in self.jigs_gone and (kind != "beluga" or j in incoming)
+
+        def _renumbered(slots: dict[int, str]) -> dict[int, str]:
+            return { i: j for i, (_, j) in enumerate(sorted(slots.items())) }
+
+        jigs = [Jig(j.name, j.type, self.jig_empty[j.name]) for j in pb_def.jigs if _in_system(j.name)]
+
+        production_lines = []
+        for pl in pb_def.production_lines:
+            # (only base slots are ever delivered to, see `rolling_horizon.py`)
+            remaining = [j for _, j in sorted(index.pl_schedule(pl.name).items())][self.num_delivered[pl.name]:]
+            schedule = []
+            for j in remaining:
+                if not _in_system(j):
+                    break
+                schedule.append(j)
+            production_lines.append(ProductionLine(pl.name, { i: j for i, j in enumerate(schedule) }))
+
+        return BelugaProblemDef(
+            trailers_beluga=[Trailer(t.name, self.trailers[t.name]) for t in pb_def.trailers_beluga],
+            trailers_factory=[Trailer(t.name, self.trailers[t.name]) for t in pb_def.trailers_factory],
+            hangars=[Hangar(h.name, self.hangars[h.name]) for h in pb_def.hangars],
+            jig_types=pb_def.jig_types,
+            racks=[Rack(r.name, r.size, list(self.racks[r.name])) for r in pb_def.racks],
+            jigs=jigs,
+            production_lines=production_lines,
+            flights=[
+                Flight(fl.name, _renumbered(index.flight_incoming(fl.name)), _renumbered(index.flight_outgoing(fl.name)))
+                for fl in flights
+            ],
+        )
+
+def simulate_plan(
+    pb_def: BelugaProblemDef,
+    plan_def: BelugaPlanDef,
+) -> BelugaState:
+    state = BelugaState.initial(pb_def)
+    for act in plan_def:
+        state.apply(act)
+    return state
+
+# # #
+
+LOC_NONE = 0
+LOC_RACK = 1
+LOC_TRAILER = 2
+LOC_HANGAR = 3
+LOC_BELUGA = 4
+
+SIDE_BELUGA = 0
+SIDE_FACTORY = 1
+
+class BelugaPlanSimulator:
+    """
+    Replays plans over a compact, array-based state (objects being identified by their index), checking that each action
+    is executable: positions of jigs on racks as in the model (i.e. per-side stack pointers `next` and jig positions `pos`),
+    rack free space, trailers' side and content, hangars' content, flights' and production lines' order.
+
+    The initial state is built once, so that many plans for the same problem can be validated cheaply.
+    """
+
+    def __init__(self, pb_def: BelugaProblemDef):
+        self.pb_def = pb_def
+
+        self.jig_ids = { j.name: k for k, j in enumerate(pb_def.jigs) }
+        self.rack_ids = { r.name: k for k, r in enumerate(pb_def.racks) }
+        trailers = pb_def.trailers_beluga + pb_def.trailers_factory
+        self.trailer_ids = { t.name: k for k, t in enumerate(trailers) }
+        self.hangar_ids = { h.name: k for k, h in enumerate(pb_def.hangars) }
+        self.flight_ids = { fl.name: k for k, fl in enumerate(pb_def.flights) }
+        self.pl_ids = { pl.name: k for k, pl in enumerate(pb_def.production_lines) }
+        self.side_ids = { SIDE_BELUGA_NAME: SIDE_BELUGA, SIDE_FACTORY_NAME: SIDE_FACTORY }
+
+        jig_types = { jt.name: jt for jt in pb_def.jig_types }
+        self.jig_type_names = [j.type for j in pb_def.jigs]
+        self.jig_size_empty = array('i', [jig_types[j.type].size_empty for j in pb_def.jigs])
+        self.jig_size_loaded = array('i', [jig_types[j.type].size_loaded for j in pb_def.jigs])
+        self.trailer_side = array('b', [SIDE_BELUGA]*len(pb_def.trailers_beluga) + [SIDE_FACTORY]*len(pb_def.trailers_factory))
+
+        # flights' incoming / outgoing jigs, and production lines' schedules, in order
+        self.flights_incoming = [[self.jig_ids[j] for _, j in sorted(fl.incoming.items())] for fl in pb_def.flights]
+        self.flights_outgoing = [[j_or_jt for _, j_or_jt in sorted(fl.outgoing.items())] for fl in pb_def.flights]
+        self.pls_schedule = [[self.jig_ids[j] for _, j in sorted(pl.schedule.items())] for pl in pb_def.production_lines]
+        # (for each of these slots, the property it was inserted for when parsed, or `None` for base slots, see `validate`)
+        index = pb_def.index
+        self.flights_incoming_props = [[index.props_unload_beluga.get((j, fl.name, i), None) for i, j in sorted(fl.incoming.items())] for fl in pb_def.flights]
+        self.flights_outgoing_props = [[index.props_load_beluga.get((j, fl.name, i), None) for i, j in sorted(fl.outgoing.items())] for fl in pb_def.flights]
+        self.pls_schedule_props = [[index.props_deliver_to_production_line.get((j, pl.name, i), None) for i, j in sorted(pl.schedule.items())] for pl in pb_def.production_lines]
+
+        num_jigs = len(pb_def.jigs)
+        self.init_jig_empty = bytearray(int(j.empty) for j in pb_def.jigs)
+        self.init_jig_loc_kind = bytearray(num_jigs)
+        self.init_jig_loc = array('i', [-1]*num_jigs)
+        self.init_jig_pos_b = array('i', [0]*num_jigs)
+        self.init_jig_pos_f = array('i', [0]*num_jigs)
+        self.init_rack_free = array('i', [0]*len(pb_def.racks))
+        self.init_rack_next_b = array('i', [0]*len(pb_def.racks))
+        self.init_rack_next_f = array('i', [0]*len(pb_def.racks))
+        self.init_trailer_jig = array('i', [-1]*len(trailers))
+        self.init_hangar_jig = array('i', [-1]*len(pb_def.hangars))
+
+        for r, rack in enumerate(pb_def.racks):
+            self.init_rack_free[r] = rack.size
+            for k, jn in enumerate(rack.jigs):
+                j = self.jig_ids[jn]
+                self.init_jig_loc_kind[j] = LOC_RACK
+                self.init_jig_loc[j] = r
+                self.init_jig_pos_b[j] = k
+                self.init_jig_pos_f[j] = -k
+                self.init_rack_free[r] -= self._size(self.init_jig_empty, j)
+            self.init_rack_next_f[r] = -len(rack.jigs)+1
+        for t, trailer in enumerate(trailers):
+            if trailer.jig is not None:
+                self.init_trailer_jig[t] = self.jig_ids[trailer.jig]
+                self.init_jig_loc_kind[self.jig_ids[trailer.jig]] = LOC_TRAILER
+                self.init_jig_loc[self.jig_ids[trailer.jig]] = t
+        for h, hangar in enumerate(pb_def.hangars):
+            if hangar.jig is not None:
+                self.init_hangar_jig[h] = self.jig_ids[hangar.jig]
+                self.init_jig_loc_kind[self.jig_ids[hangar.jig]] = LOC_HANGAR
+                self.init_jig_loc[self.jig_ids[hangar.jig]] = h
+        for b, jigs in enumerate(self.flights_incoming):
+            for j in jigs:
+                self.init_jig_loc_kind[j] = LOC_BELUGA
+                self.init_jig_loc[j] = b
+
+    def _size(self, jig_empty: bytearray, j: int) -> int:
+        return self.jig_size_empty[j] if jig_empty[j] else self.jig_size_loaded[j]
+
+    def validate(
+        self,
+        plan_def: BelugaPlanDef,
+        complete: bool = False,
+        prop_ids: list[PropId] | None = None,
+    ) -> tuple[int, str] | None:
+        """
+        Returns the index of the first invalid action of the plan along with the reason why, or `None` if the plan is valid.
+        If `complete` is set, the plan must also unload / load all flights' jigs and deliver all production lines' schedules
+        (otherwise reported as an invalid action at index `len(plan_def)`): that is, the jigs of their base slots, and the ones
+        of the slots that unload / load / deliver properties inserted only if these properties are in `prop_ids`.
+        """
+        jig_empty = bytearray(self.init_jig_empty)
+        jig_loc_kind = bytearray(self.init_jig_loc_kind)
+        jig_loc = array('i', self.init_jig_loc)
+        jig_pos_b = array('i', self.init_jig_pos_b)
+        jig_pos_f = array('i', self.init_jig_pos_f)
+        rack_free = array('i', self.init_rack_free)
+        rack_next_b = array('i', self.init_rack_next_b)
+        rack_next_f = array('i', self.init_rack_next_f)
+        trailer_jig = array('i', self.init_trailer_jig)
+        hangar_jig = array('i', self.init_hangar_jig)
+
+        current_flight = 0
+        # (index of the next slot that may be used, slots being possibly skipped, as optional activities of the model may be)
+        next_unload = [0]*len(self.flights_incoming)
+        next_load = [0]*len(self.flights_outgoing)
+        next_deliver = [0]*len(self.pls_schedule)
+        unloaded = [bytearray(len(jigs)) for jigs in self.flights_incoming]
+        loaded = [bytearray(len(jigs)) for jigs in self.flights_outgoing]
+        delivered = [bytearray(len(jigs)) for jigs in self.pls_schedule]
+
+        for k, act in enumerate(plan_def):
+            try:
+                params = act.params
+                j = self.jig_ids[params['j']] if 'j' in params else -1
+                t = self.trailer_ids[params['t']] if 't' in params else -1
+
+                if act.name in ["unload_beluga", "get_from_hangar", "pick_up_rack"]:
+                    if trailer_jig[t] != -1:
+                        return (k, "trailer {} is not free".format(params['t']))
+                elif act.name in ["load_beluga", "deliver_to_hangar", "put_down_rack"]:
+                    if jig_loc_kind[j] != LOC_TRAILER or jig_loc[j] != t:
+                        return (k, "jig {} is not on trailer {}".format(params['j'], params['t']))
+
+                if act.name in ["unload_beluga", "load_beluga"]:
+                    side = SIDE_BELUGA
+                elif act.name in ["deliver_to_hangar", "get_from_hangar"]:
+                    side = SIDE_FACTORY
+                elif act.name in ["put_down_rack", "pick_up_rack"]:
+                    side = self.side_ids[params['s']]
+                else:
+                    side = -1
+                if t != -1 and self.trailer_side[t] != side:
+                    return (k, "trailer {} is not on side {}".format(params['t'], [SIDE_BELUGA_NAME, SIDE_FACTORY_NAME][side]))
+
+                if act.name == "unload_beluga":
+                    b = self.flight_ids[params['b']]
+                    if b != current_flight:
+                        return (k, "flight {} is not the current one".format(params['b']))
+                    if jig_loc_kind[j] != LOC_BELUGA or jig_loc[j] != b:
+                        return (k, "jig {} is not on flight {}".format(params['j'], params['b']))
+                    incoming = self.flights_incoming[b]
+                    i = next_unload[b]
+                    while i < len(incoming) and incoming[i] != j:
+                        i += 1
+                    if i == len(incoming):
+                        return (k, "jig {} unloaded out of order".format(params['j']))
+                    next_unload[b] = i+1
+                    unloaded[b][i] = 1
+                    trailer_jig[t] = j
+                    jig_loc_kind[j] = LOC_TRAILER
+                    jig_loc[j] = t
+
+                elif act.name == "load_beluga":
+                    b = self.flight_ids[params['b']]
+                    if b != current_flight:
+                        return (k, "flight {} is not the current one".format(params['b']))
+                    if not jig_empty[j]:
+                        return (k, "jig {} is not empty".format(params['j']))
+                    outgoing = self.flights_outgoing[b]
+                    i = next_load[b]
+                    while i < len(outgoing) and outgoing[i] not in [params['j'], self.jig_type_names[j]]:
+                        i += 1
+                    if i == len(outgoing):
+                        return (k, "jig {} is not (or no longer) expected on flight {}".format(params['j'], params['b']))
+                    next_load[b] = i+1
+                    loaded[b][i] = 1
+                    trailer_jig[t] = -1
+                    jig_loc_kind[j] = LOC_BELUGA
+                    jig_loc[j] = b
+
+                elif act.name == "put_down_rack":
+                    r = self.rack_ids[params['r']]
+                    size = self._size(jig_empty, j)
+                    if rack_free[r] < size:
+                        return (k, "not enough free space on rack {}".format(params['r']))
+                    rack_free[r] -= size
+                    if side == SIDE_BELUGA:
+                        jig_pos_b[j] = rack_next_b[r]-1
+                        jig_pos_f[j] = -rack_next_b[r]+1
+                        rack_next_b[r] -= 1
+                    else:
+                        jig_pos_f[j] = rack_next_f[r]-1
+                        jig_pos_b[j] = -rack_next_f[r]+1
+                        rack_next_f[r] -= 1
+                    trailer_jig[t] = -1
+                    jig_loc_kind[j] = LOC_RACK
+                    jig_loc[j] = r
+
+                elif act.name == "pick_up_rack":
+                    r = self.rack_ids[params['r']]
+                    if jig_loc_kind[j] != LOC_RACK or jig_loc[j] != r:
+                        return (k, "jig {} is not on rack {}".format(params['j'], params['r']))
+                    if side == SIDE_BELUGA:
+                        if rack_next_b[r] != jig_pos_b[j]:
+                            return (k, "jig {} is not reachable from side {}".format(params['j'], params['s']))
+                        rack_next_b[r] += 1
+                    else:
+                        if rack_next_f[r] != jig_pos_f[j]:
+                            return (k, "jig {} is not reachable from side {}".format(params['j'], params['s']))
+                        rack_next_f[r] += 1
+                    rack_free[r] += self._size(jig_empty, j)
+                    trailer_jig[t] = j
+                    jig_loc_kind[j] = LOC_TRAILER
+                    jig_loc[j] = t
+
+                elif act.name == "deliver_to_hangar":
+                    h = self.hangar_ids[params['h']]
+                    pl = self.pl_ids[params['pl']]
+                    if hangar_jig[h] != -1:
+                        return (k, "hangar {} is not free".format(params['h']))
+                    schedule = self.pls_schedule[pl]
+                    i = next_deliver[pl]
+                    while i < len(schedule) and schedule[i] != j:
+                        i += 1
+                    if i == len(schedule):
+                        return (k, "jig {} delivered out of order".format(params['j']))
+                    next_deliver[pl] = i+1
+                    delivered[pl][i] = 1
+                    hangar_jig[h] = j
+                    trailer_jig[t] = -1
+                    jig_empty[j] = 1
+                    jig_loc_kind[j] = LOC_HANGAR
+                    jig_loc[j] = h
+
+                elif act.name == "get_from_hangar":
+                    h = self.hangar_ids[params['h']]
+                    if hangar_jig[h] != j:
+                        return (k, "jig {} is not in hangar {}".format(params['j'], params['h']))
+                    hangar_jig[h] = -1
+                    trailer_jig[t] = j
+                    jig_loc_kind[j] = LOC_TRAILER
+                    jig_loc[j] = t
+
+                elif act.name == "switch_to_next_beluga":
+                    if current_flight == len(self.flights_incoming)-1:
+                        return (k, "no next flight")
+                    current_flight += 1
+
+                else:
+                    return (k, "unknown action {}".format(act.name))
+
+            except KeyError as e:
+                return (k, "unknown object or missing parameter {}".format(e))
+
+        if complete:
+            if current_flight != len(self.flights_incoming)-1:
+                return (len(plan_def), "not all flights were processed")
+            required = set(prop_ids) if prop_ids is not None else set()
+
+            def _all_used(used: list[bytearray], slots_props: list[list[PropId | None]]) -> bool:
+                return all(
+                    used[x][i] or (prop_id is not None and prop_id not in required)
+                    for x, props in enumerate(slots_props) for i, prop_id in enumerate(props)
+                )
+
+            if not _all_used(unloaded, self.flights_incoming_props):
+                return (len(plan_def), "not all jigs were unloaded")
+            if not _all_used(loaded, self.flights_outgoing_props):
+                return (len(plan_def), "not all jigs were loaded")
+            if not _all_used(delivered, self.pls_schedule_props):
+                return (len(plan_def), "not all jigs were delivered")
+
+        return None
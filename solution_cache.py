@@ -0,0 +1,124 @@
+import os
+import json
+
+from parser import *
+from checker import *
+
+# Cache of solve results: (problem hash, property set, number of swaps) -> plan, or INFEASIBLE.
+#
+# Queries are answered by subset / superset reasoning over property sets (for the same problem and number of swaps):
+# - if a plan is known to satisfy a superset of the queried properties, it answers the query,
+# - if a subset of the queried properties is known to be infeasible, so is the query.
+# The properties a cached plan satisfies are determined with `check_plan_properties`, not only
+# from the properties that were asked for when it was computed.
+#
+# A number of swaps of `None` stands for "any number of swaps (up to the number of available ones)".
+
+INFEASIBLE = None
+
+# (part of problem hashes, along with a digest of the source of the model: bumped when results cached by earlier versions of this module can no longer be trusted)
+SOLUTION_CACHE_VERSION = "2"
+
+class BelugaSolutionCache:
+
+    def __init__(
+        self,
+        path: str | None = None,
+    ):
+        """
+        If `path` is given, the cache is loaded from / saved to that (JSON) file.
+        """
+        self.path = path
+
+        # key: (problem hash, number of swaps)
+        # value: list of (properties satisfied by the plan, plan)
+        self.plans: dict[tuple[str, int | None], list[tuple[frozenset[PropId], list[dict[str, str]]]]] = {}
+        # value: list of infeasible property sets
+        self.infeasible: dict[tuple[str, int | None], list[frozenset[PropId]]] = {}
+
+        if self.path is not None and os.path.exists(self.path):
+            self._load()
+
+    def lookup(
+        self,
+        problem_hash: str,
+        prop_ids: list[PropId],
+        num_swaps: int | None,
+    ) -> tuple[bool, list[dict[str, str]] | None]:
+        """
+        Returns `(True, plan)` or `(True, INFEASIBLE)` on a hit, and `(False, None)` on a miss.
+        """
+        props = frozenset(prop_ids)
+
+        # (an infeasible query for any number of swaps is infeasible for each number of swaps)
+        for key in [(problem_hash, num_swaps), (problem_hash, None)]:
+            for infeasible_props in self.infeasible.get(key, []):
+                if infeasible_props <= props:
+                    return (True, INFEASIBLE)
+
+        # (a plan with a given number of swaps is a plan for any number of swaps)
+        if num_swaps is not None:
+            keys = [(problem_hash, num_swaps)]
+        else:
+            keys = [k for k in self.plans if k[0] == problem_hash]
+        for key in keys:
+            for (satisfied_props, plan_as_json) in self.plans.get(key, []):
+                if props <= satisfied_props:
+                    return (True, plan_as_json)
+
+        return (False, None)
+
+    def record(
+        self,
+        problem_hash: str,
+        pb_def: BelugaProblemDef,
+        prop_ids: list[PropId],
+        num_swaps: int | None,
+        plan_as_json: list[dict[str, str]] | None,
+    ):
+        key = (problem_hash, num_swaps)
+        props = frozenset(prop_ids)
+
+        if plan_as_json is INFEASIBLE:
+            infeasible = self.infeasible.setdefault(key, [])
+            # (only the minimal infeasible property sets are worth keeping)
+            if any(other <= props for other in infeasible):
+                return
+            self.infeasible[key] = [other for other in infeasible if not props <= other] + [props]
+        else:
+            try:
+                satisfied_props = frozenset(map(PropId, check_plan_properties_for_problem(pb_def, plan_def_from_json(plan_as_json))))
+            except Exception as e:
+                print("could not check the properties of the plan ({})".format(repr(e)))
+                satisfied_props = frozenset()
+            self.plans.setdefault(key, []).append((satisfied_props | props, plan_as_json))
+
+        if self.path is not None:
+            self._save()
+
+    def _load(self):
+        with open(self.path) as f:
+            d = json.load(f)
+        for entry in d["plans"]:
+            key = (entry["problem_hash"], entry["num_swaps"])
+            self.plans.setdefault(key, []).append((frozenset(map(PropId, entry["satisfied_props"])), entry["plan"]))
+        for entry in d["infeasible"]:
+            key = (entry["problem_hash"], entry["num_swaps"])
+            self.infeasible.setdefault(key, []).append(frozenset(map(PropId, entry["props"])))
+
+    def _save(self):
+        d = {
+            "plans": [
+                { "problem_hash": ph, "num_swaps": n, "satisfied_props": sorted(props), "plan": plan_as_json }
+                for (ph, n), entries in self.plans.items() for (props, plan_as_json) in entries
+            ],
+            "infeasible": [
+                { "problem_hash": ph, "num_swaps": n, "props": sorted(props) }
+                for (ph, n), entries in self.infeasible.items() for props in entries
+            ],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path+".tmp{}".format(os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(d, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+
+import pytest
+
+# (modules are flat, at the root of the repository)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parser import *
+
+@pytest.fixture
+def make_problem(tmp_path):
+    """
+    Builds a (small) problem, with its properties (as `(prop_id, name, parameters)` triples), by parsing it from JSON files.
+    """
+    def _make_problem(racks, jigs, production_lines, flights, props) -> BelugaProblemDef:
+        base = {
+            "trailers_beluga": [{ "name": "beluga_trailer_1", "jig": "" }],
+            "trailers_factory": [{ "name": "factory_trailer_1", "jig": "" }],
+            "hangars": [{ "name": "hangar1", "jig": "" }],
+            "jig_types": {
+                "typeA": { "name": "typeA", "size_empty": 4, "size_loaded": 4 },
+                "typeD": { "name": "typeD", "size_empty": 18, "size_loaded": 25 },
+            },
+            "racks": racks,
+            "jigs": { name: { "name": name, "type": jig_type, "empty": empty } for (name, jig_type, empty) in jigs },
+            "production_lines": production_lines,
+            "flights": flights,
+        }
+        (base_filename, props_filename) = (tmp_path / "base.json", tmp_path / "props.json")
+        base_filename.write_text(json.dumps(base))
+        props_filename.write_text(json.dumps([
+            { "_id": prop_id, "definition": { "name": name, "parameters": params } }
+            for (prop_id, name, params) in props
+        ]))
+        return parse_problem_and_properties(str(base_filename), str(props_filename))
+    return _make_problem
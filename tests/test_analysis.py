@@ -0,0 +1,37 @@
+from analysis import *
+
+def test_swaps_bounds_base_deliveries_do_not_block(make_problem):
+    # (jigB, on the factory side of jigA, is delivered anyway: no swap is needed to deliver jigA next)
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigA", "jigB"] }],
+        jigs=[("jigA", "typeA", False), ("jigB", "typeA", False)],
+        production_lines=[{ "name": "pl0", "schedule": ["jigB"] }],
+        flights=[{ "name": "beluga1", "incoming": [], "outgoing": [] }],
+        props=[("p0", "deliver_to_production_line", ["jigA", "pl0", 1])],
+    )
+    assert swaps_bounds(pb_def) == (0, 0)
+    assert swaps_bounds(pb_def, []) == (0, 0)
+
+def test_conflicting_properties_base_unloads_and_deliveries(make_problem):
+    # (jigD arrives (full) by a base incoming slot and is delivered by the base schedule: it can then be loaded back, empty)
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": [] }],
+        jigs=[("jigD", "typeD", False)],
+        production_lines=[{ "name": "pl0", "schedule": ["jigD"] }],
+        flights=[
+            { "name": "beluga1", "incoming": ["jigD"], "outgoing": [] },
+            { "name": "beluga2", "incoming": [], "outgoing": [] },
+        ],
+        props=[("p0", "load_beluga", ["typeD", "beluga2", 0])],
+    )
+    assert find_conflicting_properties(pb_def) is None
+
+    # (unless no jig of that type is ever delivered)
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": [] }],
+        jigs=[("jigD", "typeD", False)],
+        production_lines=[{ "name": "pl0", "schedule": [] }],
+        flights=[{ "name": "beluga1", "incoming": ["jigD"], "outgoing": [] }],
+        props=[("p0", "load_beluga", ["typeD", "beluga1", 0])],
+    )
+    assert find_conflicting_properties(pb_def) == (["p0"], "more jigs of type typeD to load than can ever be empty and available")
@@ -0,0 +1,117 @@
+from checker import *
+from simulator import SIDE_FACTORY_NAME
+
+def test_monitor_violates_unloads_and_loads_of_flight_left(make_problem):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigB"] }],
+        jigs=[("jigA", "typeA", False), ("jigB", "typeA", True), ("jigC", "typeA", False)],
+        production_lines=[{ "name": "pl0", "schedule": [] }],
+        flights=[
+            { "name": "beluga1", "incoming": [], "outgoing": [] },
+            { "name": "beluga2", "incoming": [], "outgoing": [] },
+        ],
+        props=[
+            ("p0", "unload_beluga", ["jigA", "beluga1", 0]),
+            ("p1", "unload_beluga", ["jigC", "beluga1", 1]),
+            ("p2", "load_beluga", ["typeA", "beluga1", 0]),
+            ("p3", "unload_beluga", ["jigC", "beluga2", 0]),
+        ],
+    )
+    monitor = property_monitor_for_problem(pb_def)
+
+    [unload, switch] = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigA", "b": "beluga1", "t": "beluga_trailer_1" },
+        { "name": "switch_to_next_beluga" },
+    ])
+    assert monitor.push(unload) == [("p0", PROP_SATISFIED)]
+    assert sorted(monitor.push(switch)) == [("p1", PROP_VIOLATED), ("p2", PROP_VIOLATED)]
+    assert monitor.status()["p3"] == PROP_UNDECIDED
+
+def _props(*props) -> dict[PropId, dict]:
+    return { PropId(prop_id): { "name": name, "parameters": params } for (prop_id, name, params) in props }
+
+def _two_racks_problem(make_problem) -> BelugaProblemDef:
+    return make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigA"] }, { "name": "rack01", "size": 32, "jigs": [] }],
+        jigs=[("jigA", "typeA", True), ("jigB", "typeA", True)],
+        production_lines=[{ "name": "pl0", "schedule": [] }],
+        flights=[{ "name": "beluga1", "incoming": ["jigB"], "outgoing": [] }],
+        props=[],
+    )
+
+def _rack_act(name, j, r) -> dict:
+    return { "name": name, "j": j, "t": "factory_trailer_1", "r": r, "s": SIDE_FACTORY_NAME }
+
+def test_jig_never_on_rack_counts_initial_contents_and_put_downs(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(
+        ("p0", "jig_never_on_rack", ["jigA", "rack00"]),
+        ("p1", "jig_never_on_rack", ["jigB", "rack00"]),
+        ("p2", "jig_never_on_rack", ["jigB", "rack01"]),
+    )
+    plan_def = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigB", "b": "beluga1", "t": "beluga_trailer_1" },
+        _rack_act("put_down_rack", "jigB", "rack01"),
+    ])
+    assert check_plan_properties_for_problem(pb_def, plan_def, properties) == ["p1"]
+
+def test_jig_only_if_ever_on_rack_counts_initial_contents_and_its_rack(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(
+        ("p0", "jig_only_if_ever_on_rack", ["jigA", "rack00"]),
+        ("p1", "jig_only_if_ever_on_rack", ["jigA", "rack01"]),
+        ("p2", "jig_only_if_ever_on_rack", ["jigB", "rack01"]),
+        ("p3", "jig_only_if_ever_on_rack", ["jigB", "rack00"]),
+    )
+    plan_def = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigB", "b": "beluga1", "t": "beluga_trailer_1" },
+        _rack_act("put_down_rack", "jigB", "rack01"),
+    ])
+    assert check_plan_properties_for_problem(pb_def, plan_def, properties) == ["p0", "p2"]
+
+def test_jig_to_rack_order_looks_up_both_jigs(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(
+        ("p0", "jig_to_rack_order", ["jigA", "rack00", "jigB", "rack01"]),
+        ("p1", "jig_to_rack_order", ["jigB", "rack01", "jigA", "rack00"]),
+        ("p2", "jig_to_rack_order", ["jigB", "rack00", "jigA", "rack01"]),
+    )
+    plan_def = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigB", "b": "beluga1", "t": "beluga_trailer_1" },
+        _rack_act("put_down_rack", "jigB", "rack01"),
+    ])
+    assert check_plan_properties_for_problem(pb_def, plan_def, properties) == ["p0"]
+
+def test_no_empty_prop_id_without_at_least_one_rack_always_empty(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(("p0", "rack_always_empty", ["rack01"]))
+    assert check_plan_properties_for_problem(pb_def, BelugaPlanDef(), properties) == ["p0"]
+
+def test_swaps_are_counted_as_in_count_swaps_in_plan(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(("p0", "num_swaps_used_leq", [0]), ("p1", "num_swaps_used_leq", [1]))
+
+    # (a jig picked up from a rack and put down on a rack again)
+    swap = plan_def_from_json([_rack_act("pick_up_rack", "jigA", "rack00"), _rack_act("put_down_rack", "jigA", "rack01")])
+    assert count_swaps_in_plan(swap) == 1
+    assert check_plan_properties_for_problem(pb_def, swap, properties) == ["p1"]
+
+    # (put-downs of unloaded jigs are not swaps)
+    plan_def = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigB", "b": "beluga1", "t": "beluga_trailer_1" },
+        _rack_act("put_down_rack", "jigB", "rack01"),
+    ])
+    assert count_swaps_in_plan(plan_def) == 0
+    assert check_plan_properties_for_problem(pb_def, plan_def, properties) == ["p0", "p1"]
+
+def test_jig_to_production_line_before_unknown_flight(make_problem):
+    pb_def = _two_racks_problem(make_problem)
+    properties = _props(
+        ("p0", "jig_to_production_line_before_flight", ["jigA", "pl0", "beluga9"]),
+        ("p1", "jig_to_production_line_before_flight", ["jigA", "pl0", "beluga1"]),
+    )
+    plan_def = plan_def_from_json([
+        _rack_act("pick_up_rack", "jigA", "rack00"),
+        { "name": "deliver_to_hangar", "j": "jigA", "h": "hangar1", "t": "factory_trailer_1", "pl": "pl0" },
+    ])
+    assert check_plan_properties_for_problem(pb_def, plan_def, properties) == []
@@ -0,0 +1,24 @@
+import pytest
+
+from greedy import *
+
+@pytest.mark.parametrize("name", ["test01a", "test01b"])
+def test_greedy_solves_simple_examples(name):
+    pb_def = parse_problem_and_properties("example_problems/{}_base.json".format(name), "example_problems/{}_props.json".format(name))
+    prop_ids = list(pb_def.properties_definitions().keys())
+
+    plan_as_json = solve_greedy(pb_def, prop_ids, 10)
+
+    # (checked again, independently of `solve_greedy`)
+    assert plan_as_json is not None
+    plan_def = plan_def_from_json(plan_as_json)
+    assert BelugaPlanSimulator(pb_def).validate(plan_def, complete=True, prop_ids=prop_ids) is None
+    assert set(check_plan_properties_for_problem(pb_def, plan_def)) >= set(prop_ids)
+
+def test_greedy_only_plans_selected_slots():
+    pb_def = parse_problem_and_properties("example_problems/test01a_base.json", "example_problems/test01a_props.json")
+
+    plan_as_json = solve_greedy(pb_def, [], 10)
+
+    # (all the flights' and production lines' slots come from properties)
+    assert plan_as_json == [{ "name": "switch_to_next_beluga" }] * (len(pb_def.flights)-1)
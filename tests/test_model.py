@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from model import *
+
+def _problem_with_variables() -> tuple[SchedulingProblem, list[up.FNode]]:
+    pb = SchedulingProblem("assumptions")
+    xs = pb.environment.expression_manager.auto_promote([pb.add_variable("x{}".format(k), up.BoolType()) for k in range(3)])
+    pb.add_constraint(up.Or(xs))
+    return (pb, xs)
+
+def test_assumptions_are_retracted():
+    (pb, xs) = _problem_with_variables()
+    # (`_assumptions` only relies on the model's problem)
+    beluga_model = SimpleNamespace(pb=pb)
+    initial_constraints = pb.base_constraints
+
+    with BelugaModelOptSched._assumptions(beluga_model, [xs[0], up.Not(xs[1])]):
+        assert xs[0] in pb.base_constraints and up.Not(xs[1]) in pb.base_constraints
+    assert pb.base_constraints == initial_constraints
+
+    with BelugaModelOptSched._assumptions(beluga_model, [xs[1]]):
+        # (nothing is left from the previous block, which would make this one contradictory)
+        assert up.Not(xs[1]) not in pb.base_constraints and xs[0] not in pb.base_constraints
+        assert xs[1] in pb.base_constraints
+    assert pb.base_constraints == initial_constraints
+
+def test_assumptions_already_in_problem_are_kept():
+    (pb, xs) = _problem_with_variables()
+    beluga_model = SimpleNamespace(pb=pb)
+    initial_constraints = pb.base_constraints
+
+    with BelugaModelOptSched._assumptions(beluga_model, [up.Or(xs), xs[2]]):
+        pass
+    assert pb.base_constraints == initial_constraints
+
+def test_nested_assumptions_solve_a_copy():
+    (pb, xs) = _problem_with_variables()
+    beluga_model = SimpleNamespace(pb=pb)
+    initial_constraints = pb.base_constraints
+
+    with BelugaModelOptSched._assumptions(beluga_model, [xs[0]]) as outer_pb:
+        with BelugaModelOptSched._assumptions(beluga_model, [xs[1]]) as inner_pb:
+            assert inner_pb is not pb
+            assert xs[0] in inner_pb.base_constraints and xs[1] in inner_pb.base_constraints
+            assert xs[1] not in pb.base_constraints
+        assert outer_pb is pb and xs[0] in pb.base_constraints
+    assert pb.base_constraints == initial_constraints
+
+    # (the base problem is used again once no assumptions are added to it)
+    with BelugaModelOptSched._assumptions(beluga_model, [xs[2]]) as pb2:
+        assert pb2 is pb
+
+def test_solve_falls_back_when_hints_contradict_properties():
+    (pb, xs) = _problem_with_variables()
+    # (a model whose only property is `xs[0]`, on a problem without any property to check for conflicts)
+    beluga_model = BelugaModelOptSched.__new__(BelugaModelOptSched)
+    beluga_model.pb = pb
+    beluga_model.pb_def = parse_problem("example_problems/test01a_base.json")
+    beluga_model.properties = { PropId("p0"): xs[0] }
+    beluga_model.solution_cache = None
+    initial_constraints = pb.base_constraints
+
+    # (e.g. the plan of a reference problem in which the property did not hold: the solve without them
+    # would not find any plan either, were the hints not retracted)
+    (pl, _) = beluga_model.solve_with_properties([PropId("p0")], hints=[up.Not(xs[0])])
+    assert pl is not None
+    assert pb.base_constraints == initial_constraints
+
+    (pl, _) = beluga_model.solve_with_properties([PropId("p0")], hints=[up.Not(xs[1])])
+    assert pl is not None
+    assert pb.base_constraints == initial_constraints
+
+def test_problem_hash_changes_with_model_source(monkeypatch):
+    import model
+
+    beluga_model = BelugaModelOptSched.__new__(BelugaModelOptSched)
+    beluga_model.pb_def = parse_problem("example_problems/test01a_base.json")
+    beluga_model.num_available_swaps = 10
+    beluga_model._problem_hash = None
+    problem_hash = beluga_model.problem_hash
+
+    # (as if `model.py` had been changed: infeasible results cached by the previous model are not reused)
+    monkeypatch.setattr(model, "MODEL_SOURCE_DIGEST", "0"*64)
+    beluga_model._problem_hash = None
+    assert beluga_model.problem_hash != problem_hash
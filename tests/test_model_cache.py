@@ -0,0 +1,11 @@
+import model_cache
+from model_cache import *
+
+def test_key_changes_with_model_source(monkeypatch):
+    pb_def = parse_problem_and_properties("example_problems/test01a_base.json", "example_problems/test01a_props.json")
+    key = model_cache_key(pb_def, 10, False, False)
+
+    assert model_cache_key(pb_def, 10, False, False) == key
+    # (as if `model.py` had been changed)
+    monkeypatch.setattr(model_cache, "MODEL_SOURCE_DIGEST", "0"*64)
+    assert model_cache_key(pb_def, 10, False, False) != key
@@ -0,0 +1,19 @@
+import os
+
+import portfolio
+from portfolio import *
+
+def _fake_solve_for_num_swaps(pb_def, name, num_available_swaps, num_swaps_to_use, results, chain_precedences, symmetry_breaking):
+    if num_swaps_to_use == 0:
+        if name == "dies":
+            os._exit(1)
+        results.put((0, STATUS_INFEASIBLE, None))
+    else:
+        results.put((num_swaps_to_use, STATUS_PLAN, [{ "name": "switch_to_next_beluga" }]))
+
+def test_portfolio_minimality(monkeypatch):
+    monkeypatch.setattr(portfolio, "_solve_for_num_swaps", _fake_solve_for_num_swaps)
+
+    assert solve_portfolio_over_swaps(None, "infeasible", 2, 1, None) == (1, [{ "name": "switch_to_next_beluga" }], True)
+    # (a worker dying without reporting does not prove its number of swaps infeasible)
+    assert solve_portfolio_over_swaps(None, "dies", 2, 1, None) == (1, [{ "name": "switch_to_next_beluga" }], False)
@@ -0,0 +1,28 @@
+from repair import *
+from repair import _matches_slots
+from simulator import *
+
+def test_affected_window_ignores_unselected_slots(make_problem):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigA", "jigB"] }],
+        jigs=[("jigA", "typeA", False), ("jigB", "typeA", False)],
+        production_lines=[{ "name": "pl0", "schedule": ["jigB"] }],
+        flights=[{ "name": "beluga1", "incoming": [], "outgoing": [] }],
+        props=[("p0", "deliver_to_production_line", ["jigA", "pl0", 1])],
+    )
+    # (only delivers jigB, as the base schedule requires)
+    plan_def = plan_def_from_json([
+        { "name": "pick_up_rack", "j": "jigB", "t": "factory_trailer_1", "r": "rack00", "s": SIDE_FACTORY_NAME },
+        { "name": "deliver_to_hangar", "j": "jigB", "h": "hangar1", "t": "factory_trailer_1", "pl": "pl0" },
+    ])
+    assert BelugaPlanSimulator(pb_def).validate(plan_def, complete=True) is None
+
+    assert affected_window(pb_def, plan_def, []) == ([], None)
+    assert affected_window(pb_def, plan_def, [PropId("p0")]) == (["p0"], (0, 0))
+
+def test_matches_slots_skips_optional_slots_only():
+    same = lambda j, x: j == x
+    # (a jig type may match several slots: only the required one has to be used)
+    assert _matches_slots(["typeA"], [("typeA", False), ("typeA", True)], same)
+    assert not _matches_slots([], [("typeA", False), ("typeA", True)], same)
+    assert not _matches_slots(["jigB", "jigA"], [("jigA", False), ("jigB", True)], same)
@@ -0,0 +1,42 @@
+import rolling_horizon
+from rolling_horizon import *
+
+def test_windows_share_the_swaps_budget(make_problem, monkeypatch):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigA"] }],
+        jigs=[("jigA", "typeA", True)],
+        production_lines=[],
+        flights=[
+            { "name": "beluga1", "incoming": [], "outgoing": [] },
+            { "name": "beluga2", "incoming": [], "outgoing": [] },
+            { "name": "beluga3", "incoming": [], "outgoing": [] },
+        ],
+        props=[],
+    )
+    budgets = []
+
+    def _solve_window(window_pb_def, name, num_available_swaps, timeout, chain_precedences, symmetry_breaking):
+        budgets.append(num_available_swaps)
+        # (one swap per window)
+        return [
+            { "name": "pick_up_rack", "j": "jigA", "t": "factory_trailer_1", "r": "rack00", "s": SIDE_FACTORY_NAME },
+            { "name": "put_down_rack", "j": "jigA", "t": "factory_trailer_1", "r": "rack00", "s": SIDE_FACTORY_NAME },
+        ] + [{ "name": "switch_to_next_beluga" }]*(len(window_pb_def.flights)-1)
+    monkeypatch.setattr(rolling_horizon, "_solve_window", _solve_window)
+
+    plan_as_json = solve_rolling_horizon(pb_def, "test", 5, 2, 1)
+    assert budgets == [5, 4]
+    assert count_swaps_in_plan(plan_def_from_json(plan_as_json)) == 2
+
+def test_invalid_stitched_plan_is_rejected(make_problem, monkeypatch):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": [] }],
+        jigs=[("jigA", "typeA", False)],
+        production_lines=[],
+        flights=[{ "name": "beluga1", "incoming": ["jigA"], "outgoing": [] }],
+        props=[],
+    )
+    # (jigA is never unloaded)
+    monkeypatch.setattr(rolling_horizon, "_solve_window", lambda *args: [])
+
+    assert solve_rolling_horizon(pb_def, "test", 5, 2, 1) is None
@@ -0,0 +1,43 @@
+from simulator import *
+
+def test_window_has_only_base_slots(make_problem):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": ["jigB"] }],
+        jigs=[("jigA", "typeA", False), ("jigB", "typeA", True), ("jigC", "typeA", False)],
+        production_lines=[{ "name": "pl0", "schedule": ["jigA"] }],
+        flights=[
+            { "name": "beluga1", "incoming": ["jigA"], "outgoing": ["typeA"] },
+            { "name": "beluga2", "incoming": [], "outgoing": [] },
+        ],
+        props=[
+            ("p0", "unload_beluga", ["jigC", "beluga1", 0]),
+            ("p1", "load_beluga", ["jigB", "beluga1", 0]),
+            ("p2", "deliver_to_production_line", ["jigC", "pl0", 0]),
+        ],
+    )
+    window_pb_def = BelugaState.initial(pb_def).to_problem_def(pb_def, 2)
+
+    assert window_pb_def.flights[0].incoming == { 0: "jigA" }
+    assert window_pb_def.flights[0].outgoing == { 0: "typeA" }
+    assert window_pb_def.production_lines[0].schedule == { 0: "jigA" }
+    # (jigC only arrives if p0 holds)
+    assert [j.name for j in window_pb_def.jigs] == ["jigA", "jigB"]
+
+def test_complete_plan_only_requires_base_and_selected_slots(make_problem):
+    pb_def = make_problem(
+        racks=[{ "name": "rack00", "size": 32, "jigs": [] }],
+        jigs=[("jigA", "typeA", False), ("jigC", "typeA", False)],
+        production_lines=[{ "name": "pl0", "schedule": [] }],
+        flights=[{ "name": "beluga1", "incoming": ["jigA"], "outgoing": [] }],
+        props=[("p0", "unload_beluga", ["jigC", "beluga1", 1])],
+    )
+    plan_def = plan_def_from_json([
+        { "name": "unload_beluga", "j": "jigA", "b": "beluga1", "t": "beluga_trailer_1" },
+        { "name": "put_down_rack", "j": "jigA", "t": "beluga_trailer_1", "r": "rack00", "s": SIDE_BELUGA_NAME },
+    ])
+    simulator = BelugaPlanSimulator(pb_def)
+
+    assert simulator.validate(plan_def, complete=True) is None
+    assert simulator.validate(plan_def, complete=True, prop_ids=[PropId("p0")]) == (2, "not all jigs were unloaded")
+    # (base slots are required anyway)
+    assert simulator.validate(BelugaPlanDef(), complete=True) == (0, "not all jigs were unloaded")
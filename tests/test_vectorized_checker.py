@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from checker import *
+from vectorized_checker import *
+
+EXAMPLE_PROBLEMS = ["test01a", "test01b", "test02", "test03"]
+
+def _random_plan(pb_def: BelugaProblemDef, rng: random.Random, length: int) -> BelugaPlanDef:
+    # (not necessarily valid plans: only the properties they satisfy are compared)
+    jigs = [j.name for j in pb_def.jigs]
+    racks = [r.name for r in pb_def.racks]
+    pls = [pl.name for pl in pb_def.production_lines]
+    flights = [fl.name for fl in pb_def.flights]
+    acts = []
+    num_switches = 0
+    for _ in range(length):
+        name = rng.choice(ACTION_KINDS)
+        j = rng.choice(jigs)
+        if name in ["unload_beluga", "load_beluga"]:
+            # (mostly for the current flight, but also for other ones)
+            b = flights[num_switches] if rng.random() < 0.7 else rng.choice(flights)
+            acts.append({ "name": name, "j": j, "b": b, "t": "beluga_trailer_1" })
+        elif name in ["put_down_rack", "pick_up_rack"]:
+            acts.append({ "name": name, "j": j, "t": "factory_trailer_1", "r": rng.choice(racks), "s": "fside" })
+        elif name == "deliver_to_hangar":
+            acts.append({ "name": name, "j": j, "h": "hangar1", "t": "factory_trailer_1", "pl": rng.choice(pls) })
+        elif name == "get_from_hangar":
+            acts.append({ "name": name, "j": j, "h": "hangar1", "t": "factory_trailer_1" })
+        elif num_switches+1 < len(flights):
+            acts.append({ "name": name })
+            num_switches += 1
+    return plan_def_from_json(acts)
+
+def _random_properties(pb_def: BelugaProblemDef, rng: random.Random, num_props: int) -> dict[PropId, dict]:
+    jigs = [j.name for j in pb_def.jigs]
+    jig_types = [jt.name for jt in pb_def.jig_types]
+    racks = [r.name for r in pb_def.racks]
+    pls = [pl.name for pl in pb_def.production_lines]
+    flights = [fl.name for fl in pb_def.flights]
+    params = {
+        "unload_beluga": lambda: [rng.choice(jigs), rng.choice(flights), rng.randrange(3)],
+        "load_beluga": lambda: [rng.choice(jigs + jig_types), rng.choice(flights), rng.randrange(3)],
+        "deliver_to_production_line": lambda: [rng.choice(jigs), rng.choice(pls), rng.randrange(3)],
+        "rack_always_empty": lambda: [rng.choice(racks)],
+        "at_least_one_rack_always_empty": lambda: [],
+        "jig_always_placed_on_rack_size_leq": lambda: [rng.choice(jigs), rng.choice([r.size for r in pb_def.racks])],
+        "num_swaps_used_leq": lambda: [rng.randrange(3)],
+        "jig_never_on_rack": lambda: [rng.choice(jigs), rng.choice(racks)],
+        "jig_only_if_ever_on_rack": lambda: [rng.choice(jigs), rng.choice(racks)],
+        "jig_to_production_line_order": lambda: [rng.choice(jigs), rng.choice(pls), rng.choice(jigs), rng.choice(pls)],
+        "jig_to_rack_order": lambda: [rng.choice(jigs), rng.choice(racks), rng.choice(jigs), rng.choice(racks)],
+        "jig_to_production_line_before_flight": lambda: [rng.choice(jigs), rng.choice(pls), rng.choice(flights)],
+    }
+    props = {}
+    for k in range(num_props):
+        name = rng.choice(list(params.keys()))
+        props[PropId("r{}".format(k))] = { "name": name, "parameters": params[name]() }
+    return props
+
+@pytest.mark.parametrize("example", EXAMPLE_PROBLEMS)
+def test_same_verdicts_as_checker(example):
+    pb_def = parse_problem_and_properties(
+        "example_problems/{}_base.json".format(example),
+        "example_problems/{}_props.json".format(example),
+    )
+    rng = random.Random(example)
+
+    for properties in [pb_def.properties_definitions(), _random_properties(pb_def, rng, 200)]:
+        plan_defs = [_random_plan(pb_def, rng, rng.randrange(40)) for _ in range(100)]
+        (prop_ids, sat) = check_plans_properties(pb_def, plan_defs, properties)
+        for (plan_def, plan_sat) in zip(plan_defs, sat):
+            expected = check_plan_properties_for_problem(pb_def, plan_def, properties)
+            assert [prop_id for (prop_id, s) in zip(prop_ids, plan_sat) if s] == expected, plan_def_to_json(plan_def)
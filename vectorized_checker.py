@@ -0,0 +1,218 @@
+import numpy as np
+
+from parser import *
+
+# Property checking over populations of plans at once (e.g. plans from a local search, or for different swap budgets),
+# with NumPy array operations rather than action by action (independent of model / planner).
+#
+# Plans are encoded as integer arrays (one row per plan, padded to the longest one), and each property is evaluated
+# for all the plans at once. Same semantics as `BelugaPropertyChecker` (in `checker.py`), which remains the reference.
+
+ACTION_KINDS = [
+    "unload_beluga",
+    "load_beluga",
+    "put_down_rack",
+    "pick_up_rack",
+    "deliver_to_hangar",
+    "get_from_hangar",
+    "switch_to_next_beluga",
+]
+(KIND_UNLOAD, KIND_LOAD, KIND_PUT_DOWN, KIND_PICK_UP, KIND_DELIVER, KIND_GET, KIND_SWITCH) = range(len(ACTION_KINDS))
+KIND_NONE = -1   # (padding, past the end of a plan)
+
+@dataclass
+class BelugaPlanArrays:
+    kind: np.ndarray    # (num plans, max plan length): index in `ACTION_KINDS`
+    jig: np.ndarray     # index in `pb_def.jigs` (-1 if none, as for other parameters)
+    rack: np.ndarray    # index in `pb_def.racks`
+    pl: np.ndarray      # index in `pb_def.production_lines`
+    flight: np.ndarray  # index in `pb_def.flights`: flight unloaded from / loaded to
+    current_flight: np.ndarray  # index in `pb_def.flights` of the current flight (i.e. number of switches before the action)
+
+def encode_plans(pb_def: BelugaProblemDef, plan_defs: list[BelugaPlanDef]) -> BelugaPlanArrays:
+    jigs = { j.name: k for k, j in enumerate(pb_def.jigs) }
+    racks = { r.name: k for k, r in enumerate(pb_def.racks) }
+    pls = { pl.name: k for k, pl in enumerate(pb_def.production_lines) }
+    kinds = { name: k for k, name in enumerate(ACTION_KINDS) }
+
+    max_plan_length = max((len(plan_def) for plan_def in plan_defs), default=0)
+    rows = []
+    for plan_def in plan_defs:
+        row = []
+        flight_index = 0
+        for act in plan_def:
+            kind = kinds[act.name]
+            row.append((
+                kind,
+                jigs[act.params['j']] if 'j' in act.params else -1,
+                racks[act.params['r']] if 'r' in act.params else -1,
+                pls[act.params['pl']] if 'pl' in act.params else -1,
+                pb_def.index.flights_order[act.params['b']] if 'b' in act.params else -1,
+                flight_index,
+            ))
+            if kind == KIND_SWITCH:
+                flight_index += 1
+        rows.append(row + [(KIND_NONE, -1, -1, -1, -1, flight_index)] * (max_plan_length - len(row)))
+
+    a = np.array(rows, dtype=np.int32).reshape((len(plan_defs), max_plan_length, 6))
+    return BelugaPlanArrays(a[:, :, 0], a[:, :, 1], a[:, :, 2], a[:, :, 3], a[:, :, 4], a[:, :, 5])
+
+def plans_satisfaction_matrix(
+    pb_def: BelugaProblemDef,
+    plans: BelugaPlanArrays,
+    properties: dict[PropId, dict] | None = None,
+) -> tuple[list[PropId], np.ndarray]:
+    """
+    Returns the properties (all the properties of the problem definition if `properties` is not given),
+    and a (num plans, num properties) boolean matrix of which of them each plan satisfies.
+    """
+    if properties is None:
+        properties = pb_def.properties_definitions()
+
+    jigs = { j.name: k for k, j in enumerate(pb_def.jigs) }
+    racks = { r.name: k for k, r in enumerate(pb_def.racks) }
+    pls = { pl.name: k for k, pl in enumerate(pb_def.production_lines) }
+    jig_types = { jt.name: k for k, jt in enumerate(pb_def.jig_types) }
+    flights = pb_def.index.flights_order
+
+    (num_plans, max_plan_length) = plans.kind.shape
+    num_racks = len(pb_def.racks)
+
+    # (-1 indices, i.e. no jig / rack, get the last value)
+    jig_type = np.array([jig_types[j.type] for j in pb_def.jigs] + [-1], dtype=np.int32)[plans.jig]
+    rack_size = np.array([r.size for r in pb_def.racks] + [-1], dtype=np.int32)[plans.rack]
+
+    is_put = plans.kind == KIND_PUT_DOWN
+    is_deliver = plans.kind == KIND_DELIVER
+
+    # (initial placements on racks come before the plan, in the order of racks, as in `BelugaPropertyChecker`)
+    initial_placements = [(j, r.name) for r in pb_def.racks for j in r.jigs]
+    initial_rank = { (j, r): k - len(initial_placements) for k, (j, r) in enumerate(initial_placements) }
+    initial_rack = { j: r for (j, r) in initial_placements }
+
+    def _id(ids: dict[str, int], name: str) -> int:
+        # (unknown names never match)
+        return ids.get(name, -2)
+
+    def _not_left(b: str) -> np.ndarray:
+        # (unloads from / loads into a flight only count until the plan switched from it to the next one)
+        return plans.current_flight <= _id(flights, b)
+
+    def _first(mask: np.ndarray) -> np.ndarray:
+        # (index of the first action matching the mask, or the plan length if none)
+        if max_plan_length == 0:
+            return np.zeros(num_plans, dtype=np.int64)
+        return np.where(mask.any(axis=1), mask.argmax(axis=1), max_plan_length)
+
+    def _ranks(kind: int, col: np.ndarray) -> np.ndarray:
+        # (position of each action of that kind among the ones (of the plan) with the same flight / production line)
+        res = np.full(col.shape, -1, dtype=np.int32)
+        for v in np.unique(col[plans.kind == kind]):
+            m = (plans.kind == kind) & (col == v)
+            res = np.where(m, np.cumsum(m, axis=1) - 1, res)
+        return res
+
+    unload_ranks = _ranks(KIND_UNLOAD, plans.flight)
+    load_ranks = _ranks(KIND_LOAD, plans.flight)
+    deliver_ranks = _ranks(KIND_DELIVER, plans.pl)
+
+    # (racks used, initially or by a put-down)
+    (put_plans, put_steps) = np.nonzero(is_put)
+    racks_used = np.bincount(put_plans * num_racks + plans.rack[put_plans, put_steps], minlength=num_plans * num_racks).reshape((num_plans, num_racks)) > 0
+    racks_used |= np.array([len(r.jigs) > 0 for r in pb_def.racks], dtype=bool)
+
+    # (swaps: put-downs of jigs whose previous pick-up / put-down / load / deliver is a pick-up, see `count_swaps_in_plan`)
+    (ev_plans, ev_steps) = np.nonzero(np.isin(plans.kind, [KIND_PICK_UP, KIND_PUT_DOWN, KIND_LOAD, KIND_DELIVER]))
+    ev_jigs = plans.jig[ev_plans, ev_steps]
+    order = np.lexsort((ev_steps, ev_jigs, ev_plans))
+    (ev_plans, ev_jigs, ev_kinds) = (ev_plans[order], ev_jigs[order], plans.kind[ev_plans[order], ev_steps[order]])
+    is_swap = (
+        (ev_plans[1:] == ev_plans[:-1]) & (ev_jigs[1:] == ev_jigs[:-1])
+        & (ev_kinds[1:] == KIND_PUT_DOWN) & (ev_kinds[:-1] == KIND_PICK_UP)
+    )
+    num_swaps = np.bincount(ev_plans[1:][is_swap], minlength=num_plans)
+
+    def _on_rack_first(j: str, r: str) -> np.ndarray:
+        if (j, r) in initial_rank:
+            return np.full(num_plans, initial_rank[(j, r)])
+        return _first(is_put & (plans.jig == _id(jigs, j)) & (plans.rack == _id(racks, r)))
+
+    res = np.zeros((num_plans, len(properties)), dtype=bool)
+
+    for (k, prop_name_and_params) in enumerate(properties.values()):
+        prop_name = prop_name_and_params['name']
+        prop_params = prop_name_and_params['parameters']
+
+        if prop_name == "unload_beluga":
+            j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
+            m = (plans.kind == KIND_UNLOAD) & (plans.flight == _id(flights, b)) & (unload_ranks == ji)
+            res[:, k] = (m & _not_left(b) & (plans.jig == _id(jigs, j))).any(axis=1)
+
+        elif prop_name == "load_beluga":
+            j, b, ji = prop_params[0], prop_params[1], int(prop_params[2])
+            m = (plans.kind == KIND_LOAD) & (plans.flight == _id(flights, b)) & (load_ranks == ji)
+            res[:, k] = (m & _not_left(b) & ((plans.jig == _id(jigs, j)) | (jig_type == _id(jig_types, j)))).any(axis=1)
+
+        elif prop_name == "deliver_to_production_line":
+            j, pl, pli = prop_params[0], prop_params[1], int(prop_params[2])
+            m = is_deliver & (plans.pl == _id(pls, pl)) & (deliver_ranks == pli)
+            res[:, k] = (m & (plans.jig == _id(jigs, j))).any(axis=1)
+
+        elif prop_name == "rack_always_empty":
+            r = prop_params[0]
+            res[:, k] = ~racks_used[:, racks[r]] if r in racks else True
+
+        elif prop_name == "at_least_one_rack_always_empty":
+            res[:, k] = (~racks_used).any(axis=1)
+
+        elif prop_name == "jig_always_placed_on_rack_size_leq":
+            j, rs = prop_params[0], int(prop_params[1])
+            initially_ok = j not in initial_rack or pb_def.index.racks[initial_rack[j]].size <= rs
+            res[:, k] = initially_ok & ~(is_put & (plans.jig == _id(jigs, j)) & (rack_size > rs)).any(axis=1)
+
+        elif prop_name == "num_swaps_used_leq":
+            ns = int(prop_params[0])
+            res[:, k] = num_swaps <= ns
+
+        elif prop_name == "jig_never_on_rack":
+            j, r = prop_params[0], prop_params[1]
+            res[:, k] = _on_rack_first(j, r) == max_plan_length
+
+        elif prop_name == "jig_only_if_ever_on_rack":
+            j, r = prop_params[0], prop_params[1]
+            initially_ok = initial_rack.get(j, r) == r
+            res[:, k] = initially_ok & ~(is_put & (plans.jig == _id(jigs, j)) & (plans.rack != _id(racks, r))).any(axis=1)
+
+        elif prop_name == "jig_to_production_line_order":
+            j1, pl1, j2, pl2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
+            first1 = _first(is_deliver & (plans.jig == _id(jigs, j1)) & (plans.pl == _id(pls, pl1)))
+            first2 = _first(is_deliver & (plans.jig == _id(jigs, j2)) & (plans.pl == _id(pls, pl2)))
+            res[:, k] = (first1 < max_plan_length) & (first1 <= first2)
+
+        elif prop_name == "jig_to_rack_order":
+            j1, r1, j2, r2 = prop_params[0], prop_params[1], prop_params[2], prop_params[3]
+            first1 = _on_rack_first(j1, r1)
+            first2 = _on_rack_first(j2, r2)
+            res[:, k] = (first1 < max_plan_length) & (first1 <= first2)
+
+        elif prop_name == "jig_to_production_line_before_flight":
+            j, pl, b = prop_params[0], prop_params[1], prop_params[2]
+            first = _first(is_deliver & (plans.jig == _id(jigs, j)) & (plans.pl == _id(pls, pl)))
+            delivered = first < max_plan_length
+            flight_at_first = plans.current_flight[np.nonzero(delivered)[0], first[delivered]]
+            res[delivered, k] = flight_at_first < flights.get(b, -1)
+
+        else:
+            assert False, "unknown property name {}".format(prop_name)
+
+    return (list(properties.keys()), res)
+
+def check_plans_properties(
+    pb_def: BelugaProblemDef,
+    plan_defs: list[BelugaPlanDef],
+    properties: dict[PropId, dict] | None = None,
+) -> tuple[list[PropId], np.ndarray]:
+    """
+    Same as `plans_satisfaction_matrix`, encoding the plans first.
+    """
+    return plans_satisfaction_matrix(pb_def, encode_plans(pb_def, plan_defs), properties)